@@ -0,0 +1,4 @@
+import time
+
+# Reference point for the startup-time budget, taken before the app's modules load
+STARTED_AT = time.perf_counter()
@@ -0,0 +1,37 @@
+# app/api/routes/admin.py
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+from app.core.profiling import find_profile
+from app.dependencies.security import AdminKeyDependency, ApiKeyDependency
+
+router = APIRouter(
+    prefix="/api/v1/admin",
+    tags=["admin"],
+    dependencies=[ApiKeyDependency, AdminKeyDependency],
+)
+
+
+@router.get("/profiles/{profile_id}", response_class=FileResponse)
+async def get_profile(profile_id: str) -> FileResponse:
+    """
+    Return the report of a profiled request.
+
+    The report lists the wall time, the time spent in each merge stage, the
+    tracemalloc peak with the largest allocation sites and the functions with
+    the highest cumulative time on the worker threads.
+    """
+    path = find_profile(profile_id, ".json")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json")
+
+
+@router.get("/profiles/{profile_id}/pstats", response_class=FileResponse)
+async def get_profile_stats(profile_id: str) -> FileResponse:
+    """Download the raw cProfile data of a profiled request, readable with ``pstats`` or snakeviz."""
+
+    path = find_profile(profile_id, ".prof")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
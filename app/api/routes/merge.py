@@ -3,58 +3,41 @@ from pathlib import Path
 from typing import List, Literal, Optional
 
 from fastapi import APIRouter, File, Form, HTTPException, UploadFile
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 from app.dependencies.security import ApiKeyDependency
-from app.services.pdf_merger import PdfMergerService
+from app.utils.document_volume import parse_document_paths, resolve_document_path
 
 router = APIRouter(prefix="/api/v1", tags=["merge"])
 
 
-@router.post("/merge", response_class=StreamingResponse, dependencies=[ApiKeyDependency])
-async def merge_pdf(
-    files: List[UploadFile] = File(
-        ..., description="Upload PDF, JPG, or PNG files in desired order."
-    ),
-    ranges: Optional[str] = Form(
-        None, description='JSON list of page ranges per file, e.g. ["1-3,5",""]'
-    ),
-    options: Optional[str] = Form(
-        None,
-        description=(
-            "JSON list of per-file layout options. Each object may contain "
-            "'paper_size' (A4|Letter|auto), 'orientation' "
-            "(portrait|landscape|rotate90|rotate180|rotate270|auto), "
-            "and 'fit_mode' (letterbox|crop|auto)."
-        ),
-    ),
-    output_name: Optional[str] = Form("merged.pdf"),
-    engine: Literal["pypdf", "pikepdf"] = Form(
-        "pypdf", description="PDF processing backend: 'pypdf' (default) or 'pikepdf'."
-    ),
-) -> StreamingResponse:
-    if not files:
-        raise HTTPException(status_code=400, detail="No files uploaded.")
+_ALLOWED_TYPES = {
+    "application/pdf",
+    "image/jpeg",
+    "image/pjpeg",
+    "image/jpg",
+    "image/png",
+    "image/x-png",
+}
+_ALLOWED_EXTENSIONS = {".pdf", ".jpg", ".jpeg", ".png"}
+_StampPosition = Literal[
+    "center", "diagonal", "top", "bottom", "top-left", "top-right", "bottom-left", "bottom-right"
+]
 
-    allowed_types = {
-        "application/pdf",
-        "image/jpeg",
-        "image/pjpeg",
-        "image/jpg",
-        "image/png",
-        "image/x-png",
-    }
-    allowed_extensions = {".pdf", ".jpg", ".jpeg", ".png"}
+
+def _validate_uploads(files: List[UploadFile]) -> None:
     for upload in files:
         filename = upload.filename or ""
         extension = Path(filename).suffix.lower()
         content_type = (upload.content_type or "").lower()
-        if extension not in allowed_extensions and content_type not in allowed_types:
+        if extension not in _ALLOWED_EXTENSIONS and content_type not in _ALLOWED_TYPES:
             raise HTTPException(
                 status_code=400,
                 detail=f"Unsupported file type: {upload.filename}",
             )
 
+
+def _parse_ranges(ranges: Optional[str], count: int) -> list[str]:
     per_file_ranges: list[str] = []
     if ranges:
         try:
@@ -65,9 +48,12 @@ async def merge_pdf(
         except Exception as exc:  # pragma: no cover - defensive
             raise HTTPException(status_code=400, detail=f"Invalid ranges JSON: {exc}") from exc
 
-    while len(per_file_ranges) < len(files):
+    while len(per_file_ranges) < count:
         per_file_ranges.append("")
+    return per_file_ranges
 
+
+def _parse_options(options: Optional[str], count: int) -> list[dict[str, str]]:
     per_file_options: list[dict[str, str]] = []
     if options:
         try:
@@ -86,9 +72,365 @@ async def merge_pdf(
         except Exception as exc:  # pragma: no cover - defensive
             raise HTTPException(status_code=400, detail=f"Invalid options JSON: {exc}") from exc
 
-    while len(per_file_options) < len(files):
+    while len(per_file_options) < count:
         per_file_options.append({})
+    return per_file_options
+
+
+@router.post("/merge", response_class=StreamingResponse, dependencies=[ApiKeyDependency])
+async def merge_pdf(
+    files: Optional[List[UploadFile]] = File(
+        None, description="Upload PDF, JPG, or PNG files in desired order."
+    ),
+    paths: Optional[str] = Form(
+        None,
+        description=(
+            "JSON list of PDF, JPG, or PNG files relative to the server's document root, "
+            "merged instead of uploads. Requires PDF_MERGER_DOCUMENT_ROOT."
+        ),
+    ),
+    output_path: Optional[str] = Form(
+        None,
+        description=(
+            "Write the merged PDF to this path under the document root and return "
+            "JSON instead of the file. Requires PDF_MERGER_DOCUMENT_ROOT."
+        ),
+    ),
+    ranges: Optional[str] = Form(
+        None, description='JSON list of page ranges per file, e.g. ["1-3,5",""]'
+    ),
+    options: Optional[str] = Form(
+        None,
+        description=(
+            "JSON list of per-file layout options. Each object may contain "
+            "'paper_size' (A4|Letter|auto), 'orientation' "
+            "(portrait|landscape|rotate90|rotate180|rotate270|auto), "
+            "and 'fit_mode' (letterbox|crop|auto)."
+        ),
+    ),
+    output_name: Optional[str] = Form("merged.pdf"),
+    engine: Literal["auto", "pypdf", "pikepdf"] = Form(
+        "auto",
+        description=(
+            "PDF processing backend: 'auto' (default) picks the faster of 'pypdf' and "
+            "'pikepdf' for the inputs and reports it in the X-PDF-Engine header."
+        ),
+    ),
+    placement: Literal["merge", "xobject"] = Form(
+        "merge",
+        description=(
+            "How resized pages are drawn: 'merge' (default) copies each page's content, "
+            "'xobject' stores each distinct source page once as a Form XObject and "
+            "places it on every output page that uses it."
+        ),
+    ),
+    optimize: bool = Form(
+        False,
+        description=(
+            "Merge identical objects (fonts, images, ICC profiles) across inputs and "
+            "write object streams and cross-reference streams."
+        ),
+    ),
+    max_image_dpi: Optional[int] = Form(
+        None,
+        description=(
+            "Downsample embedded images whose effective resolution on the output page "
+            "exceeds this DPI (36-1200). Leave empty to keep images unchanged."
+        ),
+        ge=36,
+        le=1200,
+    ),
+    image_quality: int = Form(
+        75,
+        description="JPG quality (1-100) used for images recompressed by max_image_dpi.",
+        ge=1,
+        le=100,
+    ),
+    linearize: bool = Form(
+        False,
+        description="Write a linearized (fast web view) PDF so viewers can show page 1 before the download completes.",
+    ),
+    object_streams: Literal["preserve", "disable", "generate"] = Form(
+        "preserve",
+        description="Object stream handling: 'preserve' (default), 'disable', or 'generate' for smaller output.",
+    ),
+    dry_run: bool = Form(
+        False,
+        description="Return the layout plan as JSON instead of rendering the merged PDF.",
+    ),
+    watermark_text: Optional[str] = Form(
+        None, description='Text drawn on every page, e.g. "CONFIDENTIAL".'
+    ),
+    watermark_image: Optional[UploadFile] = File(
+        None, description="PNG or JPG image drawn on every page instead of watermark text."
+    ),
+    watermark_position: _StampPosition = Form(
+        "diagonal",
+        description=(
+            "Watermark position: 'diagonal' (default), 'center', 'top', 'bottom', "
+            "'top-left', 'top-right', 'bottom-left', or 'bottom-right'."
+        ),
+    ),
+    watermark_opacity: float = Form(
+        0.3, description="Watermark opacity from 0 to 1.", ge=0, le=1
+    ),
+    page_numbers: Optional[str] = Form(
+        None,
+        description='Page number format using {page} and {total}, e.g. "{page} / {total}".',
+    ),
+    page_number_position: _StampPosition = Form(
+        "bottom", description="Page number position, as for watermark_position except 'diagonal'."
+    ),
+) -> Response:
+    local_paths = [resolve_document_path(path) for path in parse_document_paths(paths)]
+    if files and local_paths:
+        raise HTTPException(
+            status_code=400,
+            detail="Provide either uploaded files or paths, not both.",
+        )
+    if not files and not local_paths:
+        raise HTTPException(status_code=400, detail="No files uploaded.")
+
+    count = len(local_paths) if local_paths else len(files or [])
+    if files:
+        _validate_uploads(files)
+    target = None
+    if output_path is not None:
+        if not output_path.lower().endswith(".pdf"):
+            output_path += ".pdf"
+        target = resolve_document_path(output_path, must_exist=False)
+    per_file_ranges = _parse_ranges(ranges, count)
+    per_file_options = _parse_options(options, count)
+
+    # Services pull in the PDF libraries, so they are imported on first use
+    from app.services.page_stamps import StampOptions
+    from app.services.pdf_merger import PdfMergerService
+
+    stamp = StampOptions(
+        watermark_text=watermark_text or None,
+        watermark_image=(
+            await watermark_image.read()
+            if watermark_image is not None and watermark_image.filename
+            else None
+        ),
+        watermark_position=watermark_position,
+        watermark_opacity=watermark_opacity,
+        page_number_format=page_numbers or None,
+        page_number_position=page_number_position,
+    )
+    merger = PdfMergerService(
+        engine=engine,
+        placement=placement,
+        optimize=optimize,
+        max_image_dpi=max_image_dpi,
+        image_quality=image_quality,
+        linearize=linearize,
+        object_streams=object_streams,
+        stamp=stamp,
+    )
+    if dry_run:
+        if local_paths:
+            plan = await merger.plan_paths(local_paths, per_file_ranges, per_file_options)
+        else:
+            plan = await merger.plan_files(files or [], per_file_ranges, per_file_options)
+        return JSONResponse({"files": plan})
+
+    if local_paths:
+        await merger.append_paths(local_paths, per_file_ranges, per_file_options)
+    else:
+        await merger.append_files(files or [], per_file_ranges, per_file_options)
+    if target is not None:
+        size = await merger.save(target)
+        return JSONResponse(
+            {"output_path": output_path, "size": size},
+            headers={"X-PDF-Engine": merger.resolved_engine},
+        )
+    return await merger.export(output_name)
+
+
+@router.post("/merge/append", response_class=StreamingResponse, dependencies=[ApiKeyDependency])
+async def append_pdf(
+    base: UploadFile = File(
+        ..., description="PDF to extend. Its bytes are kept unchanged in the output."
+    ),
+    files: List[UploadFile] = File(
+        ..., description="PDF, JPG, or PNG files whose pages are appended in order."
+    ),
+    ranges: Optional[str] = Form(
+        None, description='JSON list of page ranges per appended file, e.g. ["1-3,5",""]'
+    ),
+    options: Optional[str] = Form(
+        None,
+        description="JSON list of per-file layout options, as for /merge.",
+    ),
+    output_name: Optional[str] = Form(None),
+    placement: Literal["merge", "xobject"] = Form(
+        "merge", description="How resized pages are drawn, as for /merge."
+    ),
+    max_image_dpi: Optional[int] = Form(
+        None,
+        description="Downsample embedded images of the appended pages above this DPI (36-1200).",
+        ge=36,
+        le=1200,
+    ),
+    image_quality: int = Form(
+        75,
+        description="JPG quality (1-100) used for images recompressed by max_image_dpi.",
+        ge=1,
+        le=100,
+    ),
+) -> Response:
+    if not files:
+        raise HTTPException(status_code=400, detail="No files uploaded.")
+    if Path(base.filename or "").suffix.lower() != ".pdf" and (
+        (base.content_type or "").lower() != "application/pdf"
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Base document must be a PDF: {base.filename}",
+        )
+
+    _validate_uploads(files)
+    per_file_ranges = _parse_ranges(ranges, len(files))
+    per_file_options = _parse_options(options, len(files))
+
+    from app.services.pdf_merger import PdfMergerService
+
+    merger = PdfMergerService(
+        placement=placement,
+        max_image_dpi=max_image_dpi,
+        image_quality=image_quality,
+    )
+    await merger.append_files(files, per_file_ranges, per_file_options)
+    return await merger.export_incremental(base, output_name or base.filename)
+
+
+@router.post("/merge/batch", response_class=StreamingResponse, dependencies=[ApiKeyDependency])
+async def merge_batch(
+    files: List[UploadFile] = File(
+        ...,
+        description="Upload every PDF, JPG, or PNG part once; the manifest refers to them by filename.",
+    ),
+    manifest: str = Form(
+        ...,
+        description=(
+            "JSON list of output documents. Each object has 'files' (uploaded filenames "
+            "in order) and optional 'ranges', 'options' and 'output_name' as for /merge."
+        ),
+    ),
+    engine: Literal["auto", "pypdf", "pikepdf"] = Form(
+        "auto",
+        description="PDF processing backend for every output; 'auto' picks one per output.",
+    ),
+    placement: Literal["merge", "xobject"] = Form(
+        "merge", description="How resized pages are drawn, as for /merge."
+    ),
+    optimize: bool = Form(False, description="Optimize every output, as for /merge."),
+    max_image_dpi: Optional[int] = Form(
+        None,
+        description="Downsample embedded images above this DPI (36-1200), as for /merge.",
+        ge=36,
+        le=1200,
+    ),
+    image_quality: int = Form(
+        75,
+        description="JPG quality (1-100) used for images recompressed by max_image_dpi.",
+        ge=1,
+        le=100,
+    ),
+) -> Response:
+    if not files:
+        raise HTTPException(status_code=400, detail="No files uploaded.")
+    _validate_uploads(files)
+
+    try:
+        entries = json.loads(manifest)
+        if not isinstance(entries, list):
+            raise ValueError("manifest must be a JSON list of objects.")
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid manifest JSON: {exc}") from exc
+
+    from app.services.batch_merge import BatchMergeService
+
+    batch = BatchMergeService(
+        engine=engine,
+        placement=placement,
+        optimize=optimize,
+        max_image_dpi=max_image_dpi,
+        image_quality=image_quality,
+    )
+    return await batch.merge(files, entries)
+
+
+@router.post("/merge/to-images", response_class=StreamingResponse, dependencies=[ApiKeyDependency])
+async def merge_to_images(
+    files: List[UploadFile] = File(
+        ..., description="Upload PDF, JPG, or PNG files in desired order."
+    ),
+    ranges: Optional[str] = Form(
+        None, description='JSON list of page ranges per file, e.g. ["1-3,5",""]'
+    ),
+    options: Optional[str] = Form(
+        None,
+        description="JSON list of per-file layout options, as for /merge.",
+    ),
+    output_name: Optional[str] = Form(
+        "merged.pdf", description="Name of the merged document; the ZIP file is named after it."
+    ),
+    engine: Literal["auto", "pypdf", "pikepdf"] = Form(
+        "auto", description="PDF processing backend for the merge, as for /merge."
+    ),
+    placement: Literal["merge", "xobject"] = Form(
+        "merge", description="How resized pages are drawn, as for /merge."
+    ),
+    dpi: int = Form(
+        200, description="Resolution for rendering the merged pages (72-600).", ge=72, le=600
+    ),
+    quality: int = Form(85, description="JPG/WebP quality from 1-100.", ge=1, le=100),
+    target_size_mb: Optional[float] = Form(
+        None,
+        description="Optional output size budget in MB, as for /pdf-to-images.",
+        gt=0,
+        le=300,
+    ),
+    image_format: Literal["jpeg", "png", "webp", "tiff"] = Form(
+        "jpeg",
+        alias="format",
+        description="Output format: 'jpeg' (default), 'png', 'webp', or 'tiff' for a single multi-page TIFF.",
+    ),
+    png_compress_level: int = Form(6, description="PNG compression level from 0-9.", ge=0, le=9),
+    color_mode: Literal["rgb", "gray", "auto"] = Form(
+        "rgb", description="Color handling: 'rgb' (default), 'gray', or 'auto'."
+    ),
+) -> Response:
+    """
+    Merge the uploads and return the pages of the merged PDF as images in a ZIP file.
+
+    The merged PDF is rasterized on the server in the same worker call, so it
+    is not downloaded, uploaded again and re-parsed as with /merge followed by
+    /pdf-to-images.
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No files uploaded.")
+    _validate_uploads(files)
+    per_file_ranges = _parse_ranges(ranges, len(files))
+    per_file_options = _parse_options(options, len(files))
+
+    from app.services.pdf_merger import PdfMergerService
+    from app.services.pdf_to_images import PdfToImagesService
 
-    merger = PdfMergerService(engine=engine)
+    merger = PdfMergerService(engine=engine, placement=placement)
+    images = PdfToImagesService(
+        dpi=dpi,
+        quality=quality,
+        target_size_mb=target_size_mb,
+        image_format=image_format,
+        png_compress_level=png_compress_level,
+        color_mode=color_mode,
+    )
     await merger.append_files(files, per_file_ranges, per_file_options)
-    return merger.export(output_name)
+    response = await images.convert_rendered(
+        lambda: merger.render().getvalue(), output_name or "merged.pdf"
+    )
+    response.headers["X-PDF-Engine"] = merger.resolved_engine
+    return response
@@ -1,11 +1,12 @@
 # app/api/routes/pdf_to_images.py
-from typing import Optional
+import json
+from typing import List, Literal, Optional
 
 from fastapi import APIRouter, File, Form, HTTPException, UploadFile
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 from app.dependencies.security import ApiKeyDependency
-from app.services.pdf_to_images import PdfToImagesService
+from app.utils.document_volume import resolve_document_path
 
 router = APIRouter(prefix="/api/v1", tags=["pdf-to-images"])
 
@@ -16,7 +17,21 @@ router = APIRouter(prefix="/api/v1", tags=["pdf-to-images"])
     dependencies=[ApiKeyDependency]
 )
 async def convert_pdf_to_images(
-    file: UploadFile = File(..., description="Upload a single PDF file to convert to images"),
+    file: Optional[UploadFile] = File(None, description="Upload a single PDF file to convert to images"),
+    path: Optional[str] = Form(
+        None,
+        description=(
+            "PDF file relative to the server's document root, converted instead of an "
+            "upload. Requires PDF_MERGER_DOCUMENT_ROOT."
+        ),
+    ),
+    output_path: Optional[str] = Form(
+        None,
+        description=(
+            "Write the images into this directory under the document root and return "
+            "JSON instead of a ZIP file. Requires PDF_MERGER_DOCUMENT_ROOT."
+        ),
+    ),
     page_range: Optional[str] = Form(
         "",
         description='Page range specification (e.g., "1-3,5,7-9"). Leave empty for all pages.'
@@ -29,27 +44,76 @@ async def convert_pdf_to_images(
     ),
     quality: Optional[int] = Form(
         85,
-        description="JPG quality from 1-100. Higher values produce better quality but larger files.",
+        description="JPG/WebP quality from 1-100. Higher values produce better quality but larger files.",
         ge=1,
         le=100
     ),
-) -> StreamingResponse:
+    target_size_mb: Optional[float] = Form(
+        None,
+        description=(
+            "Optional output size budget in MB. DPI and quality are lowered up front "
+            "so that every selected page fits within the budget."
+        ),
+        gt=0,
+        le=300
+    ),
+    image_format: Literal["jpeg", "png", "webp", "tiff"] = Form(
+        "jpeg",
+        alias="format",
+        description="Output format: 'jpeg' (default), 'png', 'webp', or 'tiff' for a single multi-page TIFF.",
+    ),
+    png_compress_level: int = Form(
+        6,
+        description="PNG compression level from 0-9. Lower values are faster but produce larger files.",
+        ge=0,
+        le=9
+    ),
+    color_mode: Literal["rgb", "gray", "auto"] = Form(
+        "rgb",
+        description=(
+            "Color handling: 'rgb' (default), 'gray' to render every page in grayscale, "
+            "or 'auto' to render monochrome pages (e.g. scans) in grayscale."
+        ),
+    ),
+) -> Response:
     """
-    Convert PDF pages to JPG images and return as a ZIP file.
+    Convert PDF pages to images and return as a ZIP file.
 
     - **file**: The PDF file to convert
+    - **path**: Alternatively, a PDF below the server's document root
+    - **output_path**: Directory below the document root to write the images to instead
     - **page_range**: Pages to convert (e.g., "1-3,5" means pages 1,2,3,5). Empty = all pages
     - **dpi**: Image resolution (default: 200)
-    - **quality**: JPG quality 1-100 (default: 85)
+    - **quality**: JPG/WebP quality 1-100 (default: 85)
+    - **target_size_mb**: Optional output size budget; DPI and quality are reduced to fit
+    - **format**: jpeg, png, webp, or tiff (default: jpeg)
+    - **png_compress_level**: PNG compression level 0-9 (default: 6)
+    - **color_mode**: rgb, gray, or auto to detect monochrome pages (default: rgb)
 
     Returns a ZIP file containing the converted images.
     """
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="No file uploaded.")
+    if file is not None and path is not None:
+        raise HTTPException(
+            status_code=400,
+            detail="Provide either an uploaded file or a path, not both.",
+        )
+    local_path = resolve_document_path(path) if path is not None else None
+    output_dir = resolve_document_path(output_path, must_exist=False) if output_path else None
+    if output_dir is not None and local_path is None:
+        raise HTTPException(
+            status_code=400,
+            detail="output_path requires a path on the server's document volume.",
+        )
 
     # Validate file type
-    filename = file.filename.lower()
-    content_type = (file.content_type or "").lower()
+    if local_path is not None:
+        filename = local_path.name.lower()
+        content_type = ""
+    elif file is not None and file.filename:
+        filename = file.filename.lower()
+        content_type = (file.content_type or "").lower()
+    else:
+        raise HTTPException(status_code=400, detail="No file uploaded.")
 
     if not filename.endswith(".pdf") and content_type != "application/pdf":
         raise HTTPException(
@@ -57,6 +121,91 @@ async def convert_pdf_to_images(
             detail="Only PDF files are supported. Please upload a PDF file."
         )
 
+    # Services pull in the PDF libraries, so they are imported on first use
+    from app.services.pdf_to_images import PdfToImagesService
+
     # Create service and process
-    service = PdfToImagesService(dpi=dpi or 200, quality=quality or 85)
-    return await service.convert_pdf_to_images(file, page_range or "")
+    service = PdfToImagesService(
+        dpi=dpi or 200,
+        quality=quality or 85,
+        target_size_mb=target_size_mb,
+        image_format=image_format,
+        png_compress_level=png_compress_level,
+        color_mode=color_mode,
+    )
+    if file is not None:
+        return await service.convert_pdf_to_images(file, page_range or "")
+    if output_dir is None:
+        return await service.convert_path(local_path, page_range or "")
+
+    rendered = await service.save_images(local_path, page_range or "", output_dir)
+    return JSONResponse({
+        "output_path": output_path,
+        "pages_processed": rendered.pages_processed,
+        "pages_skipped": rendered.pages_skipped,
+        "output_size": rendered.output_size,
+    })
+
+
+@router.post(
+    "/pdf-to-images/batch",
+    response_class=StreamingResponse,
+    dependencies=[ApiKeyDependency]
+)
+async def convert_many_pdfs_to_images(
+    files: List[UploadFile] = File(..., description="Upload the PDF files to convert to images"),
+    page_ranges: Optional[str] = Form(
+        None,
+        description='JSON list of page ranges per file, e.g. ["1-3",""]. Empty = all pages.'
+    ),
+    dpi: Optional[int] = Form(200, description="Resolution for rendering PDF pages (72-600).", ge=72, le=600),
+    quality: Optional[int] = Form(85, description="JPG/WebP quality from 1-100.", ge=1, le=100),
+    target_size_mb: Optional[float] = Form(
+        None,
+        description="Optional size budget in MB for all documents together.",
+        gt=0,
+        le=300
+    ),
+    image_format: Literal["jpeg", "png", "webp", "tiff"] = Form(
+        "jpeg",
+        alias="format",
+        description="Output format: 'jpeg' (default), 'png', 'webp', or 'tiff' (one multi-page TIFF per document).",
+    ),
+    png_compress_level: int = Form(6, description="PNG compression level from 0-9.", ge=0, le=9),
+    color_mode: Literal["rgb", "gray", "auto"] = Form(
+        "rgb", description="Color handling: 'rgb' (default), 'gray', or 'auto'."
+    ),
+) -> StreamingResponse:
+    """
+    Convert several PDFs to images and return them as one ZIP file.
+
+    - **files**: The PDF files to convert
+    - **page_ranges**: JSON list of page ranges, one per file
+    - The other options are the same as for `/pdf-to-images` and apply to every file
+
+    Returns a ZIP file with one folder of images per document.
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No files uploaded.")
+
+    per_file_ranges: list[str] = []
+    if page_ranges:
+        try:
+            parsed = json.loads(page_ranges)
+            if not isinstance(parsed, list):
+                raise ValueError("page_ranges must be a JSON list of strings.")
+            per_file_ranges = [value if isinstance(value, str) else "" for value in parsed]
+        except Exception as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid page_ranges JSON: {exc}") from exc
+
+    from app.services.pdf_to_images import PdfToImagesService
+
+    service = PdfToImagesService(
+        dpi=dpi or 200,
+        quality=quality or 85,
+        target_size_mb=target_size_mb,
+        image_format=image_format,
+        png_compress_level=png_compress_level,
+        color_mode=color_mode,
+    )
+    return await service.convert_many(files, per_file_ranges)
@@ -0,0 +1,46 @@
+import json
+from typing import Optional
+
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+
+from app.dependencies.security import ApiKeyDependency
+
+router = APIRouter(prefix="/api/v1", tags=["split"])
+
+
+@router.post("/split", response_class=StreamingResponse, dependencies=[ApiKeyDependency])
+async def split_pdf(
+    file: UploadFile = File(..., description="Upload a single PDF file to split"),
+    groups: Optional[str] = Form(
+        None,
+        description='JSON list of page ranges, one per output document, e.g. ["1-3","4-10","last"]',
+    ),
+    every: Optional[int] = Form(
+        None,
+        description="Split into consecutive documents of this many pages each.",
+        ge=1,
+    ),
+    output_name: Optional[str] = Form(None, description="Filename of the returned ZIP file"),
+) -> StreamingResponse:
+    """
+    Split a PDF into several PDFs and return them as a ZIP file.
+
+    Provide either ``groups`` or ``every``. The ZIP is streamed while the
+    parts are being built.
+    """
+    parsed_groups: Optional[list[str]] = None
+    if groups:
+        try:
+            parsed = json.loads(groups)
+            if not isinstance(parsed, list) or not all(isinstance(value, str) for value in parsed):
+                raise ValueError("groups must be a JSON list of strings.")
+            parsed_groups = parsed
+        except Exception as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid groups JSON: {exc}") from exc
+
+    # Services pull in the PDF libraries, so they are imported on first use
+    from app.services.pdf_splitter import PdfSplitterService
+
+    splitter = PdfSplitterService(groups=parsed_groups, every=every)
+    return await splitter.split(file, output_name)
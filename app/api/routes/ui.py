@@ -1,76 +1,94 @@
 # app/api/routes/ui.py
+from collections import OrderedDict
 from datetime import datetime
+from typing import Any, Hashable
 
 from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.templating import Jinja2Templates
 
 from app.core.config import settings  # 네 config.py에 Settings가 있다고 가정
 from app.utils.i18n import detect_locale, get_translations
+from app.utils.static_assets import REVALIDATE_CACHE_CONTROL, CachedBody, get_static_assets
 
 router = APIRouter(prefix="/pdf-merger", tags=["ui"])
 pdf_to_images_router = APIRouter(prefix="", tags=["ui"])
 templates = Jinja2Templates(directory="app/templates")
+templates.env.globals["asset_path"] = lambda path: get_static_assets().url_path(path)
 
-@router.get("/", response_class=HTMLResponse)
-async def index(request: Request) -> HTMLResponse:
+# 렌더링된 페이지 캐시: (템플릿, 로케일, 기준 URL, 연도, 설정) -> 본문
+_PAGE_CACHE_SIZE = 32
+_page_cache: "OrderedDict[Hashable, CachedBody]" = OrderedDict()
+
+
+# 페이지별로 템플릿에 내려줄 기본값
+_INDEX_DEFAULTS = {
+    "output_name": "merged.pdf",
+    "paper_size": "auto",
+    "orientation": "auto",
+    "fit_mode": "auto",
+    "engine": "auto",
+}
+_PDF_TO_IMAGES_DEFAULTS = {
+    "dpi": 200,
+    "quality": 85,
+}
+
+
+def _render_page(request: Request, template_name: str, defaults: dict[str, Any]) -> Response:
     """
-    메인 업로드/병합 UI 페이지 (Jinja 템플릿 사용)
+    템플릿을 한 번만 렌더링해 압축본과 함께 캐시하고, 연도나 설정이 바뀌면 다시 렌더링.
+    캐시에 있는 페이지는 템플릿 컨텍스트를 만들지 않고 바로 응답(또는 304)
     """
     locale = detect_locale(request)
-    translations = get_translations(locale)
-
-    return templates.TemplateResponse(
-        "index.html",
-        {
+    current_year = datetime.now().year
+    key = (
+        template_name,
+        locale,
+        str(request.base_url),
+        current_year,
+        bool(settings.api_key),
+        settings.max_total_upload_mb,
+    )
+    body = _page_cache.get(key)
+    if body is None:
+        translations = get_translations(locale)
+        context = {
             "request": request,
             "locale": locale,
             "t": translations["template"],
             "client_translations": translations["client"],
-            "current_year": datetime.now().year,
-            # 템플릿에 내려줄 기본값/플래그
-            "defaults": {
-                "output_name": "merged.pdf",
-                "paper_size": "auto",
-                "orientation": "auto",
-                "fit_mode": "auto",
-                "engine": "pypdf",
-            },
+            "current_year": current_year,
+            "defaults": defaults,
+            # 템플릿에 내려줄 플래그
             "feature_flags": {
                 "api_key_required": bool(settings.api_key),
             },
             "limits": {
                 "total_upload_mb": settings.max_total_upload_mb,
             },
-        },
-    )
+        }
+        html = templates.get_template(template_name).render(context)
+        body = CachedBody.from_bytes(html.encode("utf-8"), "text/html; charset=utf-8")
+        _page_cache[key] = body
+        if len(_page_cache) > _PAGE_CACHE_SIZE:
+            _page_cache.popitem(last=False)
+    else:
+        _page_cache.move_to_end(key)
+    return body.response(request.headers, REVALIDATE_CACHE_CONTROL, extra_vary="Accept-Language")
+
+
+@router.get("/", response_class=HTMLResponse)
+async def index(request: Request) -> Response:
+    """
+    메인 업로드/병합 UI 페이지 (Jinja 템플릿 사용)
+    """
+    return _render_page(request, "index.html", _INDEX_DEFAULTS)
 
 
 @pdf_to_images_router.get("/pdf-to-images", response_class=HTMLResponse)
-async def pdf_to_images(request: Request) -> HTMLResponse:
+async def pdf_to_images(request: Request) -> Response:
     """
     PDF to Images conversion UI page
     """
-    locale = detect_locale(request)
-    translations = get_translations(locale)
-
-    return templates.TemplateResponse(
-        "pdf_to_images.html",
-        {
-            "request": request,
-            "locale": locale,
-            "t": translations["template"],
-            "client_translations": translations["client"],
-            "current_year": datetime.now().year,
-            "defaults": {
-                "dpi": 200,
-                "quality": 85,
-            },
-            "feature_flags": {
-                "api_key_required": bool(settings.api_key),
-            },
-            "limits": {
-                "total_upload_mb": settings.max_total_upload_mb,
-            },
-        },
-    )
+    return _render_page(request, "pdf_to_images.html", _PDF_TO_IMAGES_DEFAULTS)
@@ -0,0 +1,55 @@
+# app/api/routes/uploads.py
+from fastapi import APIRouter, File, Header, Query, UploadFile
+from fastapi.responses import Response
+
+from app.dependencies.security import ApiKeyDependency
+from app.services.thumbnails import ThumbnailService, get_thumbnail_service
+
+router = APIRouter(prefix="/api/v1", tags=["uploads"])
+
+
+@router.post("/uploads", dependencies=[ApiKeyDependency])
+async def create_upload(
+    file: UploadFile = File(..., description="Upload a PDF, JPG, or PNG file to preview"),
+) -> dict[str, object]:
+    """
+    Store a file on the server so that its pages can be previewed.
+
+    Returns the document id (a content hash), the filename and the page count.
+    Uploads are kept in memory and dropped least recently used first.
+    """
+    return await get_thumbnail_service().store_upload(file)
+
+
+@router.get(
+    "/uploads/{document_id}/pages/{page_number}/thumbnail",
+    response_class=Response,
+    dependencies=[ApiKeyDependency],
+)
+async def get_page_thumbnail(
+    document_id: str,
+    page_number: int,
+    width: int = Query(
+        200,
+        description="Preview width in pixels (16-1024).",
+        ge=ThumbnailService.MIN_WIDTH,
+        le=ThumbnailService.MAX_WIDTH,
+    ),
+    if_none_match: str | None = Header(default=None),
+) -> Response:
+    """
+    Return a JPG preview of one page (1-based) of an uploaded document.
+
+    Previews are cached per (document, page, width) and carry an ETag, so
+    repeated requests are answered from memory or with 304 Not Modified.
+    """
+    service = get_thumbnail_service()
+    # An ETag only stands for a preview while its upload is still stored
+    service.check_page(document_id, page_number)
+    etag = ThumbnailService.etag(document_id, page_number, width)
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+
+    thumbnail = await service.render_thumbnail(document_id, page_number, width)
+    return Response(content=thumbnail, media_type="image/jpeg", headers=headers)
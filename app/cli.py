@@ -0,0 +1,438 @@
+"""Command line entry point for offline merges and conversions.
+
+Runs the merge and PDF-to-Images services directly on local files, without
+HTTP or upload limits::
+
+    python -m app.cli merge --manifest jobs.json --output-dir out/
+    python -m app.cli merge "scans/*.pdf" cover.pdf -o bundle.pdf
+    python -m app.cli to-images "archive/**/*.pdf" --output-dir images/ --dpi 150
+    python -m app.cli benchmark
+
+Jobs are spread across a process pool. Ranges and layout options have the
+same syntax and meaning as in the API. ``benchmark`` times both merge
+engines on this machine, which calibrates ``engine="auto"``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import io
+import json
+import mmap
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Any, Optional, Sequence
+
+from fastapi import HTTPException
+
+
+@dataclass
+class MergeJob:
+    output: Path
+    files: list[Path]
+    ranges: list[str] = field(default_factory=list)
+    options: list[dict[str, str]] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return str(self.output)
+
+
+@dataclass
+class ImagesJob:
+    file: Path
+    page_range: str
+    output_dir: Path
+
+    @property
+    def name(self) -> str:
+        return str(self.file)
+
+
+@dataclass
+class JobResult:
+    name: str
+    pages: int = 0
+    input_bytes: int = 0
+    output_bytes: int = 0
+    failed: bool = False
+    error: Optional[str] = None
+
+
+def _run_merge(job: MergeJob, service_options: dict[str, Any]) -> JobResult:
+    from app.services.pdf_merger import PdfMergerService
+    from app.utils.document_volume import map_document
+
+    result = JobResult(name=job.name)
+    maps: list[bytes | mmap.mmap] = []
+    try:
+        merger = PdfMergerService(**service_options)
+        for index, path in enumerate(job.files):
+            data = map_document(path)
+            maps.append(data)
+            result.input_bytes += len(data)
+            result.pages += merger.add_document(
+                path.name,
+                data,
+                job.ranges[index] if index < len(job.ranges) else "",
+                job.options[index] if index < len(job.options) else None,
+            )
+        buffer = merger.render()
+        job.output.parent.mkdir(parents=True, exist_ok=True)
+        job.output.write_bytes(buffer.getbuffer())
+        result.output_bytes = job.output.stat().st_size
+    except HTTPException as exc:
+        result.failed, result.error = True, str(exc.detail)
+    except OSError as exc:
+        result.failed, result.error = True, str(exc)
+    finally:
+        for data in maps:
+            if isinstance(data, mmap.mmap):
+                data.close()
+    return result
+
+
+def _run_images(job: ImagesJob, service_options: dict[str, Any]) -> JobResult:
+    from app.services.pdf_to_images import PdfToImagesService
+
+    result = JobResult(name=job.name)
+    try:
+        result.input_bytes = job.file.stat().st_size
+        rendered = PdfToImagesService(**service_options).convert_file(
+            job.file, job.page_range, job.output_dir
+        )
+        result.pages = rendered.pages_processed
+        result.output_bytes = rendered.output_size
+        if rendered.pages_skipped:
+            result.error = f"{rendered.pages_skipped} page(s) skipped due to output size limit"
+    except HTTPException as exc:
+        result.failed, result.error = True, str(exc.detail)
+    except OSError as exc:
+        result.failed, result.error = True, str(exc)
+    return result
+
+
+def _expand(patterns: Sequence[str]) -> list[Path]:
+    paths: list[Path] = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if not matches and not glob.has_magic(pattern):
+            matches = [pattern]
+        paths.extend(Path(match) for match in matches)
+    return paths
+
+
+def _load_manifest(path: Path) -> list[dict[str, Any]]:
+    entries = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+        raise SystemExit(f"{path}: manifest must be a JSON list of objects")
+    return entries
+
+
+def _merge_jobs(args: argparse.Namespace) -> list[MergeJob]:
+    if args.manifest is None:
+        files = _expand(args.inputs)
+        if not files:
+            raise SystemExit("merge: no input files")
+        return [MergeJob(output=Path(args.output), files=files)]
+
+    base = args.manifest.parent
+    output_dir = Path(args.output_dir)
+    entries = _load_manifest(args.manifest)
+    if not entries:
+        raise SystemExit(f"{args.manifest}: manifest has no entries")
+    jobs: list[MergeJob] = []
+    names: set[str] = set()
+    for index, entry in enumerate(entries, start=1):
+        # Only the final path component is kept, so outputs stay in output_dir
+        name = PurePosixPath(str(entry.get("output_name") or "").replace("\\", "/")).name
+        if name in ("", ".", ".."):
+            name = f"merged_{index:03d}.pdf"
+        if not name.lower().endswith(".pdf"):
+            name += ".pdf"
+        if name in names:
+            raise SystemExit(f"{args.manifest}: duplicate output name {name}")
+        names.add(name)
+        jobs.append(
+            MergeJob(
+                output=output_dir / name,
+                files=[base / str(part) for part in entry.get("files") or []],
+                ranges=[str(value or "") for value in entry.get("ranges") or []],
+                options=[
+                    {key: str(raw.get(key, "")) for key in ("paper_size", "orientation", "fit_mode")}
+                    if isinstance(raw, dict) else {}
+                    for raw in entry.get("options") or []
+                ],
+            )
+        )
+    return jobs
+
+
+def _images_jobs(args: argparse.Namespace) -> list[ImagesJob]:
+    output_dir = Path(args.output_dir)
+    entries: list[tuple[Path, str]]
+    if args.manifest is not None:
+        base = args.manifest.parent
+        entries = [
+            (base / str(entry.get("file", "")), str(entry.get("page_range") or ""))
+            for entry in _load_manifest(args.manifest)
+        ]
+    else:
+        entries = [(path, args.page_range) for path in _expand(args.inputs)]
+    if not entries:
+        raise SystemExit("to-images: no input files")
+
+    jobs: list[ImagesJob] = []
+    folders: set[str] = set()
+    for path, page_range in entries:
+        folder = path.stem
+        suffix = 2
+        while folder in folders:
+            folder = f"{path.stem}_{suffix}"
+            suffix += 1
+        folders.add(folder)
+        jobs.append(ImagesJob(file=path, page_range=page_range, output_dir=output_dir / folder))
+    return jobs
+
+
+def _run_jobs(runner: Any, jobs: Sequence[Any], service_options: dict[str, Any], workers: int) -> int:
+    started = time.perf_counter()
+    results: list[JobResult] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(runner, job, service_options): job for job in jobs}
+        for number, future in enumerate(as_completed(futures), start=1):
+            try:
+                result = future.result()
+            except Exception as exc:
+                # An unexpected error (or a crashed worker) fails only this job
+                result = JobResult(
+                    name=futures[future].name, failed=True, error=f"{type(exc).__name__}: {exc}"
+                )
+            results.append(result)
+            if result.failed:
+                print(f"[{number}/{len(jobs)}] FAILED {result.name}: {result.error}")
+            else:
+                detail = f" ({result.error})" if result.error else ""
+                print(f"[{number}/{len(jobs)}] ok {result.name}: {result.pages} page(s){detail}")
+    elapsed = max(time.perf_counter() - started, 1e-9)
+
+    failed = [result for result in results if result.failed]
+    pages = sum(result.pages for result in results if not result.failed)
+    read_mb = sum(result.input_bytes for result in results) / (1024 * 1024)
+    written_mb = sum(result.output_bytes for result in results) / (1024 * 1024)
+    print(
+        f"\n{len(results) - len(failed)}/{len(results)} job(s) succeeded in {elapsed:.1f}s "
+        f"with {workers} worker(s)\n"
+        f"{pages} page(s), {pages / elapsed:.1f} pages/s, {len(results) / elapsed:.2f} jobs/s\n"
+        f"read {read_mb:.1f} MB ({read_mb / elapsed:.1f} MB/s), "
+        f"wrote {written_mb:.1f} MB ({written_mb / elapsed:.1f} MB/s)"
+    )
+    return 1 if failed else 0
+
+
+def _synthetic_pdf(pages: int) -> bytes:
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for number in range(pages):
+        page = writer.add_blank_page(width=595, height=842)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font}),
+        })
+        lines = "".join(f"0 -14 Td (Page {number + 1}, line {line + 1}) Tj " for line in range(40))
+        content = DecodedStreamObject()
+        content.set_data(f"BT /F1 11 Tf 72 800 Td {lines}ET".encode("ascii"))
+        page.replace_contents(content)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def _time_merge(engine: str, documents: Sequence[bytes], options: Optional[dict[str, str]], repeat: int) -> tuple[float, str]:
+    from app.services.pdf_merger import PdfMergerService
+
+    best = float("inf")
+    resolved = engine
+    for _ in range(repeat):
+        started = time.perf_counter()
+        merger = PdfMergerService(engine=engine)  # type: ignore[arg-type]
+        for data in documents:
+            merger.add_document("benchmark.pdf", data, "", options)
+        merger.render()
+        best = min(best, time.perf_counter() - started)
+        resolved = merger.resolved_engine
+    return best, resolved
+
+
+def _run_benchmark(args: argparse.Namespace) -> int:
+    from app.services.pdf_merger import _AUTO_COLD_IMPORT_BYTES, _load_pikepdf
+
+    if _load_pikepdf() is None:
+        print("error: pikepdf is not installed, so there is nothing to compare", file=sys.stderr)
+        return 2
+
+    cases: list[tuple[str, list[bytes]]] = []
+    for pages in (1, 10, 100, 1000):
+        document = _synthetic_pdf(pages)
+        # Distinct inputs, so that neither engine can reuse a parsed document
+        cases.append((f"3 x {pages} page(s)", [document + b"\n" * copy for copy in range(3)]))
+    inputs = _expand(args.inputs)
+    if inputs:
+        cases.append((f"{len(inputs)} input file(s)", [path.read_bytes() for path in inputs]))
+
+    print(f"{'case':<20} {'layout':<7} {'MB':>7} {'pypdf ms':>10} {'pikepdf ms':>11} {'auto':>8}")
+    saved = 0.0
+    copied = 0
+    for name, documents in cases:
+        size = sum(len(data) for data in documents)
+        for layout, options in (("keep", None), ("A4", {"paper_size": "A4"})):
+            pypdf_time, _ = _time_merge("pypdf", documents, options, args.repeat)
+            pikepdf_time, _ = _time_merge("pikepdf", documents, options, args.repeat)
+            _, chosen = _time_merge("auto", documents, options, 1)
+            print(
+                f"{name:<20} {layout:<7} {size / (1024 * 1024):>7.2f} "
+                f"{pypdf_time * 1000:>10.1f} {pikepdf_time * 1000:>11.1f} {chosen:>8}"
+            )
+            if options is None:
+                saved += pypdf_time - pikepdf_time
+                copied += size
+
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import pikepdf"], check=True)
+    with_import = time.perf_counter() - started
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    import_time = max(with_import - (time.perf_counter() - started), 0.0)
+
+    print(f"\npikepdf import: {import_time * 1000:.0f} ms")
+    if saved > 0:
+        print(
+            f"qpdf saves {saved / copied * 1024 * 1024 * 1000:.1f} ms per MB of unchanged pages; "
+            f"break-even for a cold import at {import_time / saved * copied / (1024 * 1024):.1f} MB "
+            f"(_AUTO_COLD_IMPORT_BYTES is {_AUTO_COLD_IMPORT_BYTES / (1024 * 1024):.1f} MB)"
+        )
+    return 0
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: CPU count)",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    merge = commands.add_parser(
+        "merge",
+        help="Merge files into PDFs",
+        description=(
+            "Merge the given files (paths or glob patterns, in order) into one PDF, "
+            "or run every entry of a manifest in the format of /api/v1/merge/batch "
+            "with file paths relative to the manifest."
+        ),
+    )
+    merge.add_argument("inputs", nargs="*", help="PDF, JPG or PNG files or glob patterns")
+    merge.add_argument("--manifest", type=Path, help="JSON manifest of output documents")
+    merge.add_argument("-o", "--output", default="merged.pdf", help="Output file without a manifest")
+    merge.add_argument("--output-dir", default=".", help="Output directory for manifest entries")
+    merge.add_argument("--engine", choices=("auto", "pypdf", "pikepdf"), default="auto")
+    merge.add_argument("--placement", choices=("merge", "xobject"), default="merge")
+    merge.add_argument("--optimize", action="store_true")
+    merge.add_argument("--max-image-dpi", type=int)
+    merge.add_argument("--image-quality", type=int, default=75)
+    merge.add_argument("--linearize", action="store_true")
+    merge.add_argument(
+        "--object-streams", choices=("preserve", "disable", "generate"), default="preserve"
+    )
+
+    images = commands.add_parser(
+        "to-images",
+        help="Convert PDFs to images",
+        description=(
+            "Convert PDFs (paths or glob patterns, or a manifest of "
+            '{"file": ..., "page_range": ...} objects) to images, one folder per document.'
+        ),
+    )
+    images.add_argument("inputs", nargs="*", help="PDF files or glob patterns")
+    images.add_argument("--manifest", type=Path, help="JSON manifest of input documents")
+    images.add_argument("--output-dir", default=".", help="Directory for the document folders")
+    images.add_argument("--page-range", default="", help="Pages of every input without a manifest")
+    images.add_argument("--dpi", type=int, default=200)
+    images.add_argument("--quality", type=int, default=85)
+    images.add_argument("--target-size-mb", type=float)
+    images.add_argument("--format", dest="image_format", choices=("jpeg", "png", "webp", "tiff"), default="jpeg")
+    images.add_argument("--png-compress-level", type=int, default=6)
+    images.add_argument("--color-mode", choices=("rgb", "gray", "auto"), default="rgb")
+
+    benchmark = commands.add_parser(
+        "benchmark",
+        help="Compare the merge engines",
+        description=(
+            "Time pypdf and pikepdf merges of generated documents (and of the given "
+            "files), with pages kept as they are and resized to A4, and show what "
+            "engine=auto picks for each."
+        ),
+    )
+    benchmark.add_argument("inputs", nargs="*", help="Extra PDF files or glob patterns")
+    benchmark.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is kept)")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = _build_parser().parse_args(argv)
+    workers = max(1, args.workers)
+
+    try:
+        if args.command == "benchmark":
+            return _run_benchmark(args)
+        if args.command == "merge":
+            service_options: dict[str, Any] = {
+                "engine": args.engine,
+                "placement": args.placement,
+                "optimize": args.optimize,
+                "max_image_dpi": args.max_image_dpi,
+                "image_quality": args.image_quality,
+                "linearize": args.linearize,
+                "object_streams": args.object_streams,
+            }
+            from app.services.pdf_merger import PdfMergerService
+
+            # Reject bad options once instead of in every worker
+            PdfMergerService(**service_options)
+            jobs: Sequence[Any] = _merge_jobs(args)
+            return _run_jobs(_run_merge, jobs, service_options, min(workers, len(jobs)))
+
+        service_options = {
+            "dpi": args.dpi,
+            "quality": args.quality,
+            "target_size_mb": args.target_size_mb,
+            "image_format": args.image_format,
+            "png_compress_level": args.png_compress_level,
+            "color_mode": args.color_mode,
+        }
+        from app.services.pdf_to_images import PdfToImagesService
+
+        PdfToImagesService(**service_options)
+        jobs = _images_jobs(args)
+        return _run_jobs(_run_images, jobs, service_options, min(workers, len(jobs)))
+    except HTTPException as exc:
+        print(f"error: {exc.detail}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
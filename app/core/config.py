@@ -28,9 +28,89 @@ class Settings(BaseSettings):
         ),
     )
 
-    @field_validator("pdf_merge_max_parallel", mode="before")
+    max_render_pixels: int = Field(
+        default=40_000_000,
+        validation_alias=AliasChoices(
+            "MAX_RENDER_PIXELS",
+            "PDF_MERGER_MAX_RENDER_PIXELS",
+        ),
+    )
+
+    preview_upload_cache_mb: int = Field(
+        default=256,
+        validation_alias=AliasChoices(
+            "PREVIEW_UPLOAD_CACHE_MB",
+            "PDF_MERGER_PREVIEW_UPLOAD_CACHE_MB",
+        ),
+    )
+    preview_thumbnail_cache_entries: int = Field(
+        default=2048,
+        validation_alias=AliasChoices(
+            "PREVIEW_THUMBNAIL_CACHE_ENTRIES",
+            "PDF_MERGER_PREVIEW_THUMBNAIL_CACHE_ENTRIES",
+        ),
+    )
+
+    image_decode_dpi: int = Field(
+        default=300,
+        validation_alias=AliasChoices(
+            "IMAGE_DECODE_DPI",
+            "PDF_MERGER_IMAGE_DECODE_DPI",
+        ),
+    )
+    max_image_pixels: int = Field(
+        default=150_000_000,
+        validation_alias=AliasChoices(
+            "MAX_IMAGE_PIXELS",
+            "PDF_MERGER_MAX_IMAGE_PIXELS",
+        ),
+    )
+
+    pdf_compression_level: int | None = Field(
+        default=None,
+        ge=0,
+        le=9,
+        validation_alias=AliasChoices(
+            "PDF_COMPRESSION_LEVEL",
+            "PDF_MERGER_PDF_COMPRESSION_LEVEL",
+        ),
+    )
+
+    admin_api_key: str | None = Field(
+        default=None,
+        validation_alias=AliasChoices("ADMIN_API_KEY", "PDF_MERGER_ADMIN_API_KEY"),
+    )
+    profile_dir: str | None = Field(
+        default=None,
+        validation_alias=AliasChoices("PROFILE_DIR", "PDF_MERGER_PROFILE_DIR"),
+    )
+    profile_keep: int = Field(
+        default=50,
+        ge=1,
+        validation_alias=AliasChoices("PROFILE_KEEP", "PDF_MERGER_PROFILE_KEEP"),
+    )
+
+    document_root: str | None = Field(
+        default=None,
+        validation_alias=AliasChoices("DOCUMENT_ROOT", "PDF_MERGER_DOCUMENT_ROOT"),
+    )
+
+    warmup: bool = Field(
+        default=False,
+        validation_alias=AliasChoices("WARMUP", "PDF_MERGER_WARMUP"),
+    )
+    startup_budget_seconds: float | None = Field(
+        default=None,
+        gt=0,
+        validation_alias=AliasChoices(
+            "STARTUP_BUDGET_SECONDS",
+            "PDF_MERGER_STARTUP_BUDGET_SECONDS",
+        ),
+    )
+
+    @field_validator("pdf_merge_max_parallel", "pdf_compression_level", mode="before")
     @classmethod
-    def _coerce_pdf_merge_max_parallel(cls, value: object) -> int | None:
+    def _coerce_optional_int(cls, value: object) -> int | None:
         if value in (None, ""):
             return None
 
@@ -39,5 +119,16 @@ class Settings(BaseSettings):
         except (TypeError, ValueError):
             return None
 
+    @field_validator("startup_budget_seconds", mode="before")
+    @classmethod
+    def _coerce_optional_float(cls, value: object) -> float | None:
+        if value in (None, ""):
+            return None
+
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
 
 settings = Settings()
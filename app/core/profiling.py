@@ -0,0 +1,220 @@
+"""On-demand profiling of single requests for administrators."""
+
+from __future__ import annotations
+
+import cProfile
+import json
+import pstats
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+# Number of functions and allocation sites kept in a report
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 20
+# Frames kept per allocation by tracemalloc
+TRACEMALLOC_FRAMES = 10
+
+_PROFILE_ID = re.compile(r"[0-9a-f]{32}")
+
+_active_session: ContextVar[Optional["ProfileSession"]] = ContextVar(
+    "profile_session", default=None
+)
+# tracemalloc is process-wide, so only one request is profiled at a time
+# per worker process. It still sees the allocations of unprofiled requests
+# running alongside, so memory figures only describe the profiled request
+# when it ran alone.
+_session_lock = threading.Lock()
+
+
+class ProfileSession:
+    """Profile of one request.
+
+    Work the request runs on worker threads is recorded by a deterministic
+    profiler, memory by tracemalloc, and the services add the time spent in
+    their stages.
+    """
+
+    def __init__(self) -> None:
+        self.id = uuid.uuid4().hex
+        self.created_at = datetime.now(timezone.utc)
+        self.profiler = cProfile.Profile()
+        self.stages: dict[str, float] = {}
+        self._started = time.perf_counter()
+        self._elapsed: Optional[float] = None
+        self._peak_bytes = 0
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._snapshot_bytes = 0
+
+    @contextmanager
+    def worker(self) -> Iterator[None]:
+        """Profile the calling thread for the duration of the block."""
+
+        token = _active_session.set(self)
+        self.profiler.enable()
+        try:
+            yield
+        finally:
+            self.profiler.disable()
+            _active_session.reset(token)
+            # Worker calls end while their results are still referenced, so
+            # the largest of these snapshots shows where the memory went
+            current, _ = tracemalloc.get_traced_memory()
+            if current > self._snapshot_bytes:
+                self._snapshot_bytes = current
+                self._snapshot = tracemalloc.take_snapshot()
+
+    def stop(self) -> None:
+        self._elapsed = time.perf_counter() - self._started
+        self._peak_bytes = tracemalloc.get_traced_memory()[1]
+
+    def report(self, method: str, path: str, status_code: int) -> dict[str, Any]:
+        stats = pstats.Stats(self.profiler)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)  # type: ignore[attr-defined]
+        functions = [
+            {
+                "function": f"{filename}:{line}({name})",
+                "calls": calls,
+                "total_seconds": round(total, 6),
+                "cumulative_seconds": round(cumulative, 6),
+            }
+            for (filename, line, name), (_, calls, total, cumulative, _) in rows[:TOP_FUNCTIONS]
+        ]
+
+        allocations: list[dict[str, Any]] = []
+        if self._snapshot is not None:
+            for stat in self._snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+                frame = stat.traceback[0]
+                allocations.append({
+                    "location": f"{frame.filename}:{frame.lineno}",
+                    "size_bytes": stat.size,
+                    "count": stat.count,
+                })
+
+        return {
+            "id": self.id,
+            "created_at": self.created_at.isoformat(),
+            "method": method,
+            "path": path,
+            "status_code": status_code,
+            "wall_seconds": round(self._elapsed or 0.0, 6),
+            "stages": {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            "memory": {
+                "peak_bytes": self._peak_bytes,
+                "largest_snapshot_bytes": self._snapshot_bytes,
+                "top_allocations": allocations,
+            },
+            "functions": functions,
+        }
+
+
+def begin_profile() -> Optional[ProfileSession]:
+    """Start profiling the current request, or return ``None`` if another one is being profiled."""
+
+    if not _session_lock.acquire(blocking=False):
+        return None
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    session = ProfileSession()
+    _active_session.set(session)
+    return session
+
+
+def end_profile(session: ProfileSession) -> None:
+    session.stop()
+    _active_session.set(None)
+    tracemalloc.stop()
+    _session_lock.release()
+
+
+def profiled(func: Callable[..., T]) -> Callable[..., T]:
+    """Return ``func`` wrapped to be profiled when the current request is.
+
+    Call this on the event loop, where the request's context is current,
+    and hand the result to ``to_thread.run_sync``.
+    """
+    session = _active_session.get()
+    if session is None:
+        return func
+
+    @wraps(func)
+    def run(*args: Any) -> T:
+        with session.worker():
+            return func(*args)
+
+    return run
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Add the time spent in the block to a stage of the request being profiled, if any."""
+
+    session = _active_session.get()
+    if session is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        session.stages[name] = session.stages.get(name, 0.0) + time.perf_counter() - started
+
+
+def profile_directory() -> Path:
+    if settings.profile_dir:
+        return Path(settings.profile_dir)
+    return Path(tempfile.gettempdir()) / "pdf-merger-profiles"
+
+
+def save_profile(session: ProfileSession, method: str, path: str, status_code: int) -> Path:
+    """Store the report as ``<id>.json`` and the raw profile as ``<id>.prof``.
+
+    Only the newest ``profile_keep`` profiles are kept; older ones are deleted.
+    """
+
+    directory = profile_directory()
+    directory.mkdir(parents=True, exist_ok=True)
+    session.profiler.dump_stats(str(directory / f"{session.id}.prof"))
+    target = directory / f"{session.id}.json"
+    target.write_text(
+        json.dumps(session.report(method, path, status_code), indent=2), encoding="utf-8"
+    )
+    _prune_profiles(directory, settings.profile_keep)
+    return target
+
+
+def _prune_profiles(directory: Path, keep: int) -> None:
+    reports: list[tuple[int, Path]] = []
+    for report in directory.glob("*.json"):
+        if not _PROFILE_ID.fullmatch(report.stem):
+            continue
+        try:
+            reports.append((report.stat().st_mtime_ns, report))
+        except FileNotFoundError:
+            # Pruned by another worker process sharing the directory
+            continue
+    reports.sort(reverse=True)
+    for _, report in reports[keep:]:
+        report.unlink(missing_ok=True)
+        report.with_suffix(".prof").unlink(missing_ok=True)
+
+
+def find_profile(profile_id: str, suffix: str) -> Optional[Path]:
+    """Return the stored ``.json`` or ``.prof`` file of a profile, if it exists."""
+
+    if not _PROFILE_ID.fullmatch(profile_id):
+        return None
+    path = profile_directory() / f"{profile_id}{suffix}"
+    return path if path.is_file() else None
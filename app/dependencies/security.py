@@ -1,3 +1,5 @@
+import secrets
+
 from fastapi import Depends, Header, HTTPException
 
 from app.core.config import settings
@@ -11,3 +13,15 @@ async def verify_api_key(x_api_key: str | None = Header(default=None, convert_un
 
 
 ApiKeyDependency = Depends(verify_api_key)
+
+
+async def verify_admin_key(x_admin_key: str | None = Header(default=None)) -> None:
+    """Validate the admin key header; admin access is disabled unless a key is configured."""
+
+    if not settings.admin_api_key or not secrets.compare_digest(
+        x_admin_key or "", settings.admin_api_key
+    ):
+        raise HTTPException(status_code=403, detail="Invalid admin key")
+
+
+AdminKeyDependency = Depends(verify_admin_key)
@@ -1,23 +1,56 @@
+import secrets
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from anyio import to_thread
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
 
-from app.api.routes import health, merge, pdf_to_images, ui
+from app.api.routes import admin, health, merge, pdf_to_images, split, ui, uploads
 from app.core.config import settings
+from app.core.profiling import begin_profile, end_profile, save_profile
+from app.services.warmup import check_startup_budget, warm_up
+from app.utils.request_encoding import DecompressRequestMiddleware
+from app.utils.static_assets import PrecompressedStaticFiles, get_static_assets
+
+UPLOAD_PATHS = (
+    "/api/v1/merge",
+    "/api/v1/merge/append",
+    "/api/v1/merge/batch",
+    "/api/v1/merge/to-images",
+    "/api/v1/pdf-to-images",
+    "/api/v1/pdf-to-images/batch",
+    "/api/v1/split",
+    "/api/v1/uploads",
+)
+# Requests an administrator may run under the profiler with the X-Profile header
+PROFILED_PATHS = ("/api/v1/merge", "/api/v1/pdf-to-images")
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Internal PDF Merger", version="1.0.0")
-    app.mount("/static", StaticFiles(directory="app/static"), name="static") 
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        # The server only accepts connections once this returns
+        if settings.warmup:
+            await to_thread.run_sync(warm_up)
+        check_startup_budget()
+        yield
+
+    app = FastAPI(title="Internal PDF Merger", version="1.0.0", lifespan=lifespan)
+    app.mount("/static", PrecompressedStaticFiles(get_static_assets()), name="static")
 
     # Redirect root path to UI entrypoint
     @app.get("/", include_in_schema=False)
     async def root_redirect():
         return RedirectResponse(url="/pdf-merger/", status_code=307)
 
+    # Added first so it runs inside limit_upload_size, which sees the
+    # compressed Content-Length; the decoded size is checked while decoding
+    app.add_middleware(DecompressRequestMiddleware, paths=UPLOAD_PATHS)
+
     @app.middleware("http")
     async def limit_upload_size(request: Request, call_next):
-        if request.method == "POST" and request.url.path in ["/api/v1/merge", "/api/v1/pdf-to-images"]:
+        if request.method == "POST" and request.url.path in UPLOAD_PATHS:
             content_length = request.headers.get("content-length")
             if content_length and content_length.isdigit():
                 size_mb = int(content_length) / (1024 * 1024)
@@ -30,11 +63,42 @@ def create_app() -> FastAPI:
                     )
         return await call_next(request)
 
+    @app.middleware("http")
+    async def profile_request(request: Request, call_next):
+        if request.url.path not in PROFILED_PATHS or "x-profile" not in request.headers:
+            return await call_next(request)
+
+        admin_key = request.headers.get("x-admin-key", "")
+        if not settings.admin_api_key or not secrets.compare_digest(
+            admin_key, settings.admin_api_key
+        ):
+            return JSONResponse(status_code=403, content={"detail": "Invalid admin key"})
+        session = begin_profile()
+        if session is None:
+            return JSONResponse(
+                status_code=409, content={"detail": "Another request is being profiled."}
+            )
+
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+        finally:
+            end_profile(session)
+            await to_thread.run_sync(
+                save_profile, session, request.method, request.url.path, status_code
+            )
+        response.headers["X-Profile-Id"] = session.id
+        return response
+
     app.include_router(ui.router)
     app.include_router(ui.pdf_to_images_router)
     app.include_router(merge.router)
     app.include_router(pdf_to_images.router)
+    app.include_router(split.router)
+    app.include_router(uploads.router)
     app.include_router(health.router)
+    app.include_router(admin.router)
 
     return app
 
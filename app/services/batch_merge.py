@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+from typing import Any, AsyncIterator, Iterable, Optional
+
+import anyio
+from anyio import to_thread
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from pypdf import PdfReader
+
+from app.core.concurrency import get_pdf_merge_limiter
+from app.services.pdf_merger import LayoutOptions, PdfMergerService
+from app.utils.page_ranges import parse_page_spec
+from app.utils.zip_stream import StreamingZip
+
+
+@dataclass
+class _BatchOutput:
+    name: str
+    payloads: list[PdfMergerService.Payload]
+
+
+_DocumentCache = dict[tuple[bytes, Optional[LayoutOptions]], PdfReader]
+
+
+class BatchMergeService:
+    """Run many independent merges from one request and stream the results as a ZIP file."""
+
+    # Outputs rendered by one worker per thread hand-off
+    OUTPUTS_PER_CALL = 8
+
+    def __init__(self, **merge_options: Any) -> None:
+        """
+        Initialize the batch.
+
+        Args:
+            merge_options: Keyword arguments for ``PdfMergerService`` applied to
+                every output (engine, placement, optimize, ...)
+        """
+        # Fail on unsupported options before any upload is read
+        PdfMergerService(**merge_options)
+        self.merge_options = merge_options
+
+    async def merge(self, files: Iterable[UploadFile], manifest: list[Any]) -> StreamingResponse:
+        """
+        Merge every manifest entry and return the documents as a ZIP file.
+
+        Each entry is an object with ``files`` (names of uploaded parts, which
+        may be repeated across entries), and optional ``ranges``, ``options``
+        and ``output_name`` as for a single merge. Entries that fail while
+        rendering (for example a range beyond the end of a document) are
+        reported in ``errors.json`` inside the ZIP instead of failing the batch.
+
+        Args:
+            files: Uploaded parts, referenced by filename from the manifest
+            manifest: Parsed JSON manifest
+
+        Returns:
+            StreamingResponse containing a ZIP file with one PDF per entry
+        """
+        if not manifest:
+            raise HTTPException(status_code=400, detail="Manifest has no entries.")
+
+        uploads: dict[str, tuple[bytes, str]] = {}
+        for upload in files:
+            name = upload.filename or ""
+            if name in uploads:
+                raise HTTPException(status_code=400, detail=f"Duplicate upload name: {name}")
+            uploads[name] = (await upload.read(), upload.content_type or "")
+
+        outputs = self._build_outputs(manifest, uploads)
+        headers = {"Content-Disposition": 'attachment; filename="merged_batch.zip"'}
+        return StreamingResponse(
+            self._stream_outputs(outputs),
+            media_type="application/zip",
+            headers=headers,
+        )
+
+    def _build_outputs(
+        self, manifest: list[Any], uploads: dict[str, tuple[bytes, str]]
+    ) -> list[_BatchOutput]:
+        # The payload builder only normalizes options, so one instance serves all entries
+        builder = PdfMergerService(**self.merge_options)
+        digits = max(3, len(str(len(manifest))))
+        outputs: list[_BatchOutput] = []
+        names: set[str] = set()
+        for index, entry in enumerate(manifest):
+            label = f"Manifest entry {index + 1}"
+            if not isinstance(entry, dict):
+                raise HTTPException(status_code=400, detail=f"{label} must be an object.")
+            parts = entry.get("files")
+            if not isinstance(parts, list) or not parts:
+                raise HTTPException(status_code=400, detail=f"{label} has no files.")
+            ranges = entry.get("ranges") or []
+            options = entry.get("options") or []
+            if not isinstance(ranges, list) or not isinstance(options, list):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"{label}: 'ranges' and 'options' must be lists.",
+                )
+
+            payloads: list[PdfMergerService.Payload] = []
+            for position, part in enumerate(parts):
+                if not isinstance(part, str) or part not in uploads:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"{label} references a file that was not uploaded: {part}",
+                    )
+                data, content_type = uploads[part]
+                wanted = ranges[position] if position < len(ranges) else ""
+                raw = options[position] if position < len(options) else None
+                payloads.append(
+                    builder.build_payload(
+                        part,
+                        data,
+                        content_type,
+                        parse_page_spec(wanted if isinstance(wanted, str) else ""),
+                        _normalize_raw_options(raw),
+                    )
+                )
+
+            # Only the final path component is kept, so entries cannot
+            # escape the folder the archive is extracted into
+            name = PurePosixPath(str(entry.get("output_name") or "").replace("\\", "/")).name
+            if name in ("", ".", ".."):
+                name = f"merged_{index + 1:0{digits}d}.pdf"
+            if not name.lower().endswith(".pdf"):
+                name += ".pdf"
+            if name in names:
+                raise HTTPException(status_code=400, detail=f"Duplicate output name: {name}")
+            names.add(name)
+            outputs.append(_BatchOutput(name=name, payloads=payloads))
+        return outputs
+
+    async def _stream_outputs(self, outputs: list[_BatchOutput]) -> AsyncIterator[bytes]:
+        limiter = get_pdf_merge_limiter()
+        workers = max(1, int(limiter.total_tokens))
+        # Each worker slot keeps its parsed inputs across calls. A slot is
+        # used by one thread at a time, so shared inputs (a cover page, a
+        # terms sheet) are parsed at most once per slot.
+        caches: list[_DocumentCache] = [{} for _ in range(workers)]
+        window = workers * self.OUTPUTS_PER_CALL
+        errors: list[dict[str, str]] = []
+        archive = StreamingZip()
+
+        for first in range(0, len(outputs), window):
+            batch = outputs[first:first + window]
+            results: list[tuple[bytes | None, str | None]] = [(None, None)] * len(batch)
+
+            async def run(slot: int) -> None:
+                chunk = range(slot, len(batch), workers)
+                rendered = await to_thread.run_sync(
+                    self._render_outputs,
+                    [batch[offset] for offset in chunk],
+                    caches[slot],
+                    limiter=limiter,
+                )
+                for offset, result in zip(chunk, rendered):
+                    results[offset] = result
+
+            async with anyio.create_task_group() as task_group:
+                for slot in range(min(workers, len(batch))):
+                    task_group.start_soon(run, slot)
+
+            for output, (data, error) in zip(batch, results):
+                if data is not None:
+                    archive.writestr(output.name, data)
+                    yield archive.drain()
+                else:
+                    errors.append({"output_name": output.name, "detail": error or ""})
+
+        if errors:
+            archive.writestr("errors.json", json.dumps(errors, ensure_ascii=False, indent=2))
+        yield archive.close()
+
+    def _render_outputs(
+        self, outputs: list[_BatchOutput], documents: _DocumentCache
+    ) -> list[tuple[bytes | None, str | None]]:
+        rendered: list[tuple[bytes | None, str | None]] = []
+        for output in outputs:
+            merger = PdfMergerService(**self.merge_options, documents=documents)
+            try:
+                merger.add_payloads(output.payloads)
+                rendered.append((merger.render().getvalue(), None))
+            except HTTPException as exc:
+                rendered.append((None, str(exc.detail)))
+            except Exception as exc:  # pragma: no cover - defensive
+                rendered.append((None, f"Failed to merge: {exc}"))
+        return rendered
+
+
+def _normalize_raw_options(raw: Any) -> Optional[dict[str, str]]:
+    if not isinstance(raw, dict):
+        return None
+    return {
+        "paper_size": str(raw.get("paper_size", "")),
+        "orientation": str(raw.get("orientation", "")),
+        "fit_mode": str(raw.get("fit_mode", "")),
+    }
@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import io
+import struct
+import zlib
+from typing import BinaryIO, Iterator, cast
+
+from fastapi import HTTPException
+from pypdf import PdfReader
+from pypdf._page import PageObject
+from pypdf.generic import (
+    ArrayObject,
+    ContentStream,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    PdfObject,
+    StreamObject,
+)
+
+# Page attributes a page inherits from its ancestors in the page tree
+_INHERITABLE_DEFAULTS = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+_TAIL_SIZE = 2048
+_CHUNK_SIZE = 1024 * 1024
+
+
+class IncrementalUpdate:
+    """Append pages to an existing PDF as an incremental update.
+
+    Only the base document's trailer, catalog and page tree root are parsed.
+    The original bytes are streamed through unchanged and followed by the new
+    objects, the updated page tree root and a new cross-reference section
+    whose ``/Prev`` points at the original one.
+    """
+
+    def __init__(self, base: BinaryIO, filename: str) -> None:
+        self.base = base
+        self.filename = filename
+        base.seek(0, io.SEEK_END)
+        self.base_size = base.tell()
+        base.seek(0)
+
+        try:
+            self._reader = PdfReader(base)
+        except Exception as exc:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Failed to read PDF '{filename}': {exc}"
+            ) from exc
+        if self._reader.is_encrypted:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Encrypted PDF not supported: {filename}",
+            )
+
+        trailer = self._reader.trailer
+        self._root_ref = trailer.raw_get("/Root")
+        self._pages_ref = self._reader.root_object.raw_get("/Pages")
+        if not isinstance(self._root_ref, IndirectObject) or not isinstance(
+            self._pages_ref, IndirectObject
+        ):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported page tree in PDF: {filename}",
+            )
+        self._previous_xref, self._uses_xref_stream = self._find_previous_xref()
+
+    @property
+    def page_count(self) -> int:
+        return int(self._pages_ref.get_object().get("/Count", 0))
+
+    def _find_previous_xref(self) -> tuple[int, bool]:
+        base = self.base
+        base.seek(max(0, self.base_size - _TAIL_SIZE))
+        tail = base.read()
+        marker = tail.rfind(b"startxref")
+        if marker < 0:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Missing startxref in PDF: {self.filename}",
+            )
+        try:
+            offset = int(tail[marker + len(b"startxref"):].split()[0])
+        except (IndexError, ValueError) as exc:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid startxref in PDF: {self.filename}",
+            ) from exc
+        base.seek(offset)
+        uses_stream = not base.read(4).startswith(b"xref")
+        base.seek(0)
+        return offset, uses_stream
+
+    def build(self, pages: list[PageObject]) -> bytes:
+        """Serialize ``pages`` as an update section to write after the base bytes."""
+
+        base_pages = self._pages_ref.get_object()
+        next_number = int(self._reader.trailer["/Size"])
+        numbers: dict[int, int] = {}
+        pending: list[PdfObject] = []
+        objects: list[tuple[int, int, PdfObject]] = []
+
+        def reference(indirect: IndirectObject) -> IndirectObject:
+            nonlocal next_number
+            target = indirect.get_object()
+            if isinstance(target, DictionaryObject):
+                # The new pages join the base document's catalog and page tree
+                if target.get("/Type") == "/Pages":
+                    return self._pages_ref
+                if target.get("/Type") == "/Catalog":
+                    return self._root_ref
+            key = id(target)
+            if key not in numbers:
+                numbers[key] = next_number
+                next_number += 1
+                pending.append(target)
+            return IndirectObject(numbers[key], 0, None)  # type: ignore[arg-type]
+
+        def copy(value: PdfObject) -> PdfObject:
+            if isinstance(value, IndirectObject):
+                return reference(value)
+            if isinstance(value, ContentStream):
+                value = value.flate_encode()
+            if isinstance(value, StreamObject):
+                stream = StreamObject()
+                stream._data = value._data
+                for key, item in value.items():
+                    if key != "/Length":
+                        stream[NameObject(key)] = copy(item)
+                return stream
+            if isinstance(value, DictionaryObject):
+                return DictionaryObject({NameObject(key): copy(item) for key, item in value.items()})
+            if isinstance(value, ArrayObject):
+                return ArrayObject(copy(item) for item in value)
+            return value
+
+        # Number the pages first so that references back to a page (such as
+        # an annotation's /P entry) resolve to the page itself
+        kids: list[IndirectObject] = []
+        for page in pages:
+            numbers[id(page)] = next_number
+            kids.append(IndirectObject(next_number, 0, None))  # type: ignore[arg-type]
+            next_number += 1
+
+        for page in pages:
+            entries = DictionaryObject(
+                {NameObject(key): item for key, item in page.items() if key != "/Parent"}
+            )
+            # Values on the base page tree root would otherwise be inherited
+            for key in _INHERITABLE_DEFAULTS:
+                if key in base_pages and key not in entries:
+                    if key == "/Rotate":
+                        entries[NameObject(key)] = NumberObject(0)
+                    elif key == "/Resources":
+                        entries[NameObject(key)] = DictionaryObject()
+                    else:
+                        entries[NameObject(key)] = page.mediabox
+            page_copy = cast(DictionaryObject, copy(entries))
+            page_copy[NameObject("/Parent")] = self._pages_ref
+            objects.append((numbers[id(page)], 0, page_copy))
+
+        while pending:
+            target = pending.pop()
+            objects.append((numbers[id(target)], 0, copy(target)))
+
+        tree_root = DictionaryObject(base_pages)
+        tree_root[NameObject("/Kids")] = ArrayObject([*base_pages["/Kids"], *kids])
+        tree_root[NameObject("/Count")] = NumberObject(self.page_count + len(kids))
+        objects.append((self._pages_ref.idnum, self._pages_ref.generation, tree_root))
+        objects.sort(key=lambda entry: entry[0])
+
+        buffer = io.BytesIO()
+        separator = b"" if self._ends_with_newline() else b"\n"
+        buffer.write(separator)
+        start = self.base_size
+        positions: list[tuple[int, int, int]] = []
+        for number, generation, obj in objects:
+            positions.append((number, generation, start + buffer.tell()))
+            buffer.write(f"{number} {generation} obj\n".encode())
+            obj.write_to_stream(buffer)
+            buffer.write(b"\nendobj\n")
+
+        trailer = DictionaryObject({
+            NameObject("/Root"): self._root_ref,
+            NameObject("/Prev"): NumberObject(self._previous_xref),
+        })
+        for key in ("/Info", "/ID"):
+            if key in self._reader.trailer:
+                trailer[NameObject(key)] = self._reader.trailer.raw_get(key)
+
+        xref_offset = start + buffer.tell()
+        if self._uses_xref_stream:
+            xref_number = next_number
+            positions.append((xref_number, 0, xref_offset))
+            trailer[NameObject("/Size")] = NumberObject(xref_number + 1)
+            self._write_xref_stream(buffer, xref_number, positions, trailer)
+        else:
+            trailer[NameObject("/Size")] = NumberObject(next_number)
+            self._write_xref_table(buffer, positions, trailer)
+        buffer.write(f"\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+        return buffer.getvalue()
+
+    def _ends_with_newline(self) -> bool:
+        if self.base_size == 0:
+            return True
+        self.base.seek(self.base_size - 1)
+        last = self.base.read(1)
+        self.base.seek(0)
+        return last in (b"\n", b"\r")
+
+    @staticmethod
+    def _subsections(positions: list[tuple[int, int, int]]) -> Iterator[list[tuple[int, int, int]]]:
+        section: list[tuple[int, int, int]] = []
+        for entry in sorted(positions):
+            if section and entry[0] != section[-1][0] + 1:
+                yield section
+                section = []
+            section.append(entry)
+        if section:
+            yield section
+
+    def _write_xref_table(
+        self,
+        buffer: io.BytesIO,
+        positions: list[tuple[int, int, int]],
+        trailer: DictionaryObject,
+    ) -> None:
+        buffer.write(b"xref\n")
+        for section in self._subsections(positions):
+            buffer.write(f"{section[0][0]} {len(section)}\n".encode())
+            for _, generation, offset in section:
+                buffer.write(f"{offset:010d} {generation:05d} n\r\n".encode())
+        buffer.write(b"trailer\n")
+        trailer.write_to_stream(buffer)
+
+    def _write_xref_stream(
+        self,
+        buffer: io.BytesIO,
+        xref_number: int,
+        positions: list[tuple[int, int, int]],
+        trailer: DictionaryObject,
+    ) -> None:
+        index: list[NumberObject] = []
+        rows: list[bytes] = []
+        for section in self._subsections(positions):
+            index.extend((NumberObject(section[0][0]), NumberObject(len(section))))
+            rows.extend(
+                struct.pack(">BQH", 1, offset, generation) for _, generation, offset in section
+            )
+
+        xref = StreamObject()
+        xref.update(trailer)
+        xref[NameObject("/Type")] = NameObject("/XRef")
+        xref[NameObject("/Index")] = ArrayObject(index)
+        xref[NameObject("/W")] = ArrayObject([NumberObject(1), NumberObject(8), NumberObject(2)])
+        xref[NameObject("/Filter")] = NameObject("/FlateDecode")
+        xref._data = zlib.compress(b"".join(rows))
+        buffer.write(f"{xref_number} 0 obj\n".encode())
+        xref.write_to_stream(buffer)
+        buffer.write(b"\nendobj")
+
+    def iter_output(self, update: bytes, chunk_size: int = _CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield the unchanged base document followed by ``update``, then close the base."""
+
+        try:
+            self.base.seek(0)
+            while True:
+                chunk = self.base.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+            yield update
+        finally:
+            self.base.close()
+
@@ -0,0 +1,440 @@
+from __future__ import annotations
+
+import io
+import math
+import zlib
+from dataclasses import dataclass
+from typing import Iterable, Literal, Optional, Tuple
+
+from fastapi import HTTPException
+from PIL import Image, UnidentifiedImageError
+from pypdf import PdfWriter
+from pypdf._page import PageObject
+from pypdf.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    FloatObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    StreamObject,
+)
+
+StampPosition = Literal[
+    "center",
+    "diagonal",
+    "top",
+    "bottom",
+    "top-left",
+    "top-right",
+    "bottom-left",
+    "bottom-right",
+]
+Matrix = Tuple[float, float, float, float, float, float]
+_IDENTITY: Matrix = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+_STAMP_NAME = NameObject("/PMStamp")
+_FONT_NAME = NameObject("/PMFont")
+# Text watermarks are drawn at this size inside the shared form and scaled per page
+_FORM_FONT_SIZE = 100.0
+_CAP_HEIGHT = 0.718
+_MARGIN = 24.0
+_PAGE_NUMBER_SIZE = 10.0
+
+# Advance widths in 1/1000 em of Helvetica and Helvetica-Bold, from their AFM
+# metrics, for the WinAnsiEncoding codes 0x20-0xFF (0 where a code is unused)
+_HELVETICA_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,  # 0x20
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,  # 0x30
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,  # 0x40
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,  # 0x50
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,  # 0x60
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584, 0,  # 0x70
+    556, 0, 222, 556, 333, 1000, 556, 556, 333, 1000, 667, 333, 1000, 0, 611, 0,  # 0x80
+    0, 222, 222, 333, 333, 350, 556, 1000, 333, 1000, 500, 333, 944, 0, 500, 667,  # 0x90
+    278, 333, 556, 556, 556, 556, 260, 556, 333, 737, 370, 556, 584, 333, 737, 333,  # 0xA0
+    400, 584, 333, 333, 333, 556, 537, 278, 333, 333, 365, 556, 834, 834, 834, 611,  # 0xB0
+    667, 667, 667, 667, 667, 667, 1000, 722, 667, 667, 667, 667, 278, 278, 278, 278,  # 0xC0
+    722, 722, 778, 778, 778, 778, 778, 584, 778, 722, 722, 722, 722, 667, 667, 611,  # 0xD0
+    556, 556, 556, 556, 556, 556, 889, 500, 556, 556, 556, 556, 278, 278, 278, 278,  # 0xE0
+    556, 556, 556, 556, 556, 556, 556, 584, 611, 556, 556, 556, 556, 500, 556, 500,  # 0xF0
+)
+_HELVETICA_BOLD_WIDTHS = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,  # 0x20
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,  # 0x30
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,  # 0x40
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,  # 0x50
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,  # 0x60
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584, 0,  # 0x70
+    556, 0, 278, 556, 500, 1000, 556, 556, 333, 1000, 667, 333, 1000, 0, 611, 0,  # 0x80
+    0, 278, 278, 500, 500, 350, 556, 1000, 333, 1000, 556, 333, 944, 0, 500, 667,  # 0x90
+    278, 333, 556, 556, 556, 556, 280, 556, 333, 737, 370, 556, 584, 333, 737, 333,  # 0xA0
+    400, 584, 333, 333, 333, 611, 556, 278, 333, 333, 365, 556, 834, 834, 834, 611,  # 0xB0
+    722, 722, 722, 722, 722, 722, 1000, 722, 667, 667, 667, 667, 278, 278, 278, 278,  # 0xC0
+    722, 722, 778, 778, 778, 778, 778, 584, 778, 722, 722, 722, 722, 667, 667, 611,  # 0xD0
+    556, 556, 556, 556, 556, 556, 889, 556, 556, 556, 556, 556, 278, 278, 278, 278,  # 0xE0
+    611, 611, 611, 611, 611, 611, 611, 584, 611, 611, 611, 611, 611, 556, 611, 556,  # 0xF0
+)
+
+
+@dataclass(frozen=True)
+class StampOptions:
+    """Watermark and page numbers drawn on every page of a merged document.
+
+    ``page_number_format`` may use ``{page}`` and ``{total}``, for example
+    ``"Page {page} of {total}"``. Text is drawn in Helvetica, so it is
+    limited to characters of the Windows-1252 code page.
+    """
+
+    watermark_text: Optional[str] = None
+    watermark_image: Optional[bytes] = None
+    watermark_position: StampPosition = "diagonal"
+    watermark_opacity: float = 0.3
+    page_number_format: Optional[str] = None
+    page_number_position: StampPosition = "bottom"
+
+    def __post_init__(self) -> None:
+        if self.watermark_text is not None and self.watermark_image is not None:
+            raise HTTPException(
+                status_code=400,
+                detail="Use either a text or an image watermark, not both.",
+            )
+        if not 0 <= self.watermark_opacity <= 1:
+            raise HTTPException(
+                status_code=400, detail="watermark_opacity must be between 0 and 1"
+            )
+        if self.page_number_position == "diagonal":
+            raise HTTPException(
+                status_code=400, detail="Page numbers cannot be placed diagonally."
+            )
+        if self.watermark_text is not None:
+            _encode_text(self.watermark_text, "Watermark text")
+        if self.page_number_format is not None:
+            try:
+                sample = self.page_number_format.format(page=1, total=1)
+            except (IndexError, KeyError, ValueError) as exc:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid page number format: {exc}",
+                ) from exc
+            _encode_text(sample, "Page number format")
+
+    @property
+    def has_watermark(self) -> bool:
+        return bool(self.watermark_text) or self.watermark_image is not None
+
+    @property
+    def enabled(self) -> bool:
+        return self.has_watermark or bool(self.page_number_format)
+
+
+class PageStamper:
+    """Draw a watermark and page numbers on the pages of a writer.
+
+    The watermark is a single Form XObject referenced from every page, and
+    the opening ``q`` operator is one shared stream, so each page only gains
+    a short content stream with its placement and page number.
+    """
+
+    def __init__(self, writer: PdfWriter, options: StampOptions) -> None:
+        self.writer = writer
+        self.options = options
+        self._font: Optional[IndirectObject] = None
+        if options.page_number_format:
+            self._font = writer._add_object(_font_dictionary("/Helvetica"))
+        self._save_state = writer._add_object(_content_stream(b"q\n"))
+        self._restore_state = writer._add_object(_content_stream(b"\nQ"))
+        self._geometries: dict[tuple[object, object], tuple[str, float, float]] = {}
+        self._shared_streams: dict[str, IndirectObject] = {}
+        self._stamp: Optional[IndirectObject] = None
+        self._stamp_size = (0.0, 0.0)
+        if options.has_watermark:
+            self._stamp, self._stamp_size = self._build_stamp()
+
+    def apply(self, pages: Iterable[PageObject], total: int) -> None:
+        for number, page in enumerate(pages, start=1):
+            self._stamp_page(page, number, total)
+
+    def _stamp_page(self, page: PageObject, number: int, total: int) -> None:
+        box = page.get("/CropBox") or page.get("/MediaBox")
+        key = (tuple(box) if box is not None else None, page.get("/Rotate", 0))
+        geometry = self._geometries.get(key)
+        if geometry is None:
+            geometry = self._geometries[key] = self._geometry(page)
+        prefix, width, height = geometry
+
+        # The watermark placement is one stream shared by pages of this geometry
+        shared = self._shared_streams.get(prefix)
+        if shared is None:
+            shared = self.writer._add_object(_content_stream(prefix.encode("latin-1")))
+            self._shared_streams[prefix] = shared
+        stamps = [shared]
+
+        if self.options.page_number_format:
+            text = self.options.page_number_format.format(page=number, total=total)
+            x, y = _anchor(
+                self.options.page_number_position,
+                (_text_width(text) * _PAGE_NUMBER_SIZE, _PAGE_NUMBER_SIZE * _CAP_HEIGHT),
+                width,
+                height,
+            )
+            numbers = _content_stream(
+                f"BT {_FONT_NAME} {_PAGE_NUMBER_SIZE:g} Tf {x:.2f} {y:.2f} Td "
+                f"{_pdf_string(text)} Tj ET".encode("latin-1")
+            )
+            stamps.append(self.writer._add_object(numbers))
+        stamps.append(self._restore_state)
+
+        self._add_resources(page)
+        parts: list[IndirectObject] = [self._save_state]
+        if "/Contents" in page:
+            existing = page.raw_get("/Contents")
+            resolved = existing.get_object()
+            streams = list(resolved) if isinstance(resolved, ArrayObject) else [existing]
+            for part in streams:
+                if not isinstance(part, IndirectObject):
+                    part = self.writer._add_object(part)
+                parts.append(part)
+        parts.extend(stamps)
+        page[NameObject("/Contents")] = ArrayObject(parts)
+
+    def _geometry(self, page: PageObject) -> tuple[str, float, float]:
+        """Return the operators shared by pages of one size and rotation, and their upright size."""
+
+        page_matrix, width, height = _visual_space(page)
+        # Close the shared "q" so the original content cannot affect the stamp
+        prefix = "\nQ q"
+        if page_matrix != _IDENTITY:
+            prefix += f" {_format_matrix(page_matrix)} cm"
+        if self._stamp is not None:
+            placement = self._place(
+                self.options.watermark_position, self._stamp_size, width, height
+            )
+            prefix += f" q {_format_matrix(placement)} cm {_STAMP_NAME} Do Q"
+        return prefix + "\n", width, height
+
+    def _add_resources(self, page: PageObject) -> None:
+        if "/Resources" not in page:
+            page[NameObject("/Resources")] = DictionaryObject()
+        resources = page["/Resources"].get_object()
+        for category, name, reference in (
+            ("/Font", _FONT_NAME, self._font),
+            ("/XObject", _STAMP_NAME, self._stamp),
+        ):
+            if reference is None:
+                continue
+            if category not in resources:
+                resources[NameObject(category)] = DictionaryObject()
+            # Pages copied from the same source share their resources
+            entries = resources[category].get_object()
+            if name not in entries:
+                entries[name] = reference
+
+    @staticmethod
+    def _place(
+        position: StampPosition, size: Tuple[float, float], width: float, height: float
+    ) -> Matrix:
+        stamp_width, stamp_height = size
+        if position == "diagonal":
+            angle = math.atan2(height, width)
+            scale = min(
+                0.6 * math.hypot(width, height) / stamp_width,
+                0.3 * min(width, height) / stamp_height,
+            )
+            cos, sin = math.cos(angle) * scale, math.sin(angle) * scale
+            # Rotate about the stamp's centre, then move it to the page centre
+            dx = stamp_width / 2
+            dy = stamp_height / 2
+            return (
+                cos,
+                sin,
+                -sin,
+                cos,
+                width / 2 - (cos * dx - sin * dy),
+                height / 2 - (sin * dx + cos * dy),
+            )
+
+        if position == "center":
+            scale = min(0.6 * width / stamp_width, 0.6 * height / stamp_height)
+        else:
+            scale = min(0.25 * width / stamp_width, 0.15 * height / stamp_height)
+        x, y = _anchor(position, (stamp_width * scale, stamp_height * scale), width, height)
+        return (scale, 0.0, 0.0, scale, x, y)
+
+    def _build_stamp(self) -> tuple[IndirectObject, Tuple[float, float]]:
+        alpha = DictionaryObject({
+            NameObject("/Type"): NameObject("/ExtGState"),
+            NameObject("/CA"): FloatObject(self.options.watermark_opacity),
+            NameObject("/ca"): FloatObject(self.options.watermark_opacity),
+        })
+        resources = DictionaryObject({
+            NameObject("/ExtGState"): DictionaryObject({
+                NameObject("/StampAlpha"): self.writer._add_object(alpha),
+            }),
+        })
+
+        if self.options.watermark_text:
+            text = self.options.watermark_text
+            width = _text_width(text, bold=True) * _FORM_FONT_SIZE
+            height = _FORM_FONT_SIZE * _CAP_HEIGHT
+            resources[NameObject("/Font")] = DictionaryObject({
+                NameObject("/StampFont"): self.writer._add_object(
+                    _font_dictionary("/Helvetica-Bold")
+                ),
+            })
+            content = (
+                f"/StampAlpha gs BT 0.5 g /StampFont {_FORM_FONT_SIZE:g} Tf "
+                f"0 0 Td {_pdf_string(text)} Tj ET"
+            )
+            bbox = (0.0, -0.25 * _FORM_FONT_SIZE, width, _FORM_FONT_SIZE)
+        else:
+            image, (pixel_width, pixel_height) = self._image_xobject(
+                self.options.watermark_image or b""
+            )
+            width = 100.0
+            height = 100.0 * pixel_height / pixel_width
+            resources[NameObject("/XObject")] = DictionaryObject({
+                NameObject("/StampImage"): image,
+            })
+            content = f"/StampAlpha gs {width:g} 0 0 {height:.4f} 0 0 cm /StampImage Do"
+            bbox = (0.0, 0.0, width, height)
+
+        form = DecodedStreamObject()
+        form.set_data(f"q {content} Q".encode("latin-1"))
+        form.update({
+            NameObject("/Type"): NameObject("/XObject"),
+            NameObject("/Subtype"): NameObject("/Form"),
+            NameObject("/BBox"): ArrayObject(FloatObject(value) for value in bbox),
+            NameObject("/Resources"): resources,
+        })
+        return self.writer._add_object(form.flate_encode()), (width, height)
+
+    def _image_xobject(self, data: bytes) -> tuple[IndirectObject, Tuple[int, int]]:
+        try:
+            image = Image.open(io.BytesIO(data))
+            image.load()
+        except (UnidentifiedImageError, OSError) as exc:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Failed to read watermark image: {exc}",
+            ) from exc
+
+        xobject = StreamObject()
+        xobject.update({
+            NameObject("/Type"): NameObject("/XObject"),
+            NameObject("/Subtype"): NameObject("/Image"),
+            NameObject("/Width"): NumberObject(image.width),
+            NameObject("/Height"): NumberObject(image.height),
+            NameObject("/BitsPerComponent"): NumberObject(8),
+        })
+        if image.format == "JPEG" and image.mode in ("RGB", "L"):
+            # Embed JPEG data as is
+            xobject[NameObject("/Filter")] = NameObject("/DCTDecode")
+            xobject[NameObject("/ColorSpace")] = NameObject(
+                "/DeviceRGB" if image.mode == "RGB" else "/DeviceGray"
+            )
+            xobject._data = data
+        else:
+            has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+            rgba = image.convert("RGBA")
+            xobject[NameObject("/Filter")] = NameObject("/FlateDecode")
+            xobject[NameObject("/ColorSpace")] = NameObject("/DeviceRGB")
+            xobject._data = zlib.compress(rgba.convert("RGB").tobytes())
+            if has_alpha:
+                mask = StreamObject()
+                mask.update({
+                    NameObject("/Type"): NameObject("/XObject"),
+                    NameObject("/Subtype"): NameObject("/Image"),
+                    NameObject("/Width"): NumberObject(image.width),
+                    NameObject("/Height"): NumberObject(image.height),
+                    NameObject("/BitsPerComponent"): NumberObject(8),
+                    NameObject("/ColorSpace"): NameObject("/DeviceGray"),
+                    NameObject("/Filter"): NameObject("/FlateDecode"),
+                })
+                mask._data = zlib.compress(rgba.getchannel("A").tobytes())
+                xobject[NameObject("/SMask")] = self.writer._add_object(mask)
+        return self.writer._add_object(xobject), (image.width, image.height)
+
+
+def _content_stream(data: bytes) -> DecodedStreamObject:
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    return stream
+
+
+def _font_dictionary(base_font: str) -> DictionaryObject:
+    return DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject(base_font),
+        NameObject("/Encoding"): NameObject("/WinAnsiEncoding"),
+    })
+
+
+def _encode_text(text: str, label: str) -> bytes:
+    try:
+        return text.encode("cp1252")
+    except UnicodeEncodeError as exc:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{label} contains characters the standard PDF fonts cannot show: {text}",
+        ) from exc
+
+
+def _pdf_string(text: str) -> str:
+    encoded = _encode_text(text, "Text")
+    escaped = encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+    return f"({escaped.decode('latin-1')})"
+
+
+def _text_width(text: str, bold: bool = False) -> float:
+    """Width of ``text`` in Helvetica (or Helvetica-Bold) at a font size of 1."""
+
+    widths = _HELVETICA_BOLD_WIDTHS if bold else _HELVETICA_WIDTHS
+    return sum(widths[code - 32] for code in _encode_text(text, "Text") if code >= 32) / 1000
+
+
+def _anchor(
+    position: StampPosition, size: Tuple[float, float], width: float, height: float
+) -> Tuple[float, float]:
+    item_width, item_height = size
+    if position.endswith("left"):
+        x = _MARGIN
+    elif position.endswith("right"):
+        x = width - _MARGIN - item_width
+    else:
+        x = (width - item_width) / 2
+    if position.startswith("top"):
+        y = height - _MARGIN - item_height
+    elif position.startswith("bottom"):
+        y = _MARGIN
+    else:
+        y = (height - item_height) / 2
+    return x, y
+
+
+def _visual_space(page: PageObject) -> tuple[Matrix, float, float]:
+    """Map upright viewer coordinates onto the page's visible box.
+
+    Returns the matrix and the width and height of the page as displayed,
+    after ``/Rotate`` is applied.
+    """
+
+    box = page.cropbox
+    left, bottom, right, top = (
+        float(box.left), float(box.bottom), float(box.right), float(box.top)
+    )
+    width, height = right - left, top - bottom
+    rotation = int(page.get("/Rotate", 0) or 0) % 360
+    if rotation == 90:
+        return (0.0, 1.0, -1.0, 0.0, right, bottom), height, width
+    if rotation == 180:
+        return (-1.0, 0.0, 0.0, -1.0, right, top), width, height
+    if rotation == 270:
+        return (0.0, -1.0, 1.0, 0.0, left, top), height, width
+    return (1.0, 0.0, 0.0, 1.0, left, bottom), width, height
+
+
+def _format_matrix(matrix: Matrix) -> str:
+    return " ".join(f"{value:.4f}".rstrip("0").rstrip(".") or "0" for value in matrix)
@@ -1,29 +1,52 @@
 from __future__ import annotations
 
+import hashlib
 import io
+import math
+import mmap
+import sys
 from dataclasses import dataclass
-from typing import Iterable, Literal, Optional, Tuple, cast
+from functools import cached_property, lru_cache
+from pathlib import Path
+from typing import Any, Iterable, Literal, Optional, Tuple, cast
 
 from fastapi import HTTPException, UploadFile
 from fastapi.responses import StreamingResponse
 from anyio import to_thread
 from pypdf import PdfReader, PdfWriter, Transformation
 from pypdf._page import PageObject
+from pypdf.filters import _xobj_to_image
+from pypdf.generic import (
+    ArrayObject,
+    ContentStream,
+    DecodedStreamObject,
+    DictionaryObject,
+    FloatObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    StreamObject,
+)
 from PIL import Image, ImageOps, UnidentifiedImageError
 
-try:  # pragma: no cover - optional dependency import guard
-    import pikepdf  # type: ignore
-except ImportError:  # pragma: no cover - optional dependency import guard
-    pikepdf = None  # type: ignore[assignment]
-
 from app.core.concurrency import get_pdf_merge_limiter
-from app.utils.page_ranges import parse_page_ranges
+from app.core.config import settings
+from app.core.profiling import profiled, stage
+from app.services.incremental_update import IncrementalUpdate
+from app.services.page_stamps import PageStamper, StampOptions
+from app.services.qpdf_concat import QpdfConcatenation
+from app.utils.document_volume import map_document, write_document
+from app.utils.page_ranges import PageSpec, parse_page_spec
+from app.utils.uploads import detach_upload
 
 
 PaperSize = Literal["A4", "Letter"]
 Orientation = Literal["portrait", "landscape"]
 Rotation = Literal[90, 180, 270]
 FitMode = Literal["letterbox", "crop"]
+Placement = Literal["merge", "xobject"]
+ObjectStreams = Literal["preserve", "disable", "generate"]
+Engine = Literal["auto", "pypdf", "pikepdf"]
 
 
 @dataclass(frozen=True)
@@ -34,6 +57,32 @@ class LayoutOptions:
     fit_mode: Optional[FitMode] = None
 
 
+@dataclass(frozen=True)
+class LayoutPlan:
+    """Placement shared by all source pages with the same box, /Rotate and options.
+
+    ``target_size`` is ``None`` when pages are passed through unchanged apart
+    from an optional rotation; otherwise ``ctm`` maps the source page onto a
+    blank page of that size.
+    """
+
+    source_box: Tuple[float, float, float, float]
+    rotation: int
+    target_size: Optional[Tuple[float, float]] = None
+    scale: float = 1.0
+    offset: Tuple[float, float] = (0.0, 0.0)
+    ctm: Optional[Tuple[float, float, float, float, float, float]] = None
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "source_box": list(self.source_box),
+            "rotation": self.rotation,
+            "target_size": list(self.target_size) if self.target_size else None,
+            "scale": self.scale,
+            "offset": list(self.offset),
+        }
+
+
 _PAGE_DIMENSIONS: dict[tuple[PaperSize, Orientation], Tuple[float, float]] = {
     ("A4", "portrait"): (595.2755905511812, 841.8897637795277),
     ("A4", "landscape"): (841.8897637795277, 595.2755905511812),
@@ -43,31 +92,112 @@ _PAGE_DIMENSIONS: dict[tuple[PaperSize, Orientation], Tuple[float, float]] = {
 
 _DEFAULT_FIT_MODE: FitMode = "letterbox"
 
+Matrix = Tuple[float, float, float, float, float, float]
+_IDENTITY_MATRIX: Matrix = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+# With engine="auto", a worker that has not imported pikepdf yet keeps
+# smaller merges on pypdf: the import costs more than qpdf saves below this
+# input size. Calibrated with ``python -m app.cli benchmark``: the import took
+# 48 ms and qpdf saved 29 ms per MB of unchanged pages, a break-even of 1.6 MB.
+_AUTO_COLD_IMPORT_BYTES = 3 * 1024 * 1024 // 2
+
+# Images are only resampled when this shrinks them noticeably.
+_MIN_DOWNSAMPLE_RATIO = 0.9
+
+
+@lru_cache(maxsize=1)
+def _load_pikepdf() -> Any:
+    """Import pikepdf on first use, or return ``None`` when it is not installed."""
+
+    try:  # pragma: no cover - optional dependency import guard
+        import pikepdf  # type: ignore
+    except ImportError:  # pragma: no cover - optional dependency import guard
+        return None
+    return pikepdf
+
+
+@lru_cache(maxsize=1)
+def _configure_flate_level(level: int) -> None:
+    """Set qpdf's process-wide Flate level once; it applies to every pikepdf save."""
+
+    _load_pikepdf().settings.set_flate_compression_level(level)
+
 
 class PdfMergerService:
     """Handle PDF merging logic."""
 
-    def __init__(self, engine: Literal["pypdf", "pikepdf"] = "pypdf") -> None:
-        if engine not in {"pypdf", "pikepdf"}:
+    def __init__(
+        self,
+        engine: Engine = "pypdf",
+        placement: Placement = "merge",
+        optimize: bool = False,
+        max_image_dpi: Optional[int] = None,
+        image_quality: int = 75,
+        linearize: bool = False,
+        object_streams: ObjectStreams = "preserve",
+        documents: Optional[dict[tuple[bytes, Optional[LayoutOptions]], PdfReader]] = None,
+        stamp: Optional[StampOptions] = None,
+    ) -> None:
+        if engine not in {"auto", "pypdf", "pikepdf"}:
             raise HTTPException(status_code=400, detail=f"Unsupported engine: {engine}")
+        if placement not in {"merge", "xobject"}:
+            raise HTTPException(status_code=400, detail=f"Unsupported placement: {placement}")
+        if max_image_dpi is not None and max_image_dpi < 1:
+            raise HTTPException(status_code=400, detail="max_image_dpi must be positive")
+        if image_quality < 1 or image_quality > 100:
+            raise HTTPException(status_code=400, detail="image_quality must be between 1 and 100")
+
+        if object_streams not in {"preserve", "disable", "generate"}:
+            raise HTTPException(
+                status_code=400, detail=f"Unsupported object_streams mode: {object_streams}"
+            )
 
-        if engine == "pikepdf":
-            if pikepdf is None:
+        if engine == "pikepdf" or linearize or object_streams != "preserve":
+            if _load_pikepdf() is None:
                 raise HTTPException(
                     status_code=500,
                     detail="pikepdf backend is not available on this server.",
                 )
         self.engine = engine
+        # Backend actually used; "auto" picks one when the first documents arrive
+        self._backend: Optional[Literal["pypdf", "pikepdf"]] = None if engine == "auto" else engine
+        self.placement = placement
+        self.optimize = optimize
+        self.max_image_dpi = max_image_dpi
+        self.image_quality = image_quality
+        self.linearize = linearize
+        self.object_streams = object_streams
+        self.stamp = stamp if stamp is not None and stamp.enabled else None
+        self._writer = PdfWriter()
+        # Parsed inputs by content hash; callers may share one cache between
+        # mergers that run sequentially on the same thread
+        self._documents = documents if documents is not None else {}
         self._pages: list[PageObject] = []
+        self._page_xobjects: dict[tuple[object, int], tuple[NameObject, IndirectObject]] = {}
+        self._layout_plans: dict[
+            tuple[Tuple[float, float, float, float], int, LayoutOptions], LayoutPlan
+        ] = {}
+        self._page_templates: dict[Tuple[float, float], PageObject] = {}
+        # Inputs copied unchanged by qpdf, kept in case a later one needs pypdf
+        self._concatenation: Optional[QpdfConcatenation] = None
+        self._concatenated: list[PdfMergerService.Payload] = []
 
     @dataclass
-    class _Payload:
+    class Payload:
+        """One input document with its page selection and layout options."""
+
         filename: str
         data: bytes
-        ranges: str
+        pages: PageSpec
         content_type: str
         options: LayoutOptions
 
+        @cached_property
+        def digest(self) -> bytes:
+            """SHA-256 of the data, which identifies repeated inputs."""
+
+            return hashlib.sha256(self.data).digest()
+
     _IMAGE_DEFAULT_OPTIONS = LayoutOptions(
         paper_size="A4",
         orientation="portrait",
@@ -122,59 +252,264 @@ class PdfMergerService:
         ranges: list[str],
         options: Optional[list[dict[str, str]]] = None,
     ) -> None:
-        payloads: list[PdfMergerService._Payload] = []
+        payloads = await self._read_payloads(files, ranges, options)
+        await to_thread.run_sync(
+            profiled(self.add_payloads), payloads, limiter=get_pdf_merge_limiter()
+        )
+
+    async def append_paths(
+        self,
+        paths: list[Path],
+        ranges: list[str],
+        options: Optional[list[dict[str, str]]] = None,
+    ) -> None:
+        """Add server-local files, parsing PDFs from read-only memory maps."""
+
+        def process() -> int:
+            return self.add_payloads(self._map_payloads(paths, ranges, options))
+
+        await to_thread.run_sync(profiled(process), limiter=get_pdf_merge_limiter())
+
+    async def plan_paths(
+        self,
+        paths: list[Path],
+        ranges: list[str],
+        options: Optional[list[dict[str, str]]] = None,
+    ) -> list[dict[str, Any]]:
+        """Return the layout plan of a merge of server-local files."""
+
+        def plan() -> list[dict[str, Any]]:
+            return self._plan_payloads(self._map_payloads(paths, ranges, options))
+
+        return await to_thread.run_sync(profiled(plan), limiter=get_pdf_merge_limiter())
+
+    def _map_payloads(
+        self,
+        paths: list[Path],
+        ranges: list[str],
+        options: Optional[list[dict[str, str]]],
+    ) -> list[Payload]:
+        return [
+            self.build_payload(
+                path.name,
+                cast(bytes, map_document(path)),
+                "",
+                parse_page_spec(ranges[index] if index < len(ranges) else ""),
+                options[index] if options and index < len(options) else None,
+            )
+            for index, path in enumerate(paths)
+        ]
+
+    def add_document(
+        self,
+        filename: str,
+        data: bytes | mmap.mmap,
+        ranges: str = "",
+        options: Optional[dict[str, str]] = None,
+        content_type: str = "",
+    ) -> int:
+        """Lay out the selected pages of one document on the calling thread.
+
+        ``data`` may be a read-only memory map of a local file; PDFs are then
+        parsed from the map without copying it. Returns the number of pages added.
+        """
+
+        payload = self.build_payload(
+            filename, cast(bytes, data), content_type, parse_page_spec(ranges), options
+        )
+        return self.add_payloads([payload])
+
+    async def plan_files(
+        self,
+        files: Iterable[UploadFile],
+        ranges: list[str],
+        options: Optional[list[dict[str, str]]] = None,
+    ) -> list[dict[str, Any]]:
+        """Return the layout plan of a merge without rendering any page."""
+
+        payloads = await self._read_payloads(files, ranges, options)
+        return await to_thread.run_sync(
+            profiled(self._plan_payloads), payloads, limiter=get_pdf_merge_limiter()
+        )
+
+    async def _read_payloads(
+        self,
+        files: Iterable[UploadFile],
+        ranges: list[str],
+        options: Optional[list[dict[str, str]]],
+    ) -> list[Payload]:
+        payloads: list[PdfMergerService.Payload] = []
         options = options or []
         for index, upload in enumerate(files):
-            data = await upload.read()
-            if len(data) == 0:
-                raise HTTPException(status_code=400, detail=f"Empty file: {upload.filename}")
-
+            # Reject malformed ranges before reading or parsing any document
             wanted_ranges = ranges[index] if index < len(ranges) else ""
+            pages = parse_page_spec(wanted_ranges or "")
+
+            with stage("merge.read"):
+                data = await upload.read()
             raw_options = options[index] if index < len(options) else None
-            content_type = (upload.content_type or "").lower()
             payloads.append(
-                PdfMergerService._Payload(
-                    filename=upload.filename or "<unnamed>",
-                    data=data,
-                    ranges=wanted_ranges or "",
-                    content_type=content_type,
-                    options=self._apply_default_layout(
-                        self._normalize_options(raw_options),
-                        upload.filename or "",
-                        content_type,
-                    ),
+                self.build_payload(
+                    upload.filename or "",
+                    data,
+                    upload.content_type or "",
+                    pages,
+                    raw_options,
                 )
             )
+        return payloads
+
+    def build_payload(
+        self,
+        filename: str,
+        data: bytes,
+        content_type: str,
+        pages: PageSpec,
+        raw_options: Optional[dict[str, str]],
+    ) -> Payload:
+        """Validate one input and resolve its layout options for ``add_payloads``."""
+
+        if len(data) == 0:
+            raise HTTPException(status_code=400, detail=f"Empty file: {filename}")
+
+        content_type = content_type.lower()
+        return PdfMergerService.Payload(
+            filename=filename or "<unnamed>",
+            data=data,
+            pages=pages,
+            content_type=content_type,
+            options=self._apply_default_layout(
+                self._normalize_options(raw_options),
+                filename,
+                content_type,
+            ),
+        )
 
-        prepared_pages = await to_thread.run_sync(
-            self._process_payloads, payloads, limiter=get_pdf_merge_limiter()
+    @property
+    def resolved_engine(self) -> Literal["pypdf", "pikepdf"]:
+        """The backend that renders the merge, once ``engine="auto"`` has chosen one."""
+
+        return self._backend or "pypdf"
+
+    def _choose_engine(self, payloads: list[Payload]) -> Literal["pypdf", "pikepdf"]:
+        """Pick the backend for ``engine="auto"``.
+
+        pikepdf is used when every payload can be concatenated unchanged, and
+        pypdf otherwise: layout changes, images, stamps, downsampling and
+        ``optimize`` all work on pypdf pages, where pikepdf would only add a
+        second pass. Before pikepdf is first imported, the total input size
+        must also reach ``_AUTO_COLD_IMPORT_BYTES``. Page and object counts
+        are not looked at.
+        """
+        if not self._can_concatenate(payloads):
+            return "pypdf"
+        if "pikepdf" not in sys.modules and (
+            sum(len(payload.data) for payload in payloads) < _AUTO_COLD_IMPORT_BYTES
+        ):
+            return "pypdf"
+        return "pikepdf" if _load_pikepdf() is not None else "pypdf"
+
+    def _can_concatenate(self, payloads: list[Payload]) -> bool:
+        if self._pages or self.stamp is not None or self.max_image_dpi is not None or self.optimize:
+            return False
+        return all(
+            self._is_pdf(payload) and payload.options == LayoutOptions() for payload in payloads
         )
-        self._pages.extend(prepared_pages)
 
-    def _process_payloads(self, payloads: list[_Payload]) -> list[PageObject]:
+    def add_payloads(self, payloads: list[Payload]) -> int:
+        """Add the selected pages of ``payloads`` and return how many were added.
+
+        With the pikepdf backend, PDFs whose pages are kept unchanged are
+        concatenated by qpdf without being parsed by pypdf at all.
+        """
+        if self._backend is None:
+            self._backend = self._choose_engine(payloads)
+
+        if self._backend == "pikepdf" and self._can_concatenate(payloads):
+            if self._concatenation is None:
+                self._concatenation = QpdfConcatenation(_load_pikepdf())
+            added = 0
+            with stage("merge.concatenate"):
+                for payload in payloads:
+                    added += self._concatenation.add(
+                        payload.filename, payload.data, payload.pages, payload.digest
+                    )
+                    self._concatenated.append(payload)
+            return added
+
+        if self._concatenation is not None:
+            # A later document needs pypdf, so the copied ones are laid out there too
+            self._concatenation.close()
+            self._concatenation = None
+            self._pages.extend(self._process_payloads(self._concatenated))
+            self._concatenated = []
+            if self.engine == "auto":
+                self._backend = "pypdf"
+
+        pages = self._process_payloads(payloads)
+        self._pages.extend(pages)
+        return len(pages)
+
+    def _process_payloads(self, payloads: list[Payload]) -> list[PageObject]:
         pages: list[PageObject] = []
         for payload in payloads:
-            try:
-                pdf = self._load_document(payload)
-            except HTTPException:
-                raise
-            except Exception as exc:  # pragma: no cover - defensive
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Failed to read '{payload.filename}': {exc}",
-                ) from exc
-
-            if pdf.is_encrypted:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Encrypted PDF not supported: {payload.filename}",
-                )
+            with stage("merge.open"):
+                pdf = self._open_payload(payload)
+            with stage("merge.layout"):
+                selection = payload.pages.resolve(len(pdf.pages))
+                for page_index in selection:
+                    page = cast(PageObject, pdf.pages[page_index])
+                    pages.append(self._render_page(page, payload.options))
+        return pages
 
-            indices = parse_page_ranges(payload.ranges, len(pdf.pages))
-            for page_index in indices:
+    def _plan_payloads(self, payloads: list[Payload]) -> list[dict[str, Any]]:
+        files: list[dict[str, Any]] = []
+        for payload in payloads:
+            pdf = self._open_payload(payload)
+            selection = payload.pages.resolve(len(pdf.pages))
+            usage: dict[LayoutPlan, int] = {}
+            for page_index in selection:
                 page = cast(PageObject, pdf.pages[page_index])
-                pages.append(self._render_page(page, payload.options))
-        return pages
+                plan = self._layout_plan(page, payload.options)
+                usage[plan] = usage.get(plan, 0) + 1
+            files.append({
+                "filename": payload.filename,
+                "pages": len(selection),
+                "layouts": [
+                    {**plan.describe(), "pages": count} for plan, count in usage.items()
+                ],
+            })
+        return files
+
+    def _open_payload(self, payload: Payload) -> PdfReader:
+        # Identical uploads are parsed once and share their pages. Images are
+        # converted for their layout, so the options are part of their key.
+        key = (payload.digest, None if self._is_pdf(payload) else payload.options)
+        cached = self._documents.get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            pdf = self._load_document(payload)
+        except HTTPException:
+            raise
+        except Exception as exc:  # pragma: no cover - defensive
+            raise HTTPException(
+                status_code=400,
+                detail=f"Failed to read '{payload.filename}': {exc}",
+            ) from exc
+
+        if pdf.is_encrypted:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Encrypted PDF not supported: {payload.filename}",
+            )
+        self._documents[key] = pdf
+        return pdf
+
+    @staticmethod
+    def _is_pdf(payload: Payload) -> bool:
+        return payload.filename.lower().endswith(".pdf") or payload.content_type == "application/pdf"
 
     @staticmethod
     def _is_supported_image_source(filename: str, content_type: str) -> bool:
@@ -195,14 +530,15 @@ class PdfMergerService:
             return any(token in lowered_type for token in ("jpeg", "jpg", "png"))
         return False
 
-    def _load_document(self, payload: _Payload) -> PdfReader:
+    def _load_document(self, payload: Payload) -> PdfReader:
         filename = payload.filename
-        lowered_name = filename.lower()
-        content_type = payload.content_type
-        if lowered_name.endswith(".pdf") or content_type == "application/pdf":
-            return PdfReader(io.BytesIO(payload.data))
-        if self._is_supported_image_source(filename, content_type):
-            pdf_bytes = self._convert_image_to_pdf(payload.data, payload.filename)
+        if self._is_pdf(payload):
+            data = payload.data
+            return PdfReader(data if isinstance(data, mmap.mmap) else io.BytesIO(data))
+        if self._is_supported_image_source(filename, payload.content_type):
+            pdf_bytes = self._convert_image_to_pdf(
+                payload.data, payload.filename, payload.options
+            )
             return PdfReader(io.BytesIO(pdf_bytes))
 
         raise HTTPException(
@@ -239,13 +575,23 @@ class PdfMergerService:
         )
 
     @staticmethod
-    def _convert_image_to_pdf(data: bytes, filename: str) -> bytes:
+    def _convert_image_to_pdf(data: bytes, filename: str, options: LayoutOptions) -> bytes:
         try:
             with Image.open(io.BytesIO(data)) as image:
+                width, height = image.size
+                if width * height > settings.max_image_pixels:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Image too large: {filename} ({width}x{height} pixels)",
+                    )
+
+                image = PdfMergerService._decode_reduced(image, options)
+                # Keep the physical page size of the full-resolution image
+                resolution = 72.0 * image.size[0] / width
                 image = ImageOps.exif_transpose(image)
                 prepared = PdfMergerService._prepare_image(image).copy()
                 output = io.BytesIO()
-                prepared.save(output, format="PDF")
+                prepared.save(output, format="PDF", resolution=resolution)
         except UnidentifiedImageError as exc:
             raise HTTPException(
                 status_code=400, detail=f"Invalid image file: {filename}"
@@ -261,6 +607,52 @@ class PdfMergerService:
         output.seek(0)
         return output.read()
 
+    @staticmethod
+    def _decode_reduced(image: Image.Image, options: LayoutOptions) -> Image.Image:
+        """Decode an image at roughly the resolution its target page needs.
+
+        JPEGs are decoded with DCT scaling through ``draft``; other formats are
+        shrunk by an integer factor with ``reduce`` right after decoding.
+        """
+
+        width, height = image.size
+        scale = PdfMergerService._image_decode_scale(width, height, options)
+        if scale >= 0.5:
+            return image
+
+        wanted = (max(1, math.ceil(width * scale)), max(1, math.ceil(height * scale)))
+        image.draft(image.mode, wanted)
+        if image.mode == "P":
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        factor = min(image.size[0] // wanted[0], image.size[1] // wanted[1])
+        if factor >= 2 and image.mode in ("L", "LA", "RGB", "RGBA", "CMYK"):
+            image = image.reduce(factor)
+        return image
+
+    @staticmethod
+    def _image_decode_scale(width: int, height: int, options: LayoutOptions) -> float:
+        """Return the largest scale at which an image can be drawn on its target page."""
+
+        paper_size = cast(PaperSize, options.paper_size or "A4")
+        orientations: tuple[Orientation, ...] = (
+            (options.orientation,) if options.orientation else ("portrait", "landscape")
+        )
+        fit = max if options.fit_mode == "crop" else min
+        pixels_per_point = settings.image_decode_dpi / 72.0
+        scale = 0.0
+        for orientation in orientations:
+            target_width, target_height = _PAGE_DIMENSIONS[(paper_size, orientation)]
+            # Rotation may swap the image axes, so consider both
+            for image_width, image_height in ((width, height), (height, width)):
+                scale = max(
+                    scale,
+                    fit(
+                        target_width * pixels_per_point / image_width,
+                        target_height * pixels_per_point / image_height,
+                    ),
+                )
+        return scale
+
     @staticmethod
     def _prepare_image(image: Image.Image) -> Image.Image:
         if image.mode in ("RGB", "L"):
@@ -277,42 +669,113 @@ class PdfMergerService:
         return image.convert("RGB")
 
     @staticmethod
-    def _infer_orientation(page: PageObject) -> Orientation:
-        mediabox = page.mediabox
-        original_width = float(mediabox.width or 0)
-        original_height = float(mediabox.height or 0)
-        if original_width <= 0 or original_height <= 0:
+    def _infer_orientation(width: float, height: float) -> Orientation:
+        if width <= 0 or height <= 0:
             return "portrait"
-        return "landscape" if original_width >= original_height else "portrait"
+        return "landscape" if width >= height else "portrait"
 
     def _target_dimensions(self, paper_size: PaperSize, orientation: Orientation) -> Tuple[float, float]:
         return _PAGE_DIMENSIONS[(paper_size, orientation)]
 
     def _render_page(self, page: PageObject, options: LayoutOptions) -> PageObject:
-        working_page = page
-        rotation = options.rotation
-        if rotation:
-            working_page = self._apply_rotation(working_page, rotation)
+        plan = self._layout_plan(page, options)
+
+        if plan.target_size is None:
+            if not options.rotation:
+                return page
+            # Rotate a shallow copy so that repeated selections of the same
+            # source page do not accumulate rotations on the shared object.
+            rotated = PageObject(page.pdf)
+            rotated.update(page)
+            return self._apply_rotation(rotated, options.rotation)
+
+        new_page = self._blank_page(plan.target_size)
+        if self.placement == "xobject":
+            self._place_xobject(new_page, page, cast(Tuple[float, ...], plan.ctm))
+        else:
+            new_page.merge_transformed_page(page, cast(Any, plan.ctm), expand=False)
+        return new_page
 
+    def _place_xobject(
+        self, new_page: PageObject, page: PageObject, ctm: Tuple[float, ...]
+    ) -> None:
+        """Draw ``page`` on ``new_page`` through a Form XObject shared by all its copies."""
+
+        name, reference = self._page_xobject(page)
+        new_page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/XObject"): DictionaryObject({name: reference}),
+        })
+        matrix = " ".join(f"{value:.6f}".rstrip("0").rstrip(".") for value in ctm)
+        content = DecodedStreamObject()
+        content.set_data(f"q {matrix} cm {name} Do Q".encode("ascii"))
+        new_page.replace_contents(content)
+
+    def _page_xobject(self, page: PageObject) -> tuple[NameObject, IndirectObject]:
+        # The reader is part of the key so that it stays alive while cached
+        source_id = page.indirect_reference.idnum if page.indirect_reference else id(page)
+        key = (page.pdf, source_id)
+        cached = self._page_xobjects.get(key)
+        if cached is not None:
+            return cached
+
+        contents = page.get_contents()
+        form = DecodedStreamObject()
+        form.set_data(contents.get_data() if contents is not None else b"")
+        cropbox = page.cropbox
+        form.update({
+            NameObject("/Type"): NameObject("/XObject"),
+            NameObject("/Subtype"): NameObject("/Form"),
+            NameObject("/BBox"): ArrayObject(
+                FloatObject(value)
+                for value in (cropbox.left, cropbox.bottom, cropbox.right, cropbox.top)
+            ),
+            NameObject("/Resources"): page.get("/Resources", DictionaryObject()),
+        })
+        # Cloning pulls the resources into the writer; adding the result makes
+        # the form a single indirect object referenced by every placement.
+        reference = self._writer._add_object(form.flate_encode().clone(self._writer))
+        entry = (NameObject(f"/SrcPage{len(self._page_xobjects)}"), reference)
+        self._page_xobjects[key] = entry
+        return entry
+
+    def _layout_plan(self, page: PageObject, options: LayoutOptions) -> LayoutPlan:
+        mediabox = page.mediabox
+        source_box = (
+            float(mediabox.left),
+            float(mediabox.bottom),
+            float(mediabox.right),
+            float(mediabox.top),
+        )
+        key = (source_box, self._page_rotation(page, options.rotation or 0), options)
+        plan = self._layout_plans.get(key)
+        if plan is None:
+            plan = self._compute_layout_plan(*key)
+            self._layout_plans[key] = plan
+        return plan
+
+    def _compute_layout_plan(
+        self,
+        source_box: Tuple[float, float, float, float],
+        applied_rotation: int,
+        options: LayoutOptions,
+    ) -> LayoutPlan:
         if options.paper_size is None:
-            return working_page
+            return LayoutPlan(source_box=source_box, rotation=applied_rotation)
+
+        left, bottom, right, top = source_box
+        mediabox_width = right - left
+        mediabox_height = top - bottom
 
         paper_size = cast(PaperSize, options.paper_size)
         orientation = cast(
             Orientation,
-            options.orientation or self._infer_orientation(working_page),
+            options.orientation or self._infer_orientation(mediabox_width, mediabox_height),
         )
         fit_mode = cast(FitMode, options.fit_mode or _DEFAULT_FIT_MODE)
         target_width, target_height = self._target_dimensions(paper_size, orientation)
-        new_page = PageObject.create_blank_page(width=target_width, height=target_height)
 
-        applied_rotation = self._page_rotation(working_page)
-        if applied_rotation:
-            working_page = cast(PageObject, working_page.rotate(-applied_rotation))
-
-        mediabox = working_page.mediabox
-        original_width = float(mediabox.width or target_width)
-        original_height = float(mediabox.height or target_height)
+        original_width = mediabox_width or target_width
+        original_height = mediabox_height or target_height
 
         if original_width <= 0 or original_height <= 0:
             original_width = target_width
@@ -339,10 +802,7 @@ class PdfMergerService:
         offset_x = (target_width - scaled_width) / 2
         offset_y = (target_height - scaled_height) / 2
 
-        transform = (
-            Transformation()
-            .translate(-float(mediabox.left), -float(mediabox.bottom))
-        )
+        transform = Transformation().translate(-left, -bottom)
 
         if applied_rotation:
             transform = transform.rotate(applied_rotation).translate(
@@ -354,8 +814,25 @@ class PdfMergerService:
             .scale(scale_factor)
             .translate(offset_x, offset_y)
         )
-        new_page.merge_transformed_page(working_page, transform, expand=False)
-        return new_page
+        return LayoutPlan(
+            source_box=source_box,
+            rotation=applied_rotation,
+            target_size=(target_width, target_height),
+            scale=scale_factor,
+            offset=(offset_x, offset_y),
+            ctm=cast(Tuple[float, float, float, float, float, float], tuple(transform.ctm)),
+        )
+
+    def _blank_page(self, size: Tuple[float, float]) -> PageObject:
+        template = self._page_templates.get(size)
+        if template is None:
+            template = PageObject.create_blank_page(width=size[0], height=size[1])
+            self._page_templates[size] = template
+
+        page = PageObject()
+        page.update(template)
+        page[NameObject("/Resources")] = DictionaryObject()
+        return page
 
     @staticmethod
     def _apply_rotation(page: PageObject, rotation: Rotation) -> PageObject:
@@ -377,12 +854,12 @@ class PdfMergerService:
         return page
 
     @staticmethod
-    def _page_rotation(page: PageObject) -> int:
+    def _page_rotation(page: PageObject, extra: int = 0) -> int:
         try:
             value = int(page.get("/Rotate", 0))
         except (TypeError, ValueError):
             return 0
-        value %= 360
+        value = (value + extra) % 360
         if value in (90, 180, 270):
             return value
         return 0
@@ -399,24 +876,304 @@ class PdfMergerService:
             return (0.0, width)
         return (0.0, 0.0)
 
-    def export(self, output_name: Optional[str]) -> StreamingResponse:
-        writer = PdfWriter()
-        for page in self._pages:
-            writer.add_page(page)
+    def _downsample_images(self, writer: PdfWriter, max_dpi: int) -> None:
+        """Resample images whose effective resolution on the output pages exceeds ``max_dpi``."""
+
+        placements: dict[int, tuple[IndirectObject, float, float]] = {}
+        form_operations: dict[int, list[Any]] = {}
+        for page in writer.pages:
+            contents = page.get_contents()
+            if contents is None:
+                continue
+            self._measure_images(
+                writer,
+                contents.operations,
+                page.get("/Resources"),
+                _IDENTITY_MATRIX,
+                placements,
+                form_operations,
+                frozenset(),
+            )
 
-        buffer = io.BytesIO()
-        writer.write(buffer)
-        buffer.seek(0)
+        for reference, width_pts, height_pts in placements.values():
+            image_object = cast(StreamObject, reference.get_object())
+            replacement = self._resample_image(image_object, width_pts, height_pts, max_dpi)
+            if replacement is not None:
+                writer._replace_object(reference, replacement)
 
-        if self.engine == "pikepdf" and pikepdf is not None:
-            with pikepdf.open(buffer) as pdf:
-                buffer = io.BytesIO()
-                pdf.save(buffer)
-            buffer.seek(0)
+    def _measure_images(
+        self,
+        writer: PdfWriter,
+        operations: list[Any],
+        resources: Any,
+        ctm: Matrix,
+        placements: dict[int, tuple[IndirectObject, float, float]],
+        form_operations: dict[int, list[Any]],
+        active_forms: frozenset[int],
+    ) -> None:
+        """Track the CTM through a content stream and record the largest size each image is drawn at."""
+
+        resources = resources.get_object() if resources is not None else DictionaryObject()
+        xobjects = resources.get("/XObject")
+        xobjects = xobjects.get_object() if xobjects is not None else DictionaryObject()
+        saved: list[Matrix] = []
+        for operands, operator in operations:
+            if operator == b"q":
+                saved.append(ctm)
+            elif operator == b"Q":
+                if saved:
+                    ctm = saved.pop()
+            elif operator == b"cm" and len(operands) == 6:
+                ctm = self._multiply_matrix(tuple(float(value) for value in operands), ctm)
+            elif operator == b"Do" and operands:
+                reference = xobjects.get(operands[0])
+                if not isinstance(reference, IndirectObject):
+                    continue
+                xobject = reference.get_object()
+                subtype = xobject.get("/Subtype")
+                if subtype == "/Image":
+                    # The image occupies the unit square mapped through the CTM
+                    width_pts = math.hypot(ctm[0], ctm[1])
+                    height_pts = math.hypot(ctm[2], ctm[3])
+                    known = placements.get(reference.idnum)
+                    if known is not None:
+                        width_pts = max(width_pts, known[1])
+                        height_pts = max(height_pts, known[2])
+                    placements[reference.idnum] = (reference, width_pts, height_pts)
+                elif subtype == "/Form" and reference.idnum not in active_forms:
+                    form_ops = form_operations.get(reference.idnum)
+                    if form_ops is None:
+                        form_ops = ContentStream(xobject, writer).operations
+                        form_operations[reference.idnum] = form_ops
+                    matrix = cast(
+                        Matrix,
+                        tuple(float(value) for value in xobject.get("/Matrix", _IDENTITY_MATRIX)),
+                    )
+                    self._measure_images(
+                        writer,
+                        form_ops,
+                        xobject.get("/Resources", resources),
+                        self._multiply_matrix(matrix, ctm),
+                        placements,
+                        form_operations,
+                        active_forms | {reference.idnum},
+                    )
+
+    @staticmethod
+    def _multiply_matrix(first: Any, second: Matrix) -> Matrix:
+        a, b, c, d, e, f = first
+        a2, b2, c2, d2, e2, f2 = second
+        return (
+            a * a2 + b * c2,
+            a * b2 + b * d2,
+            c * a2 + d * c2,
+            c * b2 + d * d2,
+            e * a2 + f * c2 + e2,
+            e * b2 + f * d2 + f2,
+        )
+
+    def _resample_image(
+        self,
+        image_object: StreamObject,
+        width_pts: float,
+        height_pts: float,
+        max_dpi: int,
+    ) -> Optional[StreamObject]:
+        """Return a smaller JPEG (photos) or Flate (everything else) copy of an image, if worthwhile."""
+
+        # Masks, decode arrays and bilevel images cannot be rebuilt faithfully
+        if any(key in image_object for key in ("/SMask", "/Mask", "/ImageMask", "/Decode")):
+            return None
+        pixel_width = int(image_object.get("/Width", 0))
+        pixel_height = int(image_object.get("/Height", 0))
+        if pixel_width <= 0 or pixel_height <= 0 or width_pts <= 0 or height_pts <= 0:
+            return None
+
+        ratio = max(
+            width_pts / 72 * max_dpi / pixel_width,
+            height_pts / 72 * max_dpi / pixel_height,
+        )
+        if ratio >= _MIN_DOWNSAMPLE_RATIO:
+            return None
+
+        try:
+            _, _, image = _xobj_to_image(image_object)
+        except Exception:  # pragma: no cover - undecodable images are kept as-is
+            return None
+        if image.mode == "P":
+            image = image.convert("RGB")
+        if image.mode not in ("RGB", "L"):
+            return None
+
+        size = (max(1, round(pixel_width * ratio)), max(1, round(pixel_height * ratio)))
+        resized = image.resize(size, Image.LANCZOS)
+
+        filters = image_object.get("/Filter")
+        if isinstance(filters, ArrayObject):
+            filters = filters[-1] if filters else None
+        replacement: StreamObject
+        if filters == "/DCTDecode":
+            output = io.BytesIO()
+            resized.save(output, format="JPEG", quality=self.image_quality, optimize=True)
+            replacement = DecodedStreamObject()
+            replacement.set_data(output.getvalue())
+            replacement[NameObject("/Filter")] = NameObject("/DCTDecode")
+        else:
+            decoded = DecodedStreamObject()
+            decoded.set_data(resized.tobytes())
+            replacement = decoded.flate_encode()
+
+        replacement.update({
+            NameObject("/Type"): NameObject("/XObject"),
+            NameObject("/Subtype"): NameObject("/Image"),
+            NameObject("/Width"): NumberObject(size[0]),
+            NameObject("/Height"): NumberObject(size[1]),
+            NameObject("/BitsPerComponent"): NumberObject(8),
+            NameObject("/ColorSpace"): self._image_colorspace(
+                image_object.get("/ColorSpace"), resized.mode
+            ),
+        })
+        return replacement
+
+    @staticmethod
+    def _image_colorspace(original: Any, mode: str) -> Any:
+        components = 1 if mode == "L" else 3
+        device = NameObject("/DeviceGray" if components == 1 else "/DeviceRGB")
+        if original is None:
+            return device
+        resolved = original.get_object()
+        if isinstance(resolved, NameObject):
+            return original if resolved == device else device
+        if isinstance(resolved, ArrayObject) and resolved and resolved[0] == "/ICCBased":
+            profile = resolved[1].get_object()
+            if int(profile.get("/N", 0)) == components:
+                return original
+        return device
+
+    def _finish_pages(self) -> PdfWriter:
+        writer = self._writer
+        with stage("merge.add_pages"):
+            for page in self._pages:
+                writer.add_page(page)
+
+        if self.max_image_dpi is not None:
+            with stage("merge.downsample"):
+                self._downsample_images(writer, self.max_image_dpi)
+        if self.stamp is not None:
+            # Numbering needs the final page order, so stamps are added here
+            # rather than while each source page is laid out
+            with stage("merge.stamp"):
+                PageStamper(writer, self.stamp).apply(writer.pages, len(writer.pages))
+        return writer
+
+    async def export_incremental(
+        self, base: UploadFile, output_name: Optional[str]
+    ) -> StreamingResponse:
+        """Stream ``base`` unchanged followed by the collected pages as an incremental update."""
+
+        update, section = await to_thread.run_sync(
+            profiled(self._build_increment), base, limiter=get_pdf_merge_limiter()
+        )
+        headers = {
+            "Content-Disposition": f'attachment; filename="{self._output_filename(output_name)}"',
+            "Content-Length": str(update.base_size + len(section)),
+        }
+        return StreamingResponse(
+            update.iter_output(section), media_type="application/pdf", headers=headers
+        )
+
+    def _build_increment(self, base: UploadFile) -> tuple[IncrementalUpdate, bytes]:
+        source = detach_upload(base)
+        try:
+            update = IncrementalUpdate(source, base.filename or "<unnamed>")
+        except Exception:
+            source.close()
+            raise
+        writer = self._finish_pages()
+        return update, update.build(list(writer.pages))
 
+    @staticmethod
+    def _output_filename(output_name: Optional[str]) -> str:
         final_name = output_name or "merged.pdf"
         if not final_name.lower().endswith(".pdf"):
             final_name += ".pdf"
+        return final_name
+
+    async def export(self, output_name: Optional[str]) -> StreamingResponse:
+        """Render the merged PDF on a worker thread and return it as a download."""
 
-        headers = {"Content-Disposition": f'attachment; filename="{final_name}"'}
+        # Rendering writes every page and, with max_image_dpi, decodes and
+        # resamples each embedded image, so it must not run on the event loop
+        buffer = await to_thread.run_sync(profiled(self.render), limiter=get_pdf_merge_limiter())
+        headers = {
+            "Content-Disposition": f'attachment; filename="{self._output_filename(output_name)}"',
+            "X-PDF-Engine": self.resolved_engine,
+        }
         return StreamingResponse(buffer, media_type="application/pdf", headers=headers)
+
+    async def save(self, target: Path) -> int:
+        """Render the merged PDF into ``target``, replacing it atomically. Returns its size."""
+
+        def write() -> int:
+            return write_document(target, self.render().getbuffer())
+
+        return await to_thread.run_sync(profiled(write), limiter=get_pdf_merge_limiter())
+
+    def render(self) -> io.BytesIO:
+        """Write the collected pages to a PDF buffer positioned at its start. A merger renders once."""
+
+        if self._concatenation is not None:
+            # qpdf keeps the output and every source open until they are
+            # closed, so they are released as soon as the output is written
+            concatenation, self._concatenation = self._concatenation, None
+            self._concatenated = []
+            try:
+                with stage("merge.qpdf_save"):
+                    return concatenation.save(
+                        **self._qpdf_save_options(_load_pikepdf(), self.object_streams)
+                    )
+            finally:
+                concatenation.close()
+
+        writer = self._finish_pages()
+
+        if self.optimize:
+            # Collapse byte-identical objects (fonts, ICC profiles, logos)
+            # coming from different inputs into a single copy.
+            with stage("merge.optimize"):
+                writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+
+        buffer = io.BytesIO()
+        with stage("merge.write"):
+            writer.write(buffer)
+        buffer.seek(0)
+
+        object_streams = self.object_streams
+        if object_streams == "preserve" and self.optimize:
+            object_streams = "generate"
+
+        # pypdf can neither linearize nor write object streams, so those
+        # options are applied by qpdf in the single pikepdf save below.
+        use_qpdf = (
+            self.resolved_engine == "pikepdf"
+            or self.linearize
+            or object_streams != "preserve"
+            or settings.pdf_compression_level is not None
+        )
+        pikepdf = _load_pikepdf() if use_qpdf else None
+        if pikepdf is not None:
+            with stage("merge.qpdf_save"), pikepdf.open(buffer) as pdf:
+                buffer = io.BytesIO()
+                pdf.save(buffer, **self._qpdf_save_options(pikepdf, object_streams))
+            buffer.seek(0)
+        return buffer
+
+    def _qpdf_save_options(self, pikepdf: Any, object_streams: ObjectStreams) -> dict[str, Any]:
+        save_options: dict[str, Any] = {
+            "object_stream_mode": getattr(pikepdf.ObjectStreamMode, object_streams),
+            "linearize": self.linearize,
+        }
+        if settings.pdf_compression_level is not None:
+            _configure_flate_level(settings.pdf_compression_level)
+            save_options["recompress_flate"] = True
+        return save_options
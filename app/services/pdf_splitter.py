@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import io
+import threading
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Optional
+
+import anyio
+from anyio import to_thread
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from pypdf import PdfReader, PdfWriter
+
+from app.core.concurrency import get_pdf_merge_limiter
+from app.utils.page_ranges import PageSelection, PageSpec, parse_page_spec
+from app.utils.uploads import detach_upload
+from app.utils.zip_stream import StreamingZip
+
+
+class PdfSplitterService:
+    """Split one PDF into several documents and stream them as a ZIP file."""
+
+    def __init__(self, groups: Optional[list[str]] = None, every: Optional[int] = None) -> None:
+        """
+        Initialize the splitter.
+
+        Args:
+            groups: Page range strings, one per output document
+            every: Start a new output document every N pages
+        """
+        if (groups is None) == (every is None):
+            raise HTTPException(
+                status_code=400,
+                detail="Provide either page range groups or an 'every' page count.",
+            )
+        if every is not None and every < 1:
+            raise HTTPException(status_code=400, detail="'every' must be at least 1")
+        if groups is not None and not groups:
+            raise HTTPException(status_code=400, detail="No page range groups given.")
+
+        # Reject malformed ranges before reading the upload
+        self._specs: Optional[list[PageSpec]] = None
+        if groups is not None:
+            for group in groups:
+                if not group.strip():
+                    raise HTTPException(status_code=400, detail="Empty page range group")
+            self._specs = [parse_page_spec(group) for group in groups]
+        self.every = every
+
+    async def split(self, file: UploadFile, output_name: Optional[str] = None) -> StreamingResponse:
+        """
+        Split the uploaded PDF and stream the parts as a ZIP file.
+
+        Page ranges are checked against the document before the response
+        starts. Parts are then built a few at a time, sharing one parsed
+        source document, and each is written to the ZIP as soon as it is ready.
+
+        Args:
+            file: The uploaded PDF file
+            output_name: Optional name of the ZIP file
+
+        Returns:
+            StreamingResponse containing a ZIP file with one PDF per part
+        """
+        filename = file.filename or "document.pdf"
+        if not filename.lower().endswith(".pdf") and file.content_type != "application/pdf":
+            raise HTTPException(status_code=400, detail="Only PDF files can be split")
+
+        source = detach_upload(file)
+        try:
+            reader, parts = await to_thread.run_sync(
+                self._prepare, source, filename, limiter=get_pdf_merge_limiter()
+            )
+        except BaseException:
+            source.close()
+            raise
+
+        stem = Path(filename).stem
+        archive_name = output_name or f"{stem}_split.zip"
+        if not archive_name.lower().endswith(".zip"):
+            archive_name += ".zip"
+        headers = {"Content-Disposition": f'attachment; filename="{archive_name}"'}
+        return StreamingResponse(
+            self._stream_parts(source, reader, parts, stem),
+            media_type="application/zip",
+            headers=headers,
+        )
+
+    def _prepare(self, source: BinaryIO, filename: str) -> tuple[PdfReader, list[PageSelection]]:
+        source.seek(0, io.SEEK_END)
+        if source.tell() == 0:
+            raise HTTPException(status_code=400, detail="Empty file uploaded")
+        source.seek(0)
+
+        try:
+            reader = PdfReader(source)
+        except Exception as exc:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Failed to read PDF '{filename}': {exc}"
+            ) from exc
+        if reader.is_encrypted:
+            raise HTTPException(status_code=400, detail=f"Encrypted PDF not supported: {filename}")
+
+        total_pages = len(reader.pages)
+        if self._specs is not None:
+            parts = [spec.resolve(total_pages) for spec in self._specs]
+        else:
+            assert self.every is not None
+            parts = [
+                PageSelection((range(start, min(start + self.every, total_pages)),))
+                for start in range(0, total_pages, self.every)
+            ]
+        if not parts or not all(parts):
+            raise HTTPException(status_code=400, detail="Split would produce an empty document")
+        return reader, parts
+
+    async def _stream_parts(
+        self,
+        source: BinaryIO,
+        reader: PdfReader,
+        parts: list[PageSelection],
+        stem: str,
+    ) -> AsyncIterator[bytes]:
+        # Only as many parts as the worker limiter allows are held in memory
+        window = max(1, int(get_pdf_merge_limiter().total_tokens))
+        digits = max(3, len(str(len(parts))))
+        reader_lock = threading.Lock()
+        archive = StreamingZip()
+        try:
+            for first in range(0, len(parts), window):
+                batch = parts[first:first + window]
+                results: list[bytes] = [b""] * len(batch)
+
+                async def build(offset: int, selection: PageSelection) -> None:
+                    results[offset] = await to_thread.run_sync(
+                        self._build_part,
+                        reader,
+                        reader_lock,
+                        selection,
+                        limiter=get_pdf_merge_limiter(),
+                    )
+
+                async with anyio.create_task_group() as task_group:
+                    for offset, selection in enumerate(batch):
+                        task_group.start_soon(build, offset, selection)
+
+                for offset, data in enumerate(results):
+                    number = first + offset + 1
+                    archive.writestr(f"{stem}_part{number:0{digits}d}.pdf", data)
+                    results[offset] = b""
+                    yield archive.drain()
+            yield archive.close()
+        finally:
+            source.close()
+
+    @staticmethod
+    def _build_part(
+        reader: PdfReader, reader_lock: threading.Lock, selection: PageSelection
+    ) -> bytes:
+        writer = PdfWriter()
+        # The shared reader seeks in the source file and caches parsed
+        # objects, so copying pages out of it is serialized
+        with reader_lock:
+            for page_index in selection:
+                writer.add_page(reader.pages[page_index])
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        return buffer.getvalue()
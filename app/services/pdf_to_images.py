@@ -1,40 +1,152 @@
 from __future__ import annotations
 
 import io
+import math
+import struct
+import threading
 import zipfile
+import zlib
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Callable, Iterator, Literal, Optional, Tuple
 
+import anyio
 import fitz  # PyMuPDF
 from anyio import to_thread
 from fastapi import HTTPException, UploadFile
 from fastapi.responses import StreamingResponse
+from PIL import Image, ImageChops, TiffImagePlugin
 
 from app.core.concurrency import get_pdf_merge_limiter
-from app.utils.page_ranges import parse_page_ranges
+from app.core.config import settings
+from app.core.profiling import profiled
+from app.utils.page_ranges import PageSelection, PageSpec, parse_page_spec
+from app.utils.zip_stream import StreamingZip
+
+
+ImageFormat = Literal["jpeg", "png", "webp", "tiff"]
+ColorMode = Literal["rgb", "gray", "auto"]
+
+# File extension used for each output format inside the ZIP archive.
+_FORMAT_EXTENSIONS: dict[ImageFormat, str] = {
+    "jpeg": "jpg",
+    "png": "png",
+    "webp": "webp",
+    "tiff": "tiff",
+}
+
+# Uncompressed size of a strip in TIFF frames assembled from bands
+_TIFF_STRIP_BYTES = 256 * 1024
+
+
+class _OutputBudget:
+    """Byte budget for the images of one ZIP file, shared by all of its documents."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, size: int) -> bool:
+        with self._lock:
+            if self.used + size > self.limit:
+                return False
+            self.used += size
+            return True
+
+
+@dataclass
+class _DocumentJob:
+    filename: str
+    document: fitz.Document
+    folder: str
+    page_indices: PageSelection
+
+
+@dataclass
+class RenderedDocument:
+    """Outcome of rendering one document: pages written, pages over the size limit, bytes."""
+
+    pages_processed: int = 0
+    pages_skipped: int = 0
+    output_size: int = 0
 
 
 class PdfToImagesService:
-    """Convert PDF pages to images (JPG) and package them as a ZIP file."""
+    """Convert PDF pages to images (JPG, PNG, WebP or TIFF) and package them as a ZIP file."""
 
     # Maximum total size of output images in bytes (~300MB)
     MAX_OUTPUT_SIZE_BYTES = 300 * 1024 * 1024
 
-    def __init__(self, dpi: int = 200, quality: int = 85) -> None:
+    # Size budget planning: number of pages sampled, the two low resolutions
+    # used to estimate how output size grows with DPI, the lowest JPG quality
+    # the planner may pick, and the share of the budget it aims for.
+    BUDGET_SAMPLE_PAGES = 4
+    BUDGET_SAMPLE_DPIS = (36, 72)
+    BUDGET_MIN_QUALITY = 60
+    BUDGET_SAFETY_MARGIN = 0.9
+
+    # Monochrome detection for the "auto" color mode: resolution of the probe
+    # render and the largest channel difference still treated as gray.
+    MONOCHROME_PROBE_DPI = 36
+    MONOCHROME_TOLERANCE = 8
+
+    def __init__(
+        self,
+        dpi: int = 200,
+        quality: int = 85,
+        target_size_mb: Optional[float] = None,
+        image_format: ImageFormat = "jpeg",
+        png_compress_level: int = 6,
+        color_mode: ColorMode = "rgb",
+        max_page_pixels: Optional[int] = None,
+    ) -> None:
         """
         Initialize the PDF to images service.
 
         Args:
             dpi: Resolution for rendering PDF pages (default: 200)
-            quality: JPG quality from 1-100 (default: 85)
+            quality: JPG/WebP quality from 1-100 (default: 85)
+            target_size_mb: Optional output size budget in MB. When set, DPI and
+                quality are lowered up front so that all pages fit the budget.
+            image_format: Output format: jpeg, png, webp, or tiff for a single
+                multi-page TIFF (default: jpeg)
+            png_compress_level: zlib level 0-9 used for PNG output (default: 6)
+            color_mode: rgb renders in color, gray renders in grayscale, auto
+                renders monochrome pages in grayscale (default: rgb)
+            max_page_pixels: Pages larger than this many pixels are rendered
+                and emitted as horizontal tiles (default: from settings)
         """
         if dpi < 72 or dpi > 600:
             raise HTTPException(status_code=400, detail="DPI must be between 72 and 600")
         if quality < 1 or quality > 100:
             raise HTTPException(status_code=400, detail="Quality must be between 1 and 100")
+        if image_format not in _FORMAT_EXTENSIONS:
+            raise HTTPException(status_code=400, detail=f"Unsupported image format: {image_format}")
+        if png_compress_level < 0 or png_compress_level > 9:
+            raise HTTPException(
+                status_code=400, detail="PNG compress level must be between 0 and 9"
+            )
+        if color_mode not in ("rgb", "gray", "auto"):
+            raise HTTPException(status_code=400, detail=f"Unsupported color mode: {color_mode}")
+        max_target_mb = self.MAX_OUTPUT_SIZE_BYTES / (1024 * 1024)
+        if target_size_mb is not None and not 0 < target_size_mb <= max_target_mb:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Target size must be between 0 and {max_target_mb:.0f} MB",
+            )
 
         self.dpi = dpi
         self.quality = quality
+        self.target_size_bytes = (
+            int(target_size_mb * 1024 * 1024) if target_size_mb is not None else None
+        )
+        self.image_format = image_format
+        self.png_compress_level = png_compress_level
+        self.color_mode = color_mode
+        self.max_page_pixels = max(
+            1, max_page_pixels if max_page_pixels is not None else settings.max_render_pixels
+        )
 
     async def convert_pdf_to_images(
         self,
@@ -49,7 +161,7 @@ class PdfToImagesService:
             page_range: Page range specification (e.g., "1-3,5,7-9")
 
         Returns:
-            StreamingResponse containing a ZIP file with JPG images
+            StreamingResponse containing a ZIP file with the rendered images
         """
         # Read the uploaded file
         data = await file.read()
@@ -64,15 +176,73 @@ class PdfToImagesService:
                 detail="Only PDF files are supported for conversion to images"
             )
 
-        # Process in background thread
-        zip_buffer = await to_thread.run_sync(
-            self._process_pdf,
-            data,
-            filename,
+        return await self._zip_response(data, filename, page_range)
+
+    async def convert_path(self, path: Path, page_range: str = "") -> StreamingResponse:
+        """
+        Convert a server-local PDF and return the images as a ZIP file.
+
+        PyMuPDF opens the file by path and reads pages on demand.
+
+        Args:
+            path: PDF file to convert
+            page_range: Page range specification (e.g., "1-3,5,7-9")
+
+        Returns:
+            StreamingResponse containing a ZIP file with the rendered images
+        """
+        return await self._zip_response(path, path.name, page_range)
+
+    async def save_images(self, path: Path, page_range: str, output_dir: Path) -> RenderedDocument:
+        """
+        Convert a server-local PDF and write the images into a directory.
+
+        Args:
+            path: PDF file to convert
+            page_range: Page range specification (e.g., "1-3,5,7-9")
+            output_dir: Directory the images are written to (created if needed)
+
+        Returns:
+            The processed/skipped page counts and the bytes written
+        """
+        return await to_thread.run_sync(
+            profiled(self.convert_file),
+            path,
             page_range,
+            output_dir,
             limiter=get_pdf_merge_limiter(),
         )
 
+    async def convert_rendered(
+        self, render: Callable[[], bytes], filename: str, page_range: str = ""
+    ) -> StreamingResponse:
+        """
+        Convert a PDF produced on the worker thread and return the images as a ZIP file.
+
+        Used to rasterize a merge in the same request: the merged PDF goes
+        from ``render`` to PyMuPDF in memory and is never sent to the client
+        or uploaded again.
+
+        Args:
+            render: Callable that returns the PDF bytes, run on the worker thread
+            filename: Name of the rendered PDF; the ZIP file is named after it
+            page_range: Page range specification (e.g., "1-3,5,7-9")
+
+        Returns:
+            StreamingResponse containing a ZIP file with the rendered images
+        """
+        return await self._zip_response(render, filename, page_range)
+
+    async def _zip_response(
+        self, source: bytes | Path | Callable[[], bytes], filename: str, page_range: str
+    ) -> StreamingResponse:
+        def process() -> io.BytesIO:
+            data = source() if callable(source) else source
+            return self._process_pdf(data, filename, page_range)
+
+        # Process in background thread
+        zip_buffer = await to_thread.run_sync(profiled(process), limiter=get_pdf_merge_limiter())
+
         # Prepare output filename
         base_name = Path(filename).stem
         output_name = f"{base_name}_images.zip"
@@ -85,9 +255,180 @@ class PdfToImagesService:
             headers=headers,
         )
 
+    async def convert_many(
+        self,
+        files: list[UploadFile],
+        page_ranges: list[str],
+    ) -> StreamingResponse:
+        """
+        Convert several PDFs and stream the images as one ZIP file.
+
+        Each document's images go into a folder named after the file. Documents
+        are rendered concurrently by the worker pool, one window of documents
+        at a time, and each window is streamed once it is done; the output
+        size limit (and the target size, if set) applies to all documents
+        together.
+
+        Args:
+            files: The uploaded PDF files
+            page_ranges: Page range specification per file; missing or empty
+                entries select all pages
+
+        Returns:
+            StreamingResponse containing a ZIP file with one folder per document
+        """
+        # Validate every page range before reading any upload
+        specs = [
+            parse_page_spec(page_ranges[index] if index < len(page_ranges) else "")
+            for index in range(len(files))
+        ]
+
+        uploads: list[Tuple[str, bytes]] = []
+        for file in files:
+            filename = file.filename or "document.pdf"
+            if not filename.lower().endswith(".pdf") and file.content_type != "application/pdf":
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Only PDF files are supported for conversion to images: {filename}",
+                )
+            data = await file.read()
+            if len(data) == 0:
+                raise HTTPException(status_code=400, detail=f"Empty file: {filename}")
+            uploads.append((filename, data))
+
+        jobs = await to_thread.run_sync(
+            self._prepare_documents, uploads, specs, limiter=get_pdf_merge_limiter()
+        )
+        headers = {"Content-Disposition": 'attachment; filename="images.zip"'}
+        return StreamingResponse(
+            self._stream_documents(jobs),
+            media_type="application/zip",
+            headers=headers,
+        )
+
+    def _prepare_documents(
+        self,
+        uploads: list[Tuple[str, bytes]],
+        specs: list[PageSpec],
+    ) -> list[_DocumentJob]:
+        # Resolve every page range up front so that errors are reported before
+        # the response starts streaming. The documents stay open for rendering.
+        jobs: list[_DocumentJob] = []
+        folders: set[str] = set()
+        try:
+            for (filename, data), spec in zip(uploads, specs):
+                try:
+                    pdf_document = fitz.open(stream=data, filetype="pdf")
+                except Exception as exc:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Failed to open PDF file '{filename}': {exc}"
+                    ) from exc
+                try:
+                    if pdf_document.needs_pass:
+                        raise HTTPException(
+                            status_code=400, detail=f"Encrypted PDF not supported: {filename}"
+                        )
+                    total_pages = len(pdf_document)
+                    if total_pages == 0:
+                        raise HTTPException(
+                            status_code=400, detail=f"PDF has no pages: {filename}"
+                        )
+                    page_indices = spec.resolve(total_pages)
+                    if not page_indices:
+                        raise HTTPException(
+                            status_code=400, detail=f"No pages selected: {filename}"
+                        )
+                except Exception:
+                    pdf_document.close()
+                    raise
+
+                base_name = Path(filename).stem
+                folder = base_name
+                suffix = 2
+                while folder in folders:
+                    folder = f"{base_name}_{suffix}"
+                    suffix += 1
+                folders.add(folder)
+                jobs.append(_DocumentJob(filename, pdf_document, folder, page_indices))
+        except Exception:
+            _close_documents(jobs)
+            raise
+        return jobs
+
+    async def _stream_documents(self, jobs: list[_DocumentJob]) -> AsyncIterator[bytes]:
+        limiter = get_pdf_merge_limiter()
+        window = max(1, int(limiter.total_tokens))
+        budget = _OutputBudget(self.MAX_OUTPUT_SIZE_BYTES)
+        total_pages = sum(len(job.page_indices) for job in jobs)
+        archive = StreamingZip()
+        archive_lock = threading.Lock()
+        skipped: list[Tuple[str, int]] = []
+
+        def emit(name: str, image: bytes) -> None:
+            with archive_lock:
+                archive.writestr(name, image, compress_type=self._image_compress_type)
+
+        def convert(job: _DocumentJob) -> RenderedDocument:
+            target_bytes = None
+            if self.target_size_bytes is not None:
+                # Each document gets a share of the target by page count
+                target_bytes = self.target_size_bytes * len(job.page_indices) // total_pages
+            try:
+                return self._render_document(
+                    job.document,
+                    job.page_indices,
+                    Path(job.filename).stem,
+                    budget,
+                    target_bytes,
+                    emit,
+                    folder=f"{job.folder}/",
+                )
+            finally:
+                job.document.close()
+
+        # The images of a window are kept in the archive until all of its
+        # documents are done, so at most PDF_MERGE_MAX_PARALLEL documents'
+        # images (and never more than MAX_OUTPUT_SIZE_BYTES) are held at once
+        try:
+            for first in range(0, len(jobs), window):
+                batch = jobs[first:first + window]
+                results: list[Optional[RenderedDocument]] = [None] * len(batch)
+
+                async def run(offset: int) -> None:
+                    results[offset] = await to_thread.run_sync(
+                        convert, batch[offset], limiter=limiter
+                    )
+
+                async with anyio.create_task_group() as task_group:
+                    for offset in range(len(batch)):
+                        task_group.start_soon(run, offset)
+
+                for job, rendered in zip(batch, results):
+                    if rendered is not None and rendered.pages_skipped > 0:
+                        skipped.append((job.folder, rendered.pages_skipped))
+                with archive_lock:
+                    chunk = archive.drain()
+                yield chunk
+        finally:
+            # Documents not reached when the client disconnects
+            _close_documents(jobs)
+
+        if skipped:
+            lines = "".join(f"  {folder}: {count} page(s)\n" for folder, count in skipped)
+            note = (
+                f"Note: pages were skipped due to output size limit.\n{lines}"
+                f"Total output size: {budget.used / (1024 * 1024):.2f} MB\n"
+                f"Maximum allowed: {self.MAX_OUTPUT_SIZE_BYTES / (1024 * 1024):.0f} MB\n"
+                f"\nTo convert all pages, try reducing DPI or quality settings "
+                f"or set a target size."
+            )
+            archive.writestr("README.txt", note)
+        yield archive.close()
+
     def _process_pdf(
         self,
-        data: bytes,
+        data: bytes | Path,
         filename: str,
         page_range: str,
     ) -> io.BytesIO:
@@ -95,16 +436,22 @@ class PdfToImagesService:
         Process PDF and convert pages to images.
 
         Args:
-            data: PDF file bytes
+            data: PDF file bytes, or the path of a local PDF file
             filename: Original filename
             page_range: Page range specification
 
         Returns:
             BytesIO buffer containing the ZIP file
         """
+        # Validate the page range syntax before loading the document
+        page_spec = parse_page_spec(page_range)
+
         try:
             # Open PDF document
-            pdf_document = fitz.open(stream=data, filetype="pdf")
+            if isinstance(data, Path):
+                pdf_document = fitz.open(data, filetype="pdf")
+            else:
+                pdf_document = fitz.open(stream=data, filetype="pdf")
         except Exception as exc:
             raise HTTPException(
                 status_code=400,
@@ -112,64 +459,29 @@ class PdfToImagesService:
             ) from exc
 
         try:
-            # Parse page ranges
-            total_pages = len(pdf_document)
-            if total_pages == 0:
-                raise HTTPException(status_code=400, detail="PDF has no pages")
-
-            page_indices = parse_page_ranges(page_range, total_pages)
-            if not page_indices:
-                raise HTTPException(status_code=400, detail="No pages selected")
+            page_indices = self._resolve_pages(pdf_document, page_spec)
 
             # Create ZIP file in memory
             zip_buffer = io.BytesIO()
-            total_output_size = 0
-            pages_processed = 0
-            pages_skipped = 0
-
             with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-                base_name = Path(filename).stem
-
-                # Convert each page to image
-                for idx, page_number in enumerate(page_indices, start=1):
-                    try:
-                        page = pdf_document[page_number]
-
-                        # Render page to image
-                        # Calculate zoom based on DPI (72 is the default DPI)
-                        zoom = self.dpi / 72.0
-                        mat = fitz.Matrix(zoom, zoom)
-                        pix = page.get_pixmap(matrix=mat, alpha=False)
-
-                        # Convert to JPG bytes
-                        img_bytes = pix.tobytes("jpeg", jpg_quality=self.quality)
-
-                        # Check if adding this image would exceed the limit
-                        if total_output_size + len(img_bytes) > self.MAX_OUTPUT_SIZE_BYTES:
-                            # Stop processing further pages
-                            pages_skipped = len(page_indices) - pages_processed
-                            break
-
-                        # Add to ZIP with sequential naming
-                        image_name = f"{base_name}_page_{idx:04d}.jpg"
-                        zip_file.writestr(image_name, img_bytes)
-
-                        total_output_size += len(img_bytes)
-                        pages_processed += 1
-
-                    except Exception as exc:  # pragma: no cover - defensive
-                        raise HTTPException(
-                            status_code=500,
-                            detail=f"Failed to convert page {page_number + 1}: {exc}"
-                        ) from exc
+                compress_type = self._image_compress_type
+                rendered = self._render_document(
+                    pdf_document,
+                    page_indices,
+                    Path(filename).stem,
+                    _OutputBudget(self.MAX_OUTPUT_SIZE_BYTES),
+                    self.target_size_bytes,
+                    lambda name, image: zip_file.writestr(name, image, compress_type=compress_type),
+                )
 
                 # Add a note if pages were skipped due to size limit
-                if pages_skipped > 0:
+                if rendered.pages_skipped > 0:
                     note = (
-                        f"Note: {pages_skipped} page(s) were skipped due to output size limit.\n"
-                        f"Total output size: {total_output_size / (1024 * 1024):.2f} MB\n"
+                        f"Note: {rendered.pages_skipped} page(s) were skipped due to output size limit.\n"
+                        f"Total output size: {rendered.output_size / (1024 * 1024):.2f} MB\n"
                         f"Maximum allowed: {self.MAX_OUTPUT_SIZE_BYTES / (1024 * 1024):.0f} MB\n"
-                        f"\nTo convert all pages, try reducing DPI or quality settings."
+                        f"\nTo convert all pages, try reducing DPI or quality settings "
+                        f"or set a target size."
                     )
                     zip_file.writestr("README.txt", note)
 
@@ -178,3 +490,438 @@ class PdfToImagesService:
 
         finally:
             pdf_document.close()
+
+    def convert_file(self, path: Path, page_range: str, output_dir: Path) -> RenderedDocument:
+        """
+        Convert a local PDF and write the images into a directory.
+
+        Runs on the calling thread. PyMuPDF reads the file on demand, so the
+        document is never loaded into memory as a whole.
+
+        Args:
+            path: PDF file to convert
+            page_range: Page range specification (e.g., "1-3,5,7-9")
+            output_dir: Directory the images are written to (created if needed)
+
+        Returns:
+            The processed/skipped page counts and the bytes written
+        """
+        page_spec = parse_page_spec(page_range)
+        try:
+            pdf_document = fitz.open(path, filetype="pdf")
+        except Exception as exc:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Failed to open PDF file '{path.name}': {exc}"
+            ) from exc
+
+        try:
+            page_indices = self._resolve_pages(pdf_document, page_spec)
+            output_dir.mkdir(parents=True, exist_ok=True)
+            return self._render_document(
+                pdf_document,
+                page_indices,
+                path.stem,
+                _OutputBudget(self.MAX_OUTPUT_SIZE_BYTES),
+                self.target_size_bytes,
+                lambda name, image: (output_dir / name).write_bytes(image),
+            )
+        finally:
+            pdf_document.close()
+
+    @staticmethod
+    def _resolve_pages(pdf_document: fitz.Document, page_spec: PageSpec) -> PageSelection:
+        # Parse page ranges
+        total_pages = len(pdf_document)
+        if total_pages == 0:
+            raise HTTPException(status_code=400, detail="PDF has no pages")
+
+        page_indices = page_spec.resolve(total_pages)
+        if not page_indices:
+            raise HTTPException(status_code=400, detail="No pages selected")
+        return page_indices
+
+    @property
+    def _image_compress_type(self) -> int:
+        # Encoded images are already compressed, so deflating them again
+        # costs CPU for almost no gain. Only uncompressed PNG benefits.
+        if self.image_format == "png" and self.png_compress_level == 0:
+            return zipfile.ZIP_DEFLATED
+        return zipfile.ZIP_STORED
+
+    def _render_document(
+        self,
+        pdf_document: fitz.Document,
+        page_indices: PageSelection,
+        base_name: str,
+        budget: _OutputBudget,
+        target_bytes: Optional[int],
+        emit: Callable[[str, bytes], None],
+        folder: str = "",
+    ) -> RenderedDocument:
+        """
+        Render the selected pages of one document into named image entries.
+
+        Args:
+            pdf_document: Open PDF document
+            page_indices: Zero-based pages to render
+            base_name: Prefix of the image names
+            budget: Output size budget, possibly shared with other documents
+            target_bytes: Optional size target used to pick DPI and quality
+            emit: Called with the name and bytes of each image, in page order
+            folder: Optional folder prefix (ending in "/") for the entries
+
+        Returns:
+            The processed/skipped page counts and the bytes emitted
+        """
+        dpi, quality = self.dpi, self.quality
+        if target_bytes is not None:
+            dpi, quality = self._plan_for_budget(pdf_document, page_indices, target_bytes)
+
+        rendered = RenderedDocument()
+        extension = _FORMAT_EXTENSIONS[self.image_format]
+
+        # TIFF output collects every page as a frame of a single file
+        tiff_buffer: Optional[io.BytesIO] = None
+        tiff_writer: Optional[TiffImagePlugin.AppendingTiffWriter] = None
+        if self.image_format == "tiff":
+            tiff_buffer = io.BytesIO()
+            tiff_writer = TiffImagePlugin.AppendingTiffWriter(tiff_buffer, True)
+
+        # Convert each page to image
+        for idx, page_number in enumerate(page_indices, start=1):
+            try:
+                page = pdf_document[page_number]
+                colorspace = self._page_colorspace(page)
+
+                # Oversized pages come back as several horizontal bands. A
+                # TIFF frame holds a whole page, so there they are stitched
+                # back together strip by strip.
+                pixmaps = self._render_pixmaps(page, dpi, colorspace)
+                if tiff_writer is not None:
+                    images = [("", self._encode_tiff_page(pixmaps, quality))]
+                else:
+                    images = [
+                        (tile_suffix, self._encode_pixmap(pix, quality))
+                        for tile_suffix, pix in pixmaps
+                    ]
+                page_size = sum(len(img_bytes) for _, img_bytes in images)
+
+                # A page is written whole or not at all
+                if not budget.reserve(page_size):
+                    # Stop processing further pages
+                    rendered.pages_skipped = len(page_indices) - rendered.pages_processed
+                    break
+
+                for tile_suffix, img_bytes in images:
+                    if tiff_writer is not None:
+                        # Each frame is a complete TIFF; the writer relinks its IFD
+                        tiff_writer.write(img_bytes)
+                        tiff_writer.newFrame()
+                    else:
+                        # Add to ZIP with sequential naming
+                        image_name = f"{folder}{base_name}_page_{idx:04d}{tile_suffix}.{extension}"
+                        emit(image_name, img_bytes)
+
+                rendered.output_size += page_size
+                rendered.pages_processed += 1
+
+            except Exception as exc:  # pragma: no cover - defensive
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Failed to convert page {page_number + 1}: {exc}"
+                ) from exc
+
+        if tiff_buffer is not None and rendered.pages_processed > 0:
+            emit(f"{folder}{base_name}.{extension}", tiff_buffer.getvalue())
+        return rendered
+
+    def _render_pixmaps(
+        self,
+        page: fitz.Page,
+        dpi: int,
+        colorspace: fitz.Colorspace,
+    ) -> Iterator[Tuple[str, fitz.Pixmap]]:
+        """
+        Render a page, splitting it into horizontal bands when it is too large.
+
+        Pages whose pixel count at the requested DPI exceeds ``max_page_pixels``
+        are rendered band by band through clip rectangles, so that only one
+        band is held in memory at a time.
+
+        Args:
+            page: Page to render
+            dpi: Rendering resolution
+            colorspace: Colorspace to render in
+
+        Yields:
+            Tuples of (file name suffix, pixmap); the suffix is empty for
+            pages rendered in one piece and "_tile_NN" for bands
+        """
+        # Calculate zoom based on DPI (72 is the default DPI)
+        zoom = dpi / 72.0
+        mat = fitz.Matrix(zoom, zoom)
+        rect = page.rect
+        width_px = max(1, math.ceil(rect.width * zoom))
+        height_px = max(1, math.ceil(rect.height * zoom))
+        if width_px * height_px <= self.max_page_pixels:
+            yield "", page.get_pixmap(matrix=mat, colorspace=colorspace, alpha=False)
+            return
+
+        # Band edges fall on whole pixel rows, so the bands neither overlap
+        # nor leave gaps and add up to the height of a whole-page render
+        band_rows = max(1, self.max_page_pixels // width_px)
+        for band, top_row in enumerate(range(0, height_px, band_rows)):
+            top = rect.y0 + top_row / zoom
+            bottom = min(rect.y1, rect.y0 + (top_row + band_rows) / zoom)
+            clip = fitz.Rect(rect.x0, top, rect.x1, bottom)
+            yield (
+                f"_tile_{band + 1:02d}",
+                page.get_pixmap(matrix=mat, colorspace=colorspace, clip=clip, alpha=False),
+            )
+
+    def _encode_pixmap(self, pix: fitz.Pixmap, quality: int) -> bytes:
+        """
+        Encode a rendered page in the configured output format.
+
+        JPEG is encoded by MuPDF directly. Other formats wrap the pixmap's
+        samples buffer in a Pillow image without copying the pixels.
+
+        Args:
+            pix: Rendered RGB or grayscale page without alpha channel
+            quality: JPG/WebP quality from 1-100
+
+        Returns:
+            Encoded image bytes (a single-frame TIFF for the tiff format)
+        """
+        if self.image_format == "jpeg":
+            return pix.tobytes("jpeg", jpg_quality=quality)
+
+        mode = "L" if pix.n == 1 else "RGB"
+        image = Image.frombuffer(
+            mode, (pix.width, pix.height), pix.samples_mv, "raw", mode, pix.stride, 1
+        )
+        output = io.BytesIO()
+        if self.image_format == "png":
+            image.save(output, format="PNG", compress_level=self.png_compress_level)
+        elif self.image_format == "webp":
+            image.save(output, format="WEBP", quality=quality)
+        else:
+            image.save(output, format="TIFF", compression="tiff_deflate")
+        return output.getvalue()
+
+    def _encode_tiff_page(
+        self, pixmaps: Iterator[Tuple[str, fitz.Pixmap]], quality: int
+    ) -> bytes:
+        """
+        Encode a rendered page as one TIFF frame, whether or not it was banded.
+
+        The rows of a banded page are regrouped into deflate-compressed strips
+        as the bands arrive, so only one band of raw pixels is held at a time.
+
+        Args:
+            pixmaps: Output of ``_render_pixmaps`` for the page
+            quality: Passed on for pages rendered in one piece
+
+        Returns:
+            A single-frame TIFF of the whole page
+        """
+        tile_suffix, pix = next(pixmaps)
+        if not tile_suffix:
+            return self._encode_pixmap(pix, quality)
+
+        width, samples = pix.width, pix.n
+        rows_per_strip = max(1, _TIFF_STRIP_BYTES // (width * samples))
+        strip_size = rows_per_strip * width * samples
+        strips: list[bytes] = []
+        pending = bytearray()
+        height = 0
+        while pix is not None:
+            band = pix.samples_mv
+            offset = 0
+            if pending:
+                offset = strip_size - len(pending)
+                pending += band[:offset]
+                if len(pending) == strip_size:
+                    strips.append(zlib.compress(pending))
+                    pending = bytearray()
+            while offset + strip_size <= len(band):
+                strips.append(zlib.compress(band[offset:offset + strip_size]))
+                offset += strip_size
+            pending += band[offset:]
+            height += pix.height
+            _, pix = next(pixmaps, ("", None))
+        if pending:
+            strips.append(zlib.compress(pending))
+        return _tiff_frame(width, height, samples, rows_per_strip, strips)
+
+    def _page_colorspace(self, page: fitz.Page) -> fitz.Colorspace:
+        """
+        Pick the colorspace a page is rendered in according to the color mode.
+
+        Args:
+            page: Page about to be rendered
+
+        Returns:
+            fitz.csGRAY for grayscale rendering, fitz.csRGB otherwise
+        """
+        if self.color_mode == "gray":
+            return fitz.csGRAY
+        if self.color_mode == "auto" and self._is_monochrome(page):
+            return fitz.csGRAY
+        return fitz.csRGB
+
+    @classmethod
+    def _is_monochrome(cls, page: fitz.Page) -> bool:
+        """
+        Check whether a page only contains gray tones.
+
+        The page is rendered at a very low resolution and its color channels
+        are compared; a page is monochrome when they never differ by more
+        than ``MONOCHROME_TOLERANCE``.
+
+        Args:
+            page: Page to inspect
+
+        Returns:
+            True if the page can be rendered in grayscale without losing color
+        """
+        zoom = cls.MONOCHROME_PROBE_DPI / 72.0
+        probe = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        image = Image.frombuffer(
+            "RGB", (probe.width, probe.height), probe.samples_mv, "raw", "RGB", probe.stride, 1
+        )
+        red, green, blue = image.split()
+        return all(
+            ImageChops.difference(first, second).getextrema()[1] <= cls.MONOCHROME_TOLERANCE
+            for first, second in ((red, green), (green, blue))
+        )
+
+    def _plan_for_budget(
+        self,
+        pdf_document: fitz.Document,
+        page_indices: PageSelection,
+        target_bytes: int,
+    ) -> Tuple[int, int]:
+        """
+        Choose a DPI and quality that keep the whole job within a size budget.
+
+        A few evenly spaced pages are rendered at two low resolutions. The ratio
+        between the two sizes tells how output grows with resolution, which is
+        then extrapolated over the page area of the whole selection. Quality is
+        lowered first (down to ``BUDGET_MIN_QUALITY``), then DPI (down to 72).
+
+        Args:
+            pdf_document: Opened PDF document
+            page_indices: Selection of zero-based page indices to convert
+            target_bytes: Output size budget in bytes
+
+        Returns:
+            Tuple of (dpi, quality) to render with
+        """
+        budget = min(target_bytes, self.MAX_OUTPUT_SIZE_BYTES) * self.BUDGET_SAFETY_MARGIN
+
+        # Total page area of the selection in square points, read from the
+        # page tree without loading page contents.
+        total_area = 0.0
+        for page_number in page_indices:
+            rect = pdf_document.page_cropbox(page_number)
+            total_area += max(rect.width, 1.0) * max(rect.height, 1.0)
+
+        selected_count = len(page_indices)
+        sample_count = min(self.BUDGET_SAMPLE_PAGES, selected_count)
+        step = selected_count / sample_count
+        samples = sorted({page_indices[int(i * step)] for i in range(sample_count)})
+
+        # Lossless formats ignore quality, so only DPI can be traded for size
+        candidate_qualities = [self.quality]
+        if self.image_format in ("jpeg", "webp"):
+            candidate_qualities += [
+                q for q in (75, 60) if self.BUDGET_MIN_QUALITY <= q < self.quality
+            ]
+        low_dpi, high_dpi = self.BUDGET_SAMPLE_DPIS
+        sample_area = 0.0
+        low_bytes = dict.fromkeys(candidate_qualities, 0)
+        high_bytes = dict.fromkeys(candidate_qualities, 0)
+        for page_number in samples:
+            page = pdf_document[page_number]
+            rect = pdf_document.page_cropbox(page_number)
+            sample_area += max(rect.width, 1.0) * max(rect.height, 1.0)
+            colorspace = self._page_colorspace(page)
+            for sample_dpi, totals in ((low_dpi, low_bytes), (high_dpi, high_bytes)):
+                zoom = sample_dpi / 72.0
+                pix = page.get_pixmap(
+                    matrix=fitz.Matrix(zoom, zoom), colorspace=colorspace, alpha=False
+                )
+                for quality in candidate_qualities:
+                    totals[quality] += len(self._encode_pixmap(pix, quality))
+
+        def max_dpi_for(quality: int) -> float:
+            # Size grows as dpi ** exponent; 2 would mean constant bytes per
+            # pixel, real pages compress better as resolution increases.
+            exponent = 2.0
+            if low_bytes[quality] > 0:
+                exponent = math.log(high_bytes[quality] / low_bytes[quality]) / math.log(
+                    high_dpi / low_dpi
+                )
+                exponent = min(2.0, max(1.0, exponent))
+            estimated_at_high = high_bytes[quality] / sample_area * total_area
+            if estimated_at_high <= 0:
+                return float(self.dpi)
+            return high_dpi * (budget / estimated_at_high) ** (1.0 / exponent)
+
+        for quality in candidate_qualities:
+            if max_dpi_for(quality) >= self.dpi:
+                return self.dpi, quality
+
+        quality = candidate_qualities[-1]
+        dpi = int(max_dpi_for(quality))
+        return max(72, min(self.dpi, dpi)), quality
+
+
+def _tiff_frame(
+    width: int, height: int, samples: int, rows_per_strip: int, strips: list[bytes]
+) -> bytes:
+    """Assemble a little-endian baseline TIFF from deflate-compressed 8-bit strips."""
+
+    out = bytearray(b"II*\x00\x00\x00\x00\x00")
+    offsets = []
+    for strip in strips:
+        offsets.append(len(out))
+        out += strip
+    if len(out) % 2:
+        out += b"\x00"
+
+    # (tag, field type, values); type 3 is SHORT and type 4 is LONG
+    entries = [
+        (256, 4, [width]),
+        (257, 4, [height]),
+        (258, 3, [8] * samples),
+        (259, 3, [8]),  # Deflate
+        (262, 3, [2 if samples == 3 else 1]),  # RGB or BlackIsZero
+        (273, 4, offsets),
+        (277, 3, [samples]),
+        (278, 4, [rows_per_strip]),
+        (279, 4, [len(strip) for strip in strips]),
+        (284, 3, [1]),  # Chunky
+    ]
+    ifd = bytearray(struct.pack("<H", len(entries)))
+    for tag, field_type, values in entries:
+        data = struct.pack(f"<{len(values)}{'H' if field_type == 3 else 'I'}", *values)
+        if len(data) <= 4:
+            field = data.ljust(4, b"\x00")
+        else:
+            field = struct.pack("<I", len(out))
+            out += data
+        ifd += struct.pack("<HHI", tag, field_type, len(values)) + field
+    ifd += b"\x00\x00\x00\x00"
+
+    struct.pack_into("<I", out, 4, len(out))
+    out += ifd
+    return bytes(out)
+
+
+def _close_documents(jobs: list[_DocumentJob]) -> None:
+    for job in jobs:
+        if not job.document.is_closed:
+            job.document.close()
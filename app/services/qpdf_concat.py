@@ -0,0 +1,114 @@
+"""Page concatenation through qpdf for merges that keep every page unchanged."""
+
+from __future__ import annotations
+
+import io
+import mmap
+from typing import Any
+
+from fastapi import HTTPException
+
+from app.utils.page_ranges import PageSpec
+
+
+class QpdfConcatenation:
+    """Copy the selected pages of PDF documents into a new document with qpdf.
+
+    Pages are copied as they are, without pypdf parsing or re-serialising
+    their objects. Identical inputs are opened once, so resources they
+    share (fonts, images) are copied into the output once.
+    """
+
+    def __init__(self, pikepdf: Any) -> None:
+        self._pikepdf = pikepdf
+        self._output = pikepdf.new()
+        self._sources: dict[bytes, Any] = {}
+
+    def add(self, filename: str, data: bytes | mmap.mmap, pages: PageSpec, digest: bytes) -> int:
+        """Append the selected pages of one PDF and return how many were added.
+
+        ``digest`` identifies the content, so repeated inputs are opened once.
+        """
+
+        source = self._sources.get(digest)
+        if source is None:
+            source = self._open(filename, data)
+            self._sources[digest] = source
+
+        selection = pages.resolve(len(source.pages))
+        for page_index in selection:
+            self._output.pages.append(source.pages[page_index])
+        return len(selection)
+
+    def _open(self, filename: str, data: bytes | mmap.mmap) -> Any:
+        pikepdf = self._pikepdf
+        try:
+            # BytesIO shares the buffer of bytes; memory maps are read in
+            # place so that local files are never copied into memory
+            stream = io.BytesIO(data) if isinstance(data, bytes) else _BufferReader(data)
+            source = pikepdf.open(stream)
+        except pikepdf.PasswordError as exc:
+            raise HTTPException(
+                status_code=400, detail=f"Encrypted PDF not supported: {filename}"
+            ) from exc
+        except Exception as exc:
+            raise HTTPException(
+                status_code=400, detail=f"Failed to read '{filename}': {exc}"
+            ) from exc
+
+        if source.is_encrypted:
+            source.close()
+            raise HTTPException(status_code=400, detail=f"Encrypted PDF not supported: {filename}")
+        return source
+
+    def save(self, **save_options: Any) -> io.BytesIO:
+        """Write the output with ``pikepdf.Pdf.save`` options to a buffer positioned at its start."""
+
+        buffer = io.BytesIO()
+        self._output.save(buffer, **save_options)
+        buffer.seek(0)
+        return buffer
+
+    def close(self) -> None:
+        for source in self._sources.values():
+            source.close()
+        self._sources.clear()
+        self._output.close()
+
+
+class _BufferReader(io.RawIOBase):
+    """Read-only seekable stream over a buffer such as a memory map, without copying it."""
+
+    def __init__(self, buffer: Any) -> None:
+        self._view = memoryview(buffer)
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, target: Any) -> int:
+        size = max(0, min(len(target), len(self._view) - self._position))
+        target[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self._position = offset
+        return offset
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self) -> None:
+        # Releases the view so that the map itself can be closed
+        self._view.release()
+        super().close()
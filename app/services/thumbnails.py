@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from anyio import to_thread
+from fastapi import HTTPException, UploadFile
+
+from app.core.concurrency import get_pdf_merge_limiter
+from app.core.config import settings
+
+if TYPE_CHECKING:  # PyMuPDF is imported on first use
+    import fitz
+
+
+@dataclass
+class _StoredDocument:
+    document: fitz.Document
+    filename: str
+    size: int
+    page_count: int
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class ThumbnailService:
+    """Keep uploaded documents open and render cached low-resolution page previews."""
+
+    MIN_WIDTH = 16
+    MAX_WIDTH = 1024
+    JPEG_QUALITY = 80
+
+    _FILETYPES = {".pdf": "pdf", ".jpg": "jpeg", ".jpeg": "jpeg", ".png": "png"}
+    _CONTENT_TYPES = {
+        "application/pdf": "pdf",
+        "image/jpeg": "jpeg",
+        "image/pjpeg": "jpeg",
+        "image/jpg": "jpeg",
+        "image/png": "png",
+        "image/x-png": "png",
+    }
+
+    def __init__(self, max_upload_bytes: int, max_cached_thumbnails: int) -> None:
+        """
+        Initialize the thumbnail service.
+
+        Args:
+            max_upload_bytes: Total size of uploads kept open; least recently
+                used documents are closed beyond this
+            max_cached_thumbnails: Number of rendered previews kept in memory
+        """
+        self.max_upload_bytes = max_upload_bytes
+        self.max_cached_thumbnails = max_cached_thumbnails
+        self._documents: OrderedDict[str, _StoredDocument] = OrderedDict()
+        self._thumbnails: OrderedDict[tuple[str, int, int], bytes] = OrderedDict()
+        self._stored_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def etag(document_id: str, page_number: int, width: int) -> str:
+        """Return the ETag of a preview; previews are immutable for a given key."""
+
+        return f'"{document_id[:32]}-{page_number}-{width}"'
+
+    async def store_upload(self, file: UploadFile) -> dict[str, object]:
+        """
+        Store an uploaded PDF or image so that its pages can be previewed.
+
+        Args:
+            file: The uploaded PDF, JPG or PNG file
+
+        Returns:
+            Dictionary with the document id (content hash), filename and page count
+        """
+        data = await file.read()
+        if len(data) == 0:
+            raise HTTPException(status_code=400, detail="Empty file uploaded")
+
+        filename = file.filename or "document.pdf"
+        filetype = self._FILETYPES.get(Path(filename).suffix.lower()) or self._CONTENT_TYPES.get(
+            (file.content_type or "").lower()
+        )
+        if filetype is None:
+            raise HTTPException(status_code=400, detail=f"Unsupported file type: {filename}")
+
+        return await to_thread.run_sync(
+            self._store, data, filename, filetype, limiter=get_pdf_merge_limiter()
+        )
+
+    def _store(self, data: bytes, filename: str, filetype: str) -> dict[str, object]:
+        document_id = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            stored = self._documents.get(document_id)
+            if stored is not None:
+                self._documents.move_to_end(document_id)
+                return self._describe(document_id, stored)
+
+        import fitz  # PyMuPDF
+
+        try:
+            document = fitz.open(stream=data, filetype=filetype)
+        except Exception as exc:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Failed to open file '{filename}': {exc}"
+            ) from exc
+        if document.needs_pass:
+            document.close()
+            raise HTTPException(
+                status_code=400,
+                detail=f"Encrypted PDF not supported: {filename}",
+            )
+
+        stored = _StoredDocument(
+            document=document,
+            filename=filename,
+            size=len(data),
+            page_count=len(document),
+        )
+        evicted: list[_StoredDocument] = []
+        with self._lock:
+            if document_id in self._documents:
+                # Another request stored the same content in the meantime
+                evicted.append(stored)
+                stored = self._documents[document_id]
+                self._documents.move_to_end(document_id)
+            else:
+                self._documents[document_id] = stored
+                self._stored_bytes += stored.size
+                while self._stored_bytes > self.max_upload_bytes and len(self._documents) > 1:
+                    _, oldest = self._documents.popitem(last=False)
+                    self._stored_bytes -= oldest.size
+                    evicted.append(oldest)
+
+        for old in evicted:
+            with old.lock:
+                old.document.close()
+        return self._describe(document_id, stored)
+
+    @staticmethod
+    def _describe(document_id: str, stored: _StoredDocument) -> dict[str, object]:
+        return {
+            "id": document_id,
+            "filename": stored.filename,
+            "page_count": stored.page_count,
+        }
+
+    async def render_thumbnail(self, document_id: str, page_number: int, width: int) -> bytes:
+        """
+        Return a JPG preview of one page, rendering it on a cache miss.
+
+        Args:
+            document_id: Id returned by ``store_upload``
+            page_number: One-based page number
+            width: Preview width in pixels
+
+        Returns:
+            JPG bytes of the preview
+        """
+        if width < self.MIN_WIDTH or width > self.MAX_WIDTH:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Width must be between {self.MIN_WIDTH} and {self.MAX_WIDTH}",
+            )
+
+        key = (document_id, page_number, width)
+        with self._lock:
+            cached = self._thumbnails.get(key)
+            if cached is not None:
+                self._thumbnails.move_to_end(key)
+                return cached
+
+        return await to_thread.run_sync(
+            self._render, key, limiter=get_pdf_merge_limiter()
+        )
+
+    def check_page(self, document_id: str, page_number: int) -> None:
+        """
+        Raise 404 unless the upload is still stored and has the page.
+
+        Args:
+            document_id: Id returned by ``store_upload``
+            page_number: One-based page number
+        """
+        self._stored_page(document_id, page_number)
+
+    def _stored_page(self, document_id: str, page_number: int) -> _StoredDocument:
+        with self._lock:
+            stored = self._documents.get(document_id)
+            if stored is not None:
+                self._documents.move_to_end(document_id)
+        if stored is None:
+            raise HTTPException(status_code=404, detail="Upload not found or expired")
+        if page_number < 1 or page_number > stored.page_count:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Page out of bounds: {page_number} (doc has {stored.page_count} pages)",
+            )
+        return stored
+
+    def _render(self, key: tuple[str, int, int]) -> bytes:
+        document_id, page_number, width = key
+        stored = self._stored_page(document_id, page_number)
+
+        import fitz  # PyMuPDF
+
+        # fitz documents must not be used from several threads at once
+        with stored.lock:
+            if stored.document.is_closed:
+                raise HTTPException(status_code=404, detail="Upload not found or expired")
+            page = stored.document[page_number - 1]
+            # page.rect is the visible (cropped, rotated) page, which is what
+            # get_pixmap renders by default
+            page_width = page.rect.width
+            zoom = width / page_width if page_width > 0 else 1.0
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            thumbnail = pix.tobytes("jpeg", jpg_quality=self.JPEG_QUALITY)
+
+        with self._lock:
+            self._thumbnails[key] = thumbnail
+            self._thumbnails.move_to_end(key)
+            while len(self._thumbnails) > self.max_cached_thumbnails:
+                self._thumbnails.popitem(last=False)
+        return thumbnail
+
+
+@lru_cache(maxsize=1)
+def get_thumbnail_service() -> ThumbnailService:
+    """Return the process-wide thumbnail service and its caches."""
+
+    return ThumbnailService(
+        max_upload_bytes=settings.preview_upload_cache_mb * 1024 * 1024,
+        max_cached_thumbnails=settings.preview_thumbnail_cache_entries,
+    )
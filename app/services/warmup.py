@@ -0,0 +1,79 @@
+"""Optional warmup that loads the PDF libraries before the server takes requests."""
+
+from __future__ import annotations
+
+import io
+import logging
+import time
+
+from app import STARTED_AT
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up() -> float:
+    """
+    Import the PDF libraries and run a tiny merge and render.
+
+    The route modules import the services lazily, so without a warmup the
+    first merge or conversion in each worker pays for importing pypdf,
+    pikepdf, PyMuPDF and Pillow.
+
+    Returns:
+        Seconds spent warming up
+    """
+    started = time.perf_counter()
+
+    import fitz  # PyMuPDF
+    from PIL import Image
+    from pypdf import PdfWriter
+
+    from app.services.pdf_merger import PdfMergerService, _load_pikepdf
+
+    writer = PdfWriter()
+    writer.add_blank_page(width=72, height=72)
+    source = io.BytesIO()
+    writer.write(source)
+
+    image = io.BytesIO()
+    Image.new("RGB", (8, 8), "white").save(image, format="PNG")
+
+    merger = PdfMergerService(engine="pikepdf" if _load_pikepdf() is not None else "pypdf")
+    merger.add_document("warmup.pdf", source.getvalue())
+    merger.add_document("warmup.png", image.getvalue(), options={"paper_size": "A4"})
+    merged = merger.render().getvalue()
+
+    with fitz.open(stream=merged, filetype="pdf") as document:
+        pix = document[0].get_pixmap(dpi=36, alpha=False)
+        rendered = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        rendered.save(io.BytesIO(), format="JPEG")
+
+    elapsed = time.perf_counter() - started
+    logger.info("Warmup finished in %.2fs", elapsed)
+    return elapsed
+
+
+def check_startup_budget() -> float:
+    """
+    Log how long startup took, with a warning when it was over the configured budget.
+
+    Startup is measured from the first import of the ``app`` package, so it
+    covers module imports, app creation and the optional warmup. A slow start
+    is only reported: a worker on a busy node should still come up. The
+    import-time budget is enforced by ``tests/test_startup.py`` instead.
+
+    Returns:
+        Seconds since the ``app`` package was imported
+    """
+    elapsed = time.perf_counter() - STARTED_AT
+    budget = settings.startup_budget_seconds
+    if budget is not None and elapsed > budget:
+        logger.warning(
+            "Startup took %.2fs, over the budget of %.2fs (PDF_MERGER_STARTUP_BUDGET_SECONDS)",
+            elapsed,
+            budget,
+        )
+    else:
+        logger.info("Startup finished in %.2fs", elapsed)
+    return elapsed
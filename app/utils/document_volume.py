@@ -0,0 +1,84 @@
+"""Helpers for reading and writing documents on a server-local volume."""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+
+
+def resolve_document_path(relative: str, must_exist: bool = True) -> Path:
+    """
+    Resolve a path below the configured document root.
+
+    Args:
+        relative: Path relative to ``settings.document_root``
+        must_exist: Require an existing regular file
+
+    Returns:
+        The absolute, symlink-free path
+    """
+    if not settings.document_root:
+        raise HTTPException(status_code=403, detail="Server-local documents are not enabled.")
+
+    candidate = Path(relative)
+    if not relative.strip() or candidate.is_absolute():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Document paths must be relative to the document root: {relative}",
+        )
+
+    root = Path(settings.document_root).resolve()
+    resolved = (root / candidate).resolve()
+    # Resolving first also catches symlinks that point outside the root
+    if not resolved.is_relative_to(root) or resolved == root:
+        raise HTTPException(status_code=400, detail=f"Invalid document path: {relative}")
+    if must_exist and not resolved.is_file():
+        raise HTTPException(status_code=404, detail=f"Document not found: {relative}")
+    return resolved
+
+
+def parse_document_paths(paths: Optional[str]) -> list[str]:
+    """Parse a JSON list of relative document paths from a form field."""
+
+    if not paths:
+        return []
+    try:
+        parsed = json.loads(paths)
+        if not isinstance(parsed, list) or not all(isinstance(value, str) for value in parsed):
+            raise ValueError("paths must be a JSON list of strings.")
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid paths JSON: {exc}") from exc
+    return parsed
+
+
+def map_document(path: Path) -> bytes | mmap.mmap:
+    """Map a local file read-only; empty files are returned as ``b""``."""
+
+    with path.open("rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return b""
+        # The map stays valid after the file is closed
+        return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def write_document(path: Path, data: bytes | memoryview) -> int:
+    """Atomically replace ``path`` with ``data`` and return the number of bytes written."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as output:
+            output.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return len(data)
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import Any, Dict
 
 from fastapi import Request
@@ -27,6 +28,7 @@ TRANSLATIONS: Dict[str, Dict[str, Any]] = {
             "api_key_label": "API key",
             "api_key_placeholder": "Optional - only if required",
             "engine_label": "Processing engine",
+            "engine_auto": "Automatic (fastest for the files)",
             "engine_pypdf": "PyPDF (pure Python)",
             "engine_pikepdf": "pikepdf (fast C++ backend)",
             "paper_size_label": "Paper size",
@@ -149,6 +151,7 @@ TRANSLATIONS: Dict[str, Dict[str, Any]] = {
             "api_key_label": "API 키",
             "api_key_placeholder": "필요한 경우에만 입력",
             "engine_label": "처리 엔진",
+            "engine_auto": "자동 (파일에 맞는 가장 빠른 엔진)",
             "engine_pypdf": "PyPDF (순수 파이썬)",
             "engine_pikepdf": "pikepdf (고속 C++ 백엔드)",
             "paper_size_label": "용지 크기",
@@ -266,7 +269,12 @@ TRANSLATIONS: Dict[str, Dict[str, Any]] = {
 def detect_locale(request: Request) -> str:
     """Determine the preferred locale based on the ``Accept-Language`` header."""
 
-    accept_language = request.headers.get("accept-language", "")
+    return _locale_for(request.headers.get("accept-language", ""))
+
+
+# Browsers send a handful of distinct headers, so each is parsed only once
+@lru_cache(maxsize=256)
+def _locale_for(accept_language: str) -> str:
     for item in accept_language.split(","):
         lang = item.split(";")[0].strip().lower()
         if not lang:
@@ -277,6 +285,7 @@ def detect_locale(request: Request) -> str:
     return "en"
 
 
+@lru_cache(maxsize=len(SUPPORTED_LOCALES) + 1)
 def get_translations(locale: str) -> Dict[str, Any]:
     """Return translation dictionaries for the requested locale with fallback."""
 
@@ -1,42 +1,143 @@
 import re
-from typing import List
+from dataclasses import dataclass
+from itertools import chain
+from typing import Iterator, Tuple
 
 from fastapi import HTTPException
 
-_range_token = re.compile(r"^\s*(\d+)\s*(-\s*(\d+)\s*)?$")
+_page_ref = r"(-?\d+|last)"
+_range_token = re.compile(rf"^\s*{_page_ref}\s*(-\s*{_page_ref}\s*)?$", re.IGNORECASE)
 
+# Page references are one-based page numbers; negative values count from the
+# end of the document (-1 is the last page), so "last" is stored as -1.
+_LAST_PAGE = -1
 
-def parse_page_ranges(range_str: str, total_pages: int) -> List[int]:
-    """Convert human friendly page ranges to zero-based indices."""
 
-    indices: List[int] = []
-    if not range_str.strip():
-        return list(range(total_pages))
+@dataclass(frozen=True)
+class PageSelection:
+    """Zero-based page indices stored as a sequence of ``range`` spans.
+
+    Memory use grows with the number of spans, not the number of pages. The
+    selection behaves like a read-only sequence: it supports ``len``,
+    iteration, membership tests and indexing without materialising a list.
+    """
+
+    spans: Tuple[range, ...]
+
+    def __len__(self) -> int:
+        return sum(len(span) for span in self.spans)
+
+    def __bool__(self) -> bool:
+        return any(self.spans)
+
+    def __iter__(self) -> Iterator[int]:
+        return chain.from_iterable(self.spans)
+
+    def __contains__(self, index: object) -> bool:
+        return any(index in span for span in self.spans)
+
+    def __getitem__(self, position: int) -> int:
+        if position < 0:
+            position += len(self)
+        if position >= 0:
+            for span in self.spans:
+                if position < len(span):
+                    return span[position]
+                position -= len(span)
+        raise IndexError("page selection index out of range")
+
+    def distinct(self) -> Iterator[int]:
+        """Iterate over selected indices in order, skipping repeated pages."""
+
+        for number, span in enumerate(self.spans):
+            earlier = self.spans[:number]
+            for index in span:
+                if not any(index in previous for previous in earlier):
+                    yield index
+
+    def count_distinct(self) -> int:
+        """Return the number of different pages in the selection."""
+
+        return sum(1 for _ in self.distinct())
+
+
+@dataclass(frozen=True)
+class PageSpec:
+    """A syntactically valid page range string that is not bound to a document yet.
+
+    Parsing happens before the document is loaded; ``resolve`` checks the
+    page references against the actual page count.
+    """
+
+    tokens: Tuple[Tuple[str, int, int, int], ...]
 
-    parts = range_str.split(",")
-    for part in parts:
+    def resolve(self, total_pages: int) -> PageSelection:
+        """Bind the specification to a document with ``total_pages`` pages."""
+
+        if not self.tokens:
+            return PageSelection((range(total_pages),))
+
+        spans: list[range] = []
+        for text, first, last, step in self.tokens:
+            if step == 2:
+                # "odd"/"even": first holds the one-based start page
+                spans.append(range(first - 1, total_pages, 2))
+                continue
+
+            start = first - 1 if first > 0 else total_pages + first
+            end = last - 1 if last > 0 else total_pages + last
+            if not (0 <= start < total_pages and 0 <= end < total_pages):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Range out of bounds: '{text}' (doc has {total_pages} pages)",
+                )
+
+            if start <= end:
+                spans.append(range(start, end + 1))
+            else:
+                spans.append(range(start, end - 1, -1))
+
+        return PageSelection(tuple(spans))
+
+
+def parse_page_spec(range_str: str) -> PageSpec:
+    """Validate the syntax of a page range string without knowing the page count.
+
+    Tokens are separated by commas: ``N``, ``N-M`` (descending when N > M),
+    ``last``, negative numbers counting from the end (``-1`` is the last page,
+    so ``-3--1`` selects the last three pages), and ``odd`` / ``even``.
+    """
+
+    tokens: list[Tuple[str, int, int, int]] = []
+    for part in range_str.split(","):
         part = part.strip()
         if not part:
             continue
+
+        keyword = part.lower()
+        if keyword in ("odd", "even"):
+            tokens.append((part, 1 if keyword == "odd" else 2, _LAST_PAGE, 2))
+            continue
+
         match = _range_token.match(part)
         if not match:
             raise HTTPException(status_code=400, detail=f"Invalid range token: '{part}'")
 
-        start = int(match.group(1))
+        first = _page_number(match.group(1))
         end = match.group(3)
-        end_num = int(end) if end is not None else start
+        last = _page_number(end) if end is not None else first
+        if first == 0 or last == 0:
+            raise HTTPException(status_code=400, detail=f"Range out of bounds: '{part}'")
+        tokens.append((part, first, last, 1))
 
-        if start < 1 or end_num < 1 or start > total_pages or end_num > total_pages:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Range out of bounds: '{part}' (doc has {total_pages} pages)",
-            )
+    return PageSpec(tuple(tokens))
 
-        if start <= end_num:
-            rng = range(start - 1, end_num)
-        else:
-            rng = range(start - 1, end_num - 2, -1)
 
-        indices.extend(list(rng))
+def _page_number(value: str) -> int:
+    return _LAST_PAGE if value.lower() == "last" else int(value)
+
+
+def parse_page_ranges(range_str: str, total_pages: int) -> PageSelection:
+    """Convert human friendly page ranges to zero-based indices."""
 
-    return indices
+    return parse_page_spec(range_str).resolve(total_pages)
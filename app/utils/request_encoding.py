@@ -0,0 +1,293 @@
+"""Decoding of compressed request bodies (``Content-Encoding: gzip`` or ``zstd``)."""
+
+from __future__ import annotations
+
+import zlib
+from abc import ABC, abstractmethod
+from typing import Callable, Collection, Iterator
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+try:  # pragma: no cover - optional dependency import guard
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency import guard
+    zstandard = None  # type: ignore[assignment]
+
+# Upper bound on the output of a single decompression step
+_CHUNK_SIZE = 256 * 1024
+
+
+class _Decoder(ABC):
+    coding = ""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.decoded = 0
+
+    @abstractmethod
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        """Decode the next piece of the body into bounded chunks."""
+
+    @abstractmethod
+    def finish(self) -> None:
+        """Reject a body that ends in the middle of compressed data."""
+
+    def _count(self, size: int) -> None:
+        self.decoded += size
+        if self.decoded > self.limit:
+            raise HTTPException(
+                status_code=413,
+                detail=(
+                    f"Payload too large (> {settings.max_total_upload_mb} MB) "
+                    "after decompression."
+                ),
+            )
+
+    def _invalid(self, exc: Exception) -> HTTPException:
+        return HTTPException(
+            status_code=400, detail=f"Invalid {self.coding} request body: {exc}"
+        )
+
+
+class _GzipDecoder(_Decoder):
+    coding = "gzip"
+
+    def __init__(self, limit: int) -> None:
+        super().__init__(limit)
+        self._inflater = zlib.decompressobj(wbits=31)
+        # Whether the current member has received any input
+        self._in_member = False
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        try:
+            while True:
+                self._in_member = self._in_member or bool(data)
+                chunk = self._inflater.decompress(data, _CHUNK_SIZE)
+                if chunk:
+                    self._count(len(chunk))
+                    yield chunk
+                if self._inflater.eof:
+                    # Concatenated gzip members decode to the joined content
+                    data = self._inflater.unused_data
+                    self._inflater = zlib.decompressobj(wbits=31)
+                    self._in_member = False
+                else:
+                    data = self._inflater.unconsumed_tail
+                if not data and not chunk:
+                    return
+        except zlib.error as exc:
+            raise self._invalid(exc) from exc
+
+    def finish(self) -> None:
+        if self._in_member and not self._inflater.eof:
+            raise self._invalid(EOFError("body ends inside a gzip member"))
+
+
+class _ZstdDecoder(_Decoder):
+    coding = "zstd"
+
+    def __init__(self, limit: int) -> None:
+        super().__init__(limit)
+        self._pending: list[bytes] = []
+        self._frames = _ZstdFrames()
+        # The writer hands over bounded chunks, so an oversized frame is
+        # rejected before it is decompressed in full
+        self._writer = zstandard.ZstdDecompressor().stream_writer(
+            self, write_size=_CHUNK_SIZE, closefd=False
+        )
+
+    def write(self, chunk: bytes) -> int:
+        self._count(len(chunk))
+        self._pending.append(bytes(chunk))
+        return len(chunk)
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        try:
+            self._writer.write(data)
+        except zstandard.ZstdError as exc:
+            raise self._invalid(exc) from exc
+        self._frames.feed(data)
+        pending, self._pending = self._pending, []
+        yield from pending
+
+    def finish(self) -> None:
+        # The stream writer decodes what it gets and never reports an
+        # unfinished frame, so the frame layout is followed separately
+        if not self._frames.complete:
+            raise self._invalid(EOFError("body ends inside a zstd frame"))
+
+
+_ZSTD_MAGIC = 0xFD2FB528
+# Skippable frames use the magic numbers 0x184D2A50 to 0x184D2A5F
+_ZSTD_SKIPPABLE_MAGIC = 0x184D2A50
+
+
+class _ZstdFrames:
+    """Follow the frame and block headers of a zstd stream without decoding it."""
+
+    def __init__(self) -> None:
+        self._state = "magic"
+        self._need = 4
+        self._header = bytearray()
+        self._skip = 0
+        self._checksum = False
+
+    @property
+    def complete(self) -> bool:
+        """Whether the data so far ends on a frame boundary."""
+
+        return self._state in ("magic", "unknown") and not self._header and not self._skip
+
+    def feed(self, data: bytes) -> None:
+        position = 0
+        while position < len(data) and self._state != "unknown":
+            if self._skip:
+                step = min(self._skip, len(data) - position)
+                self._skip -= step
+            else:
+                step = min(self._need - len(self._header), len(data) - position)
+                self._header += data[position:position + step]
+                if len(self._header) == self._need:
+                    header = bytes(self._header)
+                    self._header.clear()
+                    self._advance(header)
+            position += step
+
+    def _expect(self, state: str, size: int) -> None:
+        self._state = state
+        self._need = size
+        if size == 0:
+            self._advance(b"")
+
+    def _advance(self, header: bytes) -> None:
+        if self._state == "magic":
+            magic = int.from_bytes(header, "little")
+            if magic == _ZSTD_MAGIC:
+                self._expect("descriptor", 1)
+            elif magic & ~0xF == _ZSTD_SKIPPABLE_MAGIC:
+                self._expect("skippable", 4)
+            else:
+                # Not zstd; the decompressor reports that
+                self._state = "unknown"
+        elif self._state == "descriptor":
+            descriptor = header[0]
+            single_segment = bool(descriptor & 0x20)
+            self._checksum = bool(descriptor & 0x04)
+            window_size = 0 if single_segment else 1
+            dictionary_size = (0, 1, 2, 4)[descriptor & 0x03]
+            content_size = (int(single_segment), 2, 4, 8)[descriptor >> 6]
+            self._expect("frame_header", window_size + dictionary_size + content_size)
+        elif self._state == "frame_header":
+            self._expect("block", 3)
+        elif self._state == "block":
+            block = int.from_bytes(header, "little")
+            # RLE blocks store a single byte
+            self._skip = 1 if (block >> 1) & 0x03 == 1 else block >> 3
+            if block & 0x01:
+                if self._checksum:
+                    self._skip += 4
+                self._expect("magic", 4)
+            else:
+                self._expect("block", 3)
+        elif self._state == "skippable":
+            self._skip = int.from_bytes(header, "little")
+            self._expect("magic", 4)
+
+
+DECODERS: dict[str, Callable[[int], _Decoder]] = {"gzip": _GzipDecoder, "x-gzip": _GzipDecoder}
+if zstandard is not None:
+    DECODERS["zstd"] = _ZstdDecoder
+
+
+class DecompressRequestMiddleware:
+    """Decode compressed request bodies for the given paths as they are received.
+
+    The application sees the plain body without ``Content-Encoding`` or
+    ``Content-Length`` headers, so multipart parsing spools the decoded parts
+    as usual. ``max_total_upload_mb`` is enforced on the decoded size, which
+    stops decompression bombs after at most one chunk past the limit.
+    """
+
+    def __init__(self, app: ASGIApp, paths: Collection[str]) -> None:
+        self.app = app
+        self.paths = paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        header = Headers(scope=scope).get("content-encoding", "")
+        codings = [
+            coding.strip().lower()
+            for coding in header.split(",")
+            if coding.strip() and coding.strip().lower() != "identity"
+        ]
+        if not codings:
+            await self.app(scope, receive, send)
+            return
+
+        unsupported = [coding for coding in codings if coding not in DECODERS]
+        if unsupported:
+            response = JSONResponse(
+                status_code=415,
+                content={
+                    "detail": (
+                        f"Unsupported Content-Encoding: {', '.join(unsupported)}. "
+                        f"Supported: {', '.join(sorted(DECODERS))}."
+                    )
+                },
+            )
+            await response(scope, receive, send)
+            return
+
+        limit = int(settings.max_total_upload_mb * 1024 * 1024)
+        # Codings are listed in the order they were applied
+        decoders = [DECODERS[coding](limit) for coding in reversed(codings)]
+        scope = dict(scope)
+        scope["headers"] = [
+            (name, value)
+            for name, value in scope["headers"]
+            if name not in (b"content-encoding", b"content-length")
+        ]
+        await self.app(scope, _decoding_receive(receive, decoders), send)
+
+
+def _decode(data: bytes, decoders: list[_Decoder]) -> Iterator[bytes]:
+    if not decoders:
+        yield data
+        return
+    for chunk in decoders[0].feed(data):
+        yield from _decode(chunk, decoders[1:])
+
+
+def _decoding_receive(receive: Receive, decoders: list[_Decoder]) -> Receive:
+    chunks: Iterator[bytes] = iter(())
+    finished = done = False
+
+    async def wrapped() -> Message:
+        nonlocal chunks, finished, done
+        # Decoded data is handed on in bounded chunks, one message each
+        while not done:
+            chunk = next(chunks, None)
+            if chunk is not None:
+                return {"type": "http.request", "body": chunk, "more_body": True}
+            if finished:
+                done = True
+                for decoder in decoders:
+                    decoder.finish()
+                return {"type": "http.request", "body": b"", "more_body": False}
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+            chunks = _decode(message.get("body", b""), decoders)
+            finished = not message.get("more_body", False)
+        # Once the body is complete, only disconnects are left to wait for
+        return await receive()
+
+    return wrapped
@@ -0,0 +1,178 @@
+"""Fingerprinted, precompressed static assets and cached response bodies."""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import mimetypes
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Mapping
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Scope
+
+try:  # pragma: no cover - optional dependency import guard
+    import brotli  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency import guard
+    brotli = None  # type: ignore[assignment]
+
+STATIC_DIRECTORY = "app/static"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Preferred order when a client accepts several encodings equally
+_ENCODING_PREFERENCE = ("br", "gzip", "identity")
+_COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+_MIN_COMPRESS_SIZE = 256
+
+
+def encode_variants(data: bytes, media_type: str) -> dict[str, bytes]:
+    """Return ``data`` under each content coding that makes it smaller."""
+
+    variants = {"identity": data}
+    if len(data) < _MIN_COMPRESS_SIZE or not media_type.startswith(_COMPRESSIBLE_TYPES):
+        return variants
+
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) < len(data):
+        variants["gzip"] = compressed
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data):
+            variants["br"] = compressed
+    return variants
+
+
+def negotiate_encoding(accept_encoding: str, available: Mapping[str, bytes]) -> str:
+    """Pick the smallest acceptable variant for an ``Accept-Encoding`` header."""
+
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding] = weight
+
+    wildcard = weights.get("*")
+    for coding in _ENCODING_PREFERENCE:
+        if coding == "identity" or coding not in available:
+            continue
+        weight = weights.get(coding, wildcard if wildcard is not None else 0.0)
+        if weight > 0:
+            return coding
+    return "identity"
+
+
+@dataclass
+class CachedBody:
+    """A response body kept in memory together with its compressed variants."""
+
+    media_type: str
+    variants: dict[str, bytes]
+    etag: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        digest = hashlib.sha256(self.variants["identity"]).hexdigest()[:16]
+        self.etag = f'"{digest}"'
+
+    @classmethod
+    def from_bytes(cls, data: bytes, media_type: str) -> "CachedBody":
+        return cls(media_type=media_type, variants=encode_variants(data, media_type))
+
+    def response(
+        self,
+        request_headers: Mapping[str, str],
+        cache_control: str,
+        extra_vary: str = "",
+    ) -> Response:
+        """Build a response for the request, answering 304 when the ETag matches."""
+
+        vary = ", ".join(filter(None, ("Accept-Encoding", extra_vary)))
+        headers = {"Cache-Control": cache_control, "ETag": self.etag, "Vary": vary}
+        if_none_match = request_headers.get("if-none-match", "")
+        if self.etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match == "*":
+            return Response(status_code=304, headers=headers)
+
+        encoding = negotiate_encoding(request_headers.get("accept-encoding", ""), self.variants)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(self.variants[encoding], media_type=self.media_type, headers=headers)
+
+
+class StaticAssets:
+    """Fingerprint and precompress every file below a static directory.
+
+    Files are read once. Each is reachable under its plain path and under a
+    fingerprinted path such as ``css/app.3f2a9c1d0b7e.css`` that changes
+    whenever the content does, so the fingerprinted URL can be cached forever.
+    """
+
+    def __init__(self, directory: str | os.PathLike[str]) -> None:
+        self.directory = Path(directory)
+        self._urls: dict[str, str] = {}
+        self._bodies: dict[str, tuple[CachedBody, bool]] = {}
+
+        for file in sorted(self.directory.rglob("*")):
+            if not file.is_file():
+                continue
+            path = file.relative_to(self.directory).as_posix()
+            data = file.read_bytes()
+            media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            body = CachedBody.from_bytes(data, media_type)
+
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            stem, dot, suffix = path.rpartition(".")
+            hashed = f"{stem}.{digest}.{suffix}" if dot and "/" not in suffix else f"{path}.{digest}"
+            self._urls[path] = hashed
+            self._bodies[path] = (body, False)
+            self._bodies[hashed] = (body, True)
+
+    def url_path(self, path: str) -> str:
+        """Return the fingerprinted path for ``path``, or ``path`` if it is unknown."""
+
+        return self._urls.get(path, path)
+
+    def lookup(self, path: str) -> tuple[CachedBody, bool] | None:
+        """Return the body for a plain or fingerprinted path and whether it was fingerprinted."""
+
+        return self._bodies.get(path)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """Serve known assets from memory, compressed, with long-lived caching for fingerprinted URLs.
+
+    Paths that were not present at startup fall back to regular file serving.
+    """
+
+    def __init__(self, assets: StaticAssets) -> None:
+        super().__init__(directory=assets.directory)
+        self.assets = assets
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] in ("GET", "HEAD"):
+            found = self.assets.lookup(Path(path).as_posix())
+            if found is not None:
+                body, fingerprinted = found
+                cache_control = IMMUTABLE_CACHE_CONTROL if fingerprinted else REVALIDATE_CACHE_CONTROL
+                return body.response(Headers(scope=scope), cache_control)
+        return await super().get_response(path, scope)
+
+
+@lru_cache(maxsize=1)
+def get_static_assets() -> StaticAssets:
+    """Return the shared asset table for the application's static directory."""
+
+    return StaticAssets(STATIC_DIRECTORY)
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+import os
+from typing import BinaryIO
+
+from fastapi import UploadFile
+
+
+def detach_upload(upload: UploadFile) -> BinaryIO:
+    """Return a file object for ``upload`` that stays open after the request ends.
+
+    FastAPI closes uploaded files when the endpoint returns, before a streaming
+    response body has been sent. The returned object owns a duplicate of the
+    spooled file's descriptor and must be closed by the caller.
+    """
+
+    upload.file.seek(0)
+    return os.fdopen(os.dup(upload.file.fileno()), "rb")
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import zipfile
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back in chunks."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class StreamingZip:
+    """Build a ZIP archive incrementally without holding the whole archive in memory.
+
+    Each call to ``drain`` returns the bytes produced since the previous call,
+    so entries can be sent to the client as soon as they are written.
+    """
+
+    def __init__(self, compression: int = zipfile.ZIP_DEFLATED) -> None:
+        self._sink = _ChunkSink()
+        # The sink is not seekable, so zipfile writes data descriptors
+        self._archive = zipfile.ZipFile(self._sink, "w", compression)  # type: ignore[arg-type]
+
+    def writestr(self, name: str, data: bytes, compress_type: int | None = None) -> None:
+        self._archive.writestr(name, data, compress_type=compress_type)
+
+    def drain(self) -> bytes:
+        return self._sink.take()
+
+    def close(self) -> bytes:
+        """Write the central directory and return the remaining bytes."""
+
+        self._archive.close()
+        return self._sink.take()
@@ -0,0 +1,66 @@
+"""Incremental-update append mode: the base bytes stay untouched and the update links back to them."""
+
+import io
+import re
+
+import fitz
+import pytest
+from pypdf import PdfReader
+
+from app.services.incremental_update import IncrementalUpdate
+
+
+def _pdf(page_count: int, xref_stream: bool, label: str) -> bytes:
+    document = fitz.open()
+    for number in range(page_count):
+        page = document.new_page(width=300, height=400)
+        page.insert_text((50, 50), f"{label} {number + 1}")
+    return document.tobytes(use_objstms=int(xref_stream))
+
+
+def _startxref(data: bytes) -> int:
+    return int(data[data.rindex(b"startxref") + len(b"startxref"):].split()[0])
+
+
+def _append(base: bytes, added: bytes) -> tuple[bytes, bytes]:
+    update = IncrementalUpdate(io.BytesIO(base), "base.pdf")
+    section = update.build(list(PdfReader(io.BytesIO(added)).pages))
+    return b"".join(update.iter_output(section)), section
+
+
+@pytest.mark.parametrize("xref_stream", [False, True], ids=["xref-table", "xref-stream"])
+def test_base_bytes_are_an_unchanged_prefix(xref_stream: bool) -> None:
+    base = _pdf(3, xref_stream, "base")
+    output, section = _append(base, _pdf(2, False, "added"))
+
+    assert output.startswith(base)
+    assert output[len(base):] == section
+
+
+@pytest.mark.parametrize("xref_stream", [False, True], ids=["xref-table", "xref-stream"])
+def test_prev_points_at_the_original_xref(xref_stream: bool) -> None:
+    base = _pdf(3, xref_stream, "base")
+    output, section = _append(base, _pdf(2, False, "added"))
+
+    previous = re.search(rb"/Prev (\d+)", section)
+    assert previous is not None
+    assert int(previous.group(1)) == _startxref(base)
+    # The new section is the one readers start from, and it is of the same kind as the base
+    new_xref = output[_startxref(output):]
+    assert new_xref.startswith(b"xref") is not xref_stream
+
+
+@pytest.mark.parametrize("xref_stream", [False, True], ids=["xref-table", "xref-stream"])
+def test_reopened_document_has_all_pages_in_order(xref_stream: bool) -> None:
+    base = _pdf(3, xref_stream, "base")
+    output, _ = _append(base, _pdf(2, xref_stream, "added"))
+
+    reader = PdfReader(io.BytesIO(output), strict=True)
+    assert len(reader.pages) == 5
+    assert [page.extract_text().strip() for page in reader.pages] == [
+        "base 1", "base 2", "base 3", "added 1", "added 2",
+    ]
+
+    document = fitz.open(stream=output, filetype="pdf")
+    assert not document.is_repaired
+    assert document.page_count == 5
@@ -0,0 +1,92 @@
+"""Page range syntax: parsed without a document, then resolved against its page count."""
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils.page_ranges import PageSelection, parse_page_ranges, parse_page_spec
+
+
+@pytest.mark.parametrize(
+    ("spec", "expected"),
+    [
+        ("", [0, 1, 2, 3, 4]),
+        ("1-3,5", [0, 1, 2, 4]),
+        ("3-1", [2, 1, 0]),
+        ("last", [4]),
+        ("LAST", [4]),
+        ("2-last", [1, 2, 3, 4]),
+        ("last-4", [4, 3]),
+        ("-1", [4]),
+        ("-3--1", [2, 3, 4]),
+        ("-1--2", [4, 3]),
+        ("1--1", [0, 1, 2, 3, 4]),
+        ("odd", [0, 2, 4]),
+        ("even", [1, 3]),
+        ("Even, 1", [1, 3, 0]),
+        ("1,1,2-3,2", [0, 0, 1, 2, 1]),
+        (" 2 , , 4 - 5 ", [1, 3, 4]),
+    ],
+)
+def test_valid_specs(spec: str, expected: list[int]) -> None:
+    assert list(parse_page_ranges(spec, 5)) == expected
+
+
+def test_parsing_does_not_need_the_page_count() -> None:
+    spec = parse_page_spec("2-last,odd")
+    assert list(spec.resolve(3)) == [1, 2, 0, 2]
+    assert list(spec.resolve(6)) == [1, 2, 3, 4, 5, 0, 2, 4]
+
+
+def test_even_pages_of_a_single_page_document_select_nothing() -> None:
+    selection = parse_page_ranges("even", 1)
+    assert not selection
+    assert len(selection) == 0
+
+
+def test_repeated_pages_are_kept_in_order_and_counted_once() -> None:
+    selection = parse_page_ranges("1-3,2,last,1", 4)
+    assert list(selection) == [0, 1, 2, 1, 3, 0]
+    assert len(selection) == 6
+    assert list(selection.distinct()) == [0, 1, 2, 3]
+    assert selection.count_distinct() == 4
+
+
+@pytest.mark.parametrize("spec", ["6", "-6", "4-6", "-7--1", "1,9"])
+def test_out_of_range_specs_are_rejected_when_resolved(spec: str) -> None:
+    parsed = parse_page_spec(spec)
+    with pytest.raises(HTTPException) as raised:
+        parsed.resolve(5)
+    assert raised.value.status_code == 400
+    assert "out of bounds" in raised.value.detail
+
+
+@pytest.mark.parametrize("spec", ["0", "0-2", "2-0", "-0"])
+def test_page_zero_is_rejected_while_parsing(spec: str) -> None:
+    with pytest.raises(HTTPException) as raised:
+        parse_page_spec(spec)
+    assert raised.value.status_code == 400
+    assert "out of bounds" in raised.value.detail
+
+
+@pytest.mark.parametrize(
+    "spec", ["a", "1-2-3", "1..3", "1-", "-", "--1", "odd-even", "1;2", "last-", "2 3", "1.5"]
+)
+def test_malformed_specs_are_rejected_while_parsing(spec: str) -> None:
+    with pytest.raises(HTTPException) as raised:
+        parse_page_spec(spec)
+    assert raised.value.status_code == 400
+    assert "Invalid range token" in raised.value.detail
+
+
+def test_selection_behaves_like_a_sequence() -> None:
+    selection = PageSelection((range(0, 3), range(9, 6, -1)))
+    assert len(selection) == 6
+    assert selection[0] == 0
+    assert selection[3] == 9
+    assert selection[-1] == 7
+    assert 8 in selection
+    assert 5 not in selection
+    with pytest.raises(IndexError):
+        selection[6]
+    with pytest.raises(IndexError):
+        selection[-7]
@@ -0,0 +1,119 @@
+"""Compressed request bodies: decoded as they arrive, rejected when truncated, oversized or unsupported."""
+
+import gzip
+import hashlib
+from typing import Iterator
+
+import pytest
+import zstandard
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.utils.request_encoding import DecompressRequestMiddleware, _ZstdFrames
+
+CONTENT = b"".join(f"line {number} of the uploaded body\n".encode() for number in range(20000))
+
+_ZSTD_MAGIC = (0xFD2FB528).to_bytes(4, "little")
+
+
+@pytest.fixture
+def client() -> TestClient:
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request) -> dict:
+        body = await request.body()
+        return {"size": len(body), "sha256": hashlib.sha256(body).hexdigest()}
+
+    app.add_middleware(DecompressRequestMiddleware, paths={"/upload"})
+    return TestClient(app)
+
+
+def _pieces(data: bytes, size: int = 4093) -> Iterator[bytes]:
+    # Sent chunked, so frame and member boundaries fall inside messages
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def _post(client: TestClient, body: bytes, encoding: str):
+    return client.post("/upload", content=_pieces(body), headers={"Content-Encoding": encoding})
+
+
+def _digest(data: bytes) -> dict:
+    return {"size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+
+
+def _rle_frame(byte: bytes, count: int) -> bytes:
+    # Single-segment frame with a 2-byte content size and one last RLE block
+    header = bytes([0x20 | 0x40]) + (count - 256).to_bytes(2, "little")
+    block = ((count << 3) | (1 << 1) | 1).to_bytes(3, "little")
+    return _ZSTD_MAGIC + header + block + byte
+
+
+def _skippable_frame(payload: bytes) -> bytes:
+    return (0x184D2A53).to_bytes(4, "little") + len(payload).to_bytes(4, "little") + payload
+
+
+def test_gzip_body_is_decoded(client: TestClient) -> None:
+    response = _post(client, gzip.compress(CONTENT), "gzip")
+    assert response.status_code == 200
+    assert response.json() == _digest(CONTENT)
+
+
+def test_concatenated_gzip_members_decode_to_the_joined_content(client: TestClient) -> None:
+    half = len(CONTENT) // 2
+    body = gzip.compress(CONTENT[:half]) + gzip.compress(CONTENT[half:])
+    assert _post(client, body, "gzip").json() == _digest(CONTENT)
+
+
+def test_zstd_frames_with_skippable_rle_and_checksummed_blocks(client: TestClient) -> None:
+    checksummed = zstandard.ZstdCompressor(write_checksum=True, write_content_size=False)
+    body = (
+        _skippable_frame(b"metadata")
+        + checksummed.compress(CONTENT)
+        + _rle_frame(b"z", 1000)
+        + _skippable_frame(b"")
+    )
+    response = _post(client, body, "zstd")
+    assert response.status_code == 200
+    assert response.json() == _digest(CONTENT + b"z" * 1000)
+
+
+def test_stacked_codings_are_decoded_in_reverse_order(client: TestClient) -> None:
+    body = zstandard.ZstdCompressor().compress(gzip.compress(CONTENT))
+    assert _post(client, body, "gzip, zstd").json() == _digest(CONTENT)
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_truncated_body_is_rejected(client: TestClient, encoding: str) -> None:
+    compressed = (
+        gzip.compress(CONTENT) if encoding == "gzip" else zstandard.ZstdCompressor().compress(CONTENT)
+    )
+    response = _post(client, compressed[: len(compressed) // 2], encoding)
+    assert response.status_code == 400
+    assert encoding in response.json()["detail"]
+
+
+def test_zstd_truncated_at_any_offset_is_detected() -> None:
+    checksummed = zstandard.ZstdCompressor(write_checksum=True).compress(CONTENT[:5000])
+    body = _skippable_frame(b"meta") + checksummed + _rle_frame(b"z", 300)
+    boundaries = {0, 12, 12 + len(checksummed), len(body)}
+    for cut in range(len(body) + 1):
+        frames = _ZstdFrames()
+        frames.feed(body[:cut])
+        assert frames.complete is (cut in boundaries), cut
+
+
+def test_decompression_bomb_is_rejected(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "max_total_upload_mb", 1)
+    bomb = gzip.compress(b"\0" * (64 * 1024 * 1024))
+    assert len(bomb) < 100 * 1024
+    response = _post(client, bomb, "gzip")
+    assert response.status_code == 413
+
+
+def test_unsupported_encoding_is_rejected(client: TestClient) -> None:
+    response = _post(client, CONTENT, "br")
+    assert response.status_code == 415
+    assert "br" in response.json()["detail"]
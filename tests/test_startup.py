@@ -0,0 +1,49 @@
+"""Cold-start budget: importing the app must stay fast and must not load the PDF libraries."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Seconds allowed for ``import app.main`` in a fresh interpreter
+IMPORT_BUDGET_SECONDS = float(os.environ.get("PDF_MERGER_STARTUP_BUDGET_SECONDS") or 3.0)
+
+# Imported by the services on first use, never at startup
+PDF_LIBRARIES = ("fitz", "pypdf", "pikepdf", "PIL")
+
+_PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": elapsed,
+    "loaded": [name for name in {PDF_LIBRARIES!r} if name in sys.modules],
+}}))
+"""
+
+
+def _import_app() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_does_not_load_pdf_libraries() -> None:
+    assert _import_app()["loaded"] == []
+
+
+def test_import_time_within_budget() -> None:
+    # The fastest of a few runs, so a single hiccup on a busy machine does not fail the test
+    seconds = min(_import_app()["seconds"] for _ in range(3))
+    assert seconds < IMPORT_BUDGET_SECONDS, (
+        f"import app.main took {seconds:.2f}s, over the budget of {IMPORT_BUDGET_SECONDS:.2f}s"
+    )